@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pattern Generator Benchmarks
+
+This module times every PatternGenerator generator, save_image for each file
+format and encoder profile, and a full export of the pattern set over a matrix
+of resolutions. It reports wall time, peak RSS and throughput, stores the
+results as JSON and can compare a run against a saved baseline to flag
+regressions.
+
+With --startup it instead times the command line from fresh interpreters
+(importing the module, --help and a small BMP export), checks that the
+generate-only path never imports OpenCV or Qt, and checks the import time of
+pattern_generator against a budget.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+import logging
+import argparse
+import itertools
+import platform
+import tempfile
+import statistics
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from encoders import PROFILES, get_profile
+from pattern_generator import PatternGenerator, parse_resolution
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESOLUTIONS = "1920x1080,3840x2160,7680x4320"
+
+# Relative slowdown over the baseline that counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+# Budget for importing pattern_generator in a fresh interpreter, in milliseconds
+IMPORT_BUDGET_MS = 250.0
+
+# Modules the generate-only command line must not import
+HEAVY_MODULES = ("cv2", "PyQt5")
+
+# Directory holding pattern_generator.py, put on the path of the fresh interpreters
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class BenchmarkResult(NamedTuple):
+    """Measurements for one benchmark case at one resolution."""
+    name: str
+    resolution: str
+    # Median wall time over all repeats, and the fastest repeat
+    seconds: float
+    min_seconds: float
+    # Peak resident set size of the process while the case ran
+    peak_rss_mb: float
+    # Uncompressed frame data produced or encoded per second of median wall time
+    mb_per_s: float
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS counter for this process, where supported (Linux)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> int:
+    """Return the peak resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(name: str, resolution: str, func: Callable[[], int], repeat: int) -> BenchmarkResult:
+    """
+    Time a benchmark case.
+
+    Args:
+        name: Name of the case
+        resolution: Resolution label, e.g. "3840x2160"
+        func: Function running the case once and returning the number of frame bytes it handled
+        repeat: Number of timed runs
+
+    Returns:
+        The measurements for the case
+    """
+    timings = []
+    produced = 0
+    _reset_peak_rss()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        produced = func()
+        timings.append(time.perf_counter() - start)
+    seconds = statistics.median(timings)
+    result = BenchmarkResult(name, resolution, seconds, min(timings),
+                             _peak_rss_bytes() / 1e6, produced / 1e6 / seconds if seconds else 0.0)
+    logger.info(f"{resolution:>10} {name:<40} {seconds * 1000:10.2f} ms "
+                f"{result.mb_per_s:10.1f} MB/s {result.peak_rss_mb:10.1f} MB peak RSS")
+    return result
+
+
+def generator_cases(generator: PatternGenerator) -> List[Tuple[str, Callable[[], int]]]:
+    """
+    List the generator benchmark cases for one resolution.
+
+    Args:
+        generator: Generator to benchmark
+
+    Returns:
+        List of (case name, function) pairs
+    """
+    def case(method: str, **params: Any) -> Callable[[], int]:
+        return lambda: getattr(generator, method)(save=False, **params).nbytes
+
+    return [
+        ("generate_solid_color", case("generate_solid_color", color_name="white")),
+        ("generate_grayscale", case("generate_grayscale")),
+        ("generate_grayscale[levels=16]", case("generate_grayscale", levels=16)),
+        ("generate_grayscale_levels", lambda: sum(image.nbytes for image in
+                                                  generator.generate_grayscale_levels(save=False).values())),
+        ("generate_crosstalk", case("generate_crosstalk", background_color="gray32", box_color="white")),
+        ("generate_grid[6x32]", case("generate_grid", rows=6, cols=32)),
+        ("generate_grid[1xwidth]", case("generate_grid", rows=1, cols=generator.width)),
+        ("generate_grid[heightx1]", case("generate_grid", rows=generator.height, cols=1)),
+        ("generate_skip_one_pixel", case("generate_skip_one_pixel")),
+    ]
+
+
+def save_cases(generator: PatternGenerator, formats: List[str],
+               profiles: List[str]) -> List[Tuple[str, Callable[[], int]]]:
+    """
+    List the save_image benchmark cases for one resolution.
+
+    Args:
+        generator: Generator to benchmark, with its output directory set to a scratch location
+        formats: File extensions to benchmark
+        profiles: Encoder profiles to benchmark each format with
+
+    Returns:
+        List of (case name, function) pairs
+    """
+    image = generator.generate_crosstalk("gray32", "white", save=False)
+
+    def case(image_format: str, profile: str) -> Callable[[], int]:
+        def run() -> int:
+            generator.encoders = get_profile(profile)
+            generator.save_image(image, f"benchmark.{image_format}")
+            return image.nbytes
+        return run
+
+    return [(f"save_image[{image_format}/{profile}]", case(image_format, profile))
+            for image_format in formats for profile in profiles]
+
+
+def export_case(generator: PatternGenerator, workers: int) -> Tuple[str, Callable[[], int]]:
+    """
+    Benchmark case exporting the full pattern set.
+
+    Args:
+        generator: Generator to benchmark, with its output directory set to a scratch location
+        workers: Number of worker threads
+
+    Returns:
+        A (case name, function) pair
+    """
+    def run() -> int:
+        paths = generator.export_all_patterns(workers=workers)
+        return len(paths) * generator.width * generator.height * 3
+
+    return f"export_all_patterns[workers={workers}]", run
+
+
+def run_benchmarks(resolutions: List[Tuple[int, int]], repeat: int = 3,
+                   formats: Optional[List[str]] = None, workers: int = 1,
+                   profiles: Optional[List[str]] = None,
+                   bit_depths: Optional[List[int]] = None) -> List[BenchmarkResult]:
+    """
+    Run every benchmark case over a matrix of resolutions.
+
+    Args:
+        resolutions: List of (width, height) tuples
+        repeat: Number of timed runs per case
+        formats: File extensions to benchmark save_image with
+        workers: Number of worker threads for the full export
+        profiles: Encoder profiles to benchmark save_image with
+        bit_depths: Bits per channel to benchmark. Deeper than 8 bits runs the
+            generators and the formats that store 16-bit images, labelled e.g.
+            "3840x2160/16bit"; the full export only runs at 8 bits.
+
+    Returns:
+        Results in the order they were run
+    """
+    formats = formats or ["bmp", "png", "tiff"]
+    profiles = profiles or list(PROFILES)
+    bit_depths = bit_depths or [8]
+    results = []
+    scratch = tempfile.mkdtemp(prefix="pattern_benchmark_")
+    try:
+        for (width, height), bit_depth in itertools.product(resolutions, bit_depths):
+            label = f"{width}x{height}" + (f"/{bit_depth}bit" if bit_depth != 8 else "")
+            generator = PatternGenerator(width, height, bit_depth=bit_depth)
+            generator.output_dir = os.path.join(scratch, label.replace("/", "_"))
+            os.makedirs(generator.output_dir, exist_ok=True)
+
+            depth_formats = [image_format for image_format in formats
+                             if generator.bit_depth == 8
+                             or 16 in get_profile("default")["." + image_format].bit_depths]
+            cases = generator_cases(generator) + save_cases(generator, depth_formats, profiles)
+            generator.encoders = get_profile("default")
+            if bit_depth == 8:
+                cases.append(export_case(generator, workers))
+            for name, func in cases:
+                results.append(measure(name, label, func, repeat))
+            shutil.rmtree(generator.output_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def _run_python(args: List[str], cwd: str) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter with the source directory on its path, raising if it fails."""
+    path = os.pathsep.join(filter(None, [_SOURCE_DIR, os.environ.get("PYTHONPATH")]))
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=dict(os.environ, PYTHONPATH=path),
+                          capture_output=True, text=True, check=True)
+
+
+def import_time_ms(module: str, cwd: str) -> float:
+    """
+    Measure how long a module takes to import in a fresh interpreter.
+
+    Uses the interpreter's own import timing (-X importtime), so interpreter
+    startup is excluded.
+
+    Args:
+        module: Name of the module to import
+        cwd: Directory to run the interpreter in
+
+    Returns:
+        Cumulative import time of the module and everything it imports, in milliseconds
+    """
+    output = _run_python(["-X", "importtime", "-c", f"import {module}"], cwd).stderr
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def heavy_imports(args: List[str], cwd: str) -> List[str]:
+    """
+    Run the pattern_generator command line in a fresh interpreter and list the heavy modules it loaded.
+
+    Args:
+        args: Command line arguments
+        cwd: Directory to run the command in
+
+    Returns:
+        The entries of HEAVY_MODULES that were imported
+    """
+    code = ("import sys, pattern_generator; sys.argv[0] = pattern_generator.__file__; pattern_generator.main(); "
+            f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    output = _run_python(["-c", code] + args, cwd).stdout.splitlines()
+    return [name for name in (output[-1] if output else "").split(",") if name]
+
+
+def startup_benchmarks(repeat: int = 5,
+                       import_budget_ms: float = IMPORT_BUDGET_MS) -> Tuple[List[BenchmarkResult], List[str]]:
+    """
+    Time the pattern_generator command line from fresh interpreters.
+
+    Every case starts a new interpreter, so the timings include interpreter
+    startup and module imports, as seen by scripts calling the command line.
+    Results are labelled with the resolution "startup"; peak RSS is not
+    measured for the child processes and reported as 0.
+
+    Args:
+        repeat: Number of timed runs per case
+        import_budget_ms: Largest acceptable import time of pattern_generator
+
+    Returns:
+        The results, and a description of every failed check (an import over
+        budget, or a heavy module loaded by the BMP export)
+    """
+    script = os.path.join(_SOURCE_DIR, "pattern_generator.py")
+    bmp_args = ["--width", "64", "--height", "64", "--format", "bmp", "--force"]
+    cases = [
+        ("startup[import pattern_generator]", ["-c", "import pattern_generator"]),
+        ("startup[pattern_generator --help]", [script, "--help"]),
+        ("startup[pattern_generator bmp 64x64]", [script] + bmp_args),
+    ]
+    results = []
+    failures = []
+    scratch = tempfile.mkdtemp(prefix="pattern_startup_")
+    try:
+        for name, args in cases:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                _run_python(args, scratch)
+                timings.append(time.perf_counter() - start)
+            results.append(BenchmarkResult(name, "startup", statistics.median(timings), min(timings), 0.0, 0.0))
+            logger.info(f"{'startup':>10} {name:<40} {results[-1].seconds * 1000:10.2f} ms")
+
+        # The fastest run is the least noisy, as in compare_results
+        import_ms = min(import_time_ms("pattern_generator", scratch) for _ in range(repeat))
+        results.append(BenchmarkResult("import_time[pattern_generator]", "startup", import_ms / 1000,
+                                       import_ms / 1000, 0.0, 0.0))
+        logger.info(f"{'startup':>10} {'import_time[pattern_generator]':<40} {import_ms:10.2f} ms "
+                    f"(budget {import_budget_ms:.0f} ms)")
+        if import_ms > import_budget_ms:
+            failures.append(f"Importing pattern_generator took {import_ms:.1f} ms, "
+                            f"over the {import_budget_ms:.0f} ms budget")
+
+        loaded = heavy_imports(bmp_args, scratch)
+        if loaded:
+            failures.append(f"The BMP export imported {', '.join(loaded)}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results, failures
+
+
+def environment() -> Dict[str, str]:
+    """Describe the machine and library versions the benchmarks ran with."""
+    import cv2
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": str(os.cpu_count()),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def save_results(results: List[BenchmarkResult], path: str) -> None:
+    """
+    Save benchmark results as JSON.
+
+    Args:
+        results: Results to save
+        path: Output file path
+    """
+    with open(path, "w") as f:
+        json.dump({"environment": environment(),
+                   "results": [result._asdict() for result in results]}, f, indent=1)
+    logger.info(f"Saved {len(results)} benchmark results to {path}")
+
+
+def load_results(path: str) -> List[BenchmarkResult]:
+    """
+    Load benchmark results saved by save_results.
+
+    Args:
+        path: Path of the results file
+
+    Returns:
+        The saved results
+    """
+    with open(path) as f:
+        return [BenchmarkResult(**result) for result in json.load(f)["results"]]
+
+
+def compare_results(results: List[BenchmarkResult], baseline: List[BenchmarkResult],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[BenchmarkResult, BenchmarkResult]]:
+    """
+    Find cases that got slower than a baseline.
+
+    Cases are matched by name and resolution; cases missing from either side
+    are ignored. The fastest repeat is compared, as it is the least noisy.
+
+    Args:
+        results: Current results
+        baseline: Baseline results
+        threshold: Relative slowdown that counts as a regression, e.g. 0.1 for 10%
+
+    Returns:
+        List of (current, baseline) pairs for every regressed case
+    """
+    previous = {(result.name, result.resolution): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result.name, result.resolution))
+        if before is None:
+            continue
+        change = result.min_seconds / before.min_seconds - 1 if before.min_seconds else 0.0
+        if change > threshold:
+            regressions.append((result, before))
+        logger.info(f"{result.resolution:>10} {result.name:<40} {change * 100:+8.1f}%"
+                    + ("  REGRESSION" if change > threshold else ""))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the display pattern generator.')
+    parser.add_argument('--resolutions', type=str, default=DEFAULT_RESOLUTIONS,
+                        help='Comma-separated list of resolutions to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs per case')
+    parser.add_argument('--formats', type=str, default='bmp,png,tiff',
+                        help='Comma-separated list of file formats to benchmark save_image with')
+    parser.add_argument('--profiles', type=str, default=','.join(PROFILES),
+                        help='Comma-separated list of encoder profiles to benchmark save_image with')
+    parser.add_argument('--bit-depths', type=str, default='8',
+                        help='Comma-separated list of bit depths to benchmark, e.g. 8,16')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker threads for the full export (0 = one per CPU core)')
+    parser.add_argument('--output', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Baseline JSON file to compare against; exits non-zero on regressions')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative slowdown that counts as a regression (default 0.10 = 10%%)')
+    parser.add_argument('--startup', action='store_true',
+                        help='Time the command line from fresh interpreters instead of rendering; '
+                             'exits non-zero if the import budget is exceeded or a BMP export imports OpenCV or Qt')
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help=f'Import time budget for pattern_generator with --startup (default {IMPORT_BUDGET_MS:.0f})')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger("pattern_generator").setLevel(logging.WARNING)
+    failures = []
+    if args.startup:
+        results, failures = startup_benchmarks(args.repeat, args.import_budget_ms)
+    else:
+        resolutions = [parse_resolution(entry) for entry in args.resolutions.split(",") if entry.strip()]
+        formats = [entry.strip() for entry in args.formats.split(",") if entry.strip()]
+        profiles = [entry.strip() for entry in args.profiles.split(",") if entry.strip()]
+        bit_depths = [int(entry) for entry in args.bit_depths.split(",") if entry.strip()]
+        results = run_benchmarks(resolutions, args.repeat, formats, args.workers, profiles, bit_depths)
+
+    if args.output:
+        save_results(results, args.output)
+    if args.compare:
+        regressions = compare_results(results, load_results(args.compare), args.threshold)
+        if regressions:
+            logger.error(f"{len(regressions)} benchmark cases regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        logger.info("No regressions against baseline")
+    for failure in failures:
+        logger.error(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Image Encoders
+
+This module provides the encoders PatternGenerator.save_image writes files with.
+Each encoder handles one file format and carries its own settings (PNG level and
+strategy, TIFF compression, ...). Named profiles bundle one encoder per format,
+e.g. "fastest" for quick turnaround or "smallest" for archiving.
+
+BMP and PPM are written with NumPy alone. OpenCV is only imported the first
+time a PNG, TIFF or JPEG file is encoded, which keeps it out of the startup
+time of runs that do not need it.
+"""
+
+import io
+import os
+import time
+import zlib
+import struct
+import tempfile
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pattern_generator import FlatPattern, RowPlan
+
+# Number of identical rows written per call when streaming a flat pattern
+_RUN_CHUNK_ROWS = 64
+
+# Number of image rows converted and written per call when writing a BMP from a full frame
+_BMP_CHUNK_ROWS = 256
+
+
+def _cv2() -> Any:
+    """Import OpenCV on first use."""
+    import cv2
+    return cv2
+
+
+def _write_row_runs(f: BinaryIO, rows: np.ndarray, row_index: np.ndarray) -> None:
+    """
+    Write an image described by row templates without materializing it.
+
+    Args:
+        f: File to write to
+        rows: Array of shape (n, row bytes) holding the encoded row templates
+        row_index: Template index of each output row, in file order
+    """
+    if not len(row_index):
+        return
+    starts = np.flatnonzero(np.diff(row_index, prepend=-1))
+    ends = np.append(starts[1:], len(row_index))
+    for start, end in zip(starts, ends):
+        row = rows[row_index[start]].tobytes()
+        count = int(end - start)
+        chunk = row * min(count, _RUN_CHUNK_ROWS)
+        for _ in range(count // _RUN_CHUNK_ROWS):
+            f.write(chunk)
+        f.write(row * (count % _RUN_CHUNK_ROWS))
+
+
+class Encoder:
+    """Base class for encoders that write an image to a file."""
+
+    # File extensions (with dot) the encoder writes
+    extensions: List[str] = []
+
+    # Bits per channel of the pixel types the encoder can store (8 for uint8, 16 for uint16)
+    bit_depths: Tuple[int, ...] = (8,)
+
+    def encode(self, image: np.ndarray, filepath: str) -> int:
+        """
+        Write an image to a file.
+
+        Args:
+            image: Image in OpenCV (BGR) channel order
+            filepath: Path to write to
+
+        Returns:
+            Number of bytes written
+        """
+        raise NotImplementedError
+
+    def encode_bytes(self, image: np.ndarray, extension: str) -> bytes:
+        """
+        Encode an image in memory.
+        
+        Encoders that can encode to memory override this; the default writes
+        a temporary file with encode and reads it back.
+        
+        Args:
+            image: Image in OpenCV (BGR) channel order
+            extension: File extension (with dot) selecting the format
+            
+        Returns:
+            The encoded file contents
+        """
+        fd, path = tempfile.mkstemp(suffix=extension)
+        os.close(fd)
+        try:
+            self.encode(image, path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+    
+    def encode_timed(self, image: np.ndarray, filepath: str) -> Tuple[int, float, float]:
+        """
+        Write an image to a file, timing encoding and file I/O separately.
+
+        Encoders that can encode to memory first override this; the default
+        calls encode and reports its whole time as encode time.
+
+        Args:
+            image: Image in OpenCV (BGR) channel order
+            filepath: Path to write to
+
+        Returns:
+            Tuple of (bytes written, encode seconds, write seconds)
+        """
+        start = time.perf_counter()
+        size = self.encode(image, filepath)
+        return size, time.perf_counter() - start, 0.0
+
+    def encode_rows(self, pattern: Union["FlatPattern", "RowPlan"], filepath: str) -> int:
+        """
+        Write a pattern described by row templates to a file.
+
+        Encoders that can stream rows override this to avoid building the full
+        frame and produce the same file as encode; the default materializes the
+        pattern and calls encode.
+
+        Args:
+            pattern: Flat pattern or row plan to write
+            filepath: Path to write to
+
+        Returns:
+            Number of bytes written
+        """
+        return self.encode(pattern.to_array(), filepath)
+
+    def encode_rows_bytes(self, pattern: Union["FlatPattern", "RowPlan"], extension: str) -> bytes:
+        """
+        Encode a pattern described by row templates in memory.
+
+        Encoders that can stream rows override this, so only the encoded file
+        is held in memory; the default materializes the pattern for this call
+        and calls encode_bytes.
+
+        Args:
+            pattern: Flat pattern or row plan to encode
+            extension: File extension (with dot) selecting the format
+
+        Returns:
+            The encoded file contents, the same bytes encode_rows writes
+        """
+        return self.encode_bytes(pattern.to_array(), extension)
+
+    def encode_strips(self, plan: "RowPlan", filepath: str, strip_rows: int) -> int:
+        """
+        Write a pattern strip by strip, never holding more than one strip in memory.
+
+        Args:
+            plan: Row plan of the pattern
+            filepath: Path to write to
+            strip_rows: Number of rows per strip
+
+        Returns:
+            Number of bytes written
+        """
+        raise ValueError(f"{type(self).__name__} cannot write images strip by strip; use bmp, ppm or tiff")
+
+    def settings(self) -> Dict[str, Any]:
+        """
+        Describe the settings that affect the encoded output.
+
+        Returns:
+            A JSON-serializable dictionary
+        """
+        return {"encoder": type(self).__name__}
+
+
+class OpenCVEncoder(Encoder):
+    """Encoder writing through cv2.imwrite with a fixed list of parameters."""
+
+    def __init__(self, params: Optional[List[Union[int, str]]] = None) -> None:
+        """
+        Args:
+            params: Flat list of cv2.IMWRITE_* flag/value pairs. Flags and values
+                may be given by name (e.g. "IMWRITE_PNG_COMPRESSION"), so OpenCV
+                is only imported once the encoder is used; pairs naming
+                something this OpenCV build lacks are left out.
+        """
+        self._param_names = list(params) if params else []
+        self._params: Optional[List[int]] = None if self._param_names else []
+
+    @property
+    def params(self) -> List[int]:
+        """The cv2.imwrite parameters, with names resolved against OpenCV."""
+        if self._params is None:
+            cv2 = _cv2()
+            params = []
+            for flag, value in zip(self._param_names[::2], self._param_names[1::2]):
+                pair = [getattr(cv2, item, None) if isinstance(item, str) else item for item in (flag, value)]
+                if None not in pair:
+                    params += pair
+            self._params = params
+        return self._params
+
+    def encode(self, image: np.ndarray, filepath: str) -> int:
+        if not _cv2().imwrite(filepath, image, self.params):
+            raise IOError(f"Failed to write image to {filepath}")
+        return os.path.getsize(filepath)
+
+    def encode_bytes(self, image: np.ndarray, extension: str) -> bytes:
+        ok, data = _cv2().imencode(extension, image, self.params)
+        if not ok:
+            raise IOError(f"Failed to encode image as {extension}")
+        return data.tobytes()
+    
+    def encode_timed(self, image: np.ndarray, filepath: str) -> Tuple[int, float, float]:
+        # cv2.imencode produces the same bytes as cv2.imwrite, but holds the
+        # whole file in memory, so it is only used when timings are wanted
+        start = time.perf_counter()
+        ok, data = _cv2().imencode(os.path.splitext(filepath)[1], image, self.params)
+        if not ok:
+            raise IOError(f"Failed to encode image for {filepath}")
+        encoded = time.perf_counter()
+        with open(filepath, "wb") as f:
+            f.write(data)
+        return data.nbytes, encoded - start, time.perf_counter() - encoded
+
+    def settings(self) -> Dict[str, Any]:
+        return {"encoder": type(self).__name__, "params": self.params}
+
+
+class BMPEncoder(OpenCVEncoder):
+    """
+    Uncompressed BMP.
+    
+    Color images are written with NumPy in the same layout as OpenCV's writer:
+    24-bit BGR rows, bottom-up, padded to 4 bytes. Other layouts (grayscale
+    palettes, alpha) still go through OpenCV.
+    """
+
+    extensions = [".bmp"]
+
+    @staticmethod
+    def _header(width: int, height: int) -> bytes:
+        """Return the file and info headers of a 24-bit BMP."""
+        image_bytes = (width * 3 + (-width * 3 % 4)) * height
+        header = struct.pack("<2sIHHI", b"BM", 54 + image_bytes, 0, 0, 54)
+        return header + struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, 0, 0, 0, 0, 0)
+
+    @staticmethod
+    def _native(image: np.ndarray) -> bool:
+        """Whether an image can be written without OpenCV."""
+        return image.ndim == 3 and image.shape[2] == 3 and image.dtype == np.uint8
+
+    @staticmethod
+    def _bottom_up_rows(image: np.ndarray, top: int, bottom: int) -> np.ndarray:
+        """Return image rows [top, bottom) in file order (last row first), padded to 4 bytes."""
+        row_bytes = image.shape[1] * 3
+        rows = np.zeros((bottom - top, row_bytes + (-row_bytes % 4)), np.uint8)
+        rows[:, :row_bytes] = image[top:bottom][::-1].reshape(bottom - top, row_bytes)
+        return rows
+
+    def encode(self, image: np.ndarray, filepath: str) -> int:
+        if not self._native(image):
+            return super().encode(image, filepath)
+        height, width = image.shape[:2]
+        with open(filepath, "wb") as f:
+            f.write(self._header(width, height))
+            for bottom in range(height, 0, -_BMP_CHUNK_ROWS):
+                self._bottom_up_rows(image, max(bottom - _BMP_CHUNK_ROWS, 0), bottom).tofile(f)
+        return os.path.getsize(filepath)
+
+    def encode_bytes(self, image: np.ndarray, extension: str) -> bytes:
+        if not self._native(image):
+            return super().encode_bytes(image, extension)
+        height, width = image.shape[:2]
+        return self._header(width, height) + self._bottom_up_rows(image, 0, height).tobytes()
+
+    def encode_timed(self, image: np.ndarray, filepath: str) -> Tuple[int, float, float]:
+        start = time.perf_counter()
+        data = self.encode_bytes(image, ".bmp")
+        encoded = time.perf_counter()
+        with open(filepath, "wb") as f:
+            f.write(data)
+        return len(data), encoded - start, time.perf_counter() - encoded
+
+    def _write_rows(self, pattern: Union["FlatPattern", "RowPlan"], f: BinaryIO) -> None:
+        """Write a pattern's file from its row templates."""
+        templates, row_index = pattern.row_plan()
+        row_bytes = pattern.width * 3
+        rows = np.zeros((len(templates), row_bytes + (-row_bytes % 4)), np.uint8)
+        rows[:, :row_bytes] = templates.reshape(len(templates), row_bytes)
+        f.write(self._header(pattern.width, pattern.height))
+        _write_row_runs(f, rows, row_index[::-1])
+
+    def encode_rows(self, pattern: Union["FlatPattern", "RowPlan"], filepath: str) -> int:
+        with open(filepath, "wb") as f:
+            self._write_rows(pattern, f)
+        return os.path.getsize(filepath)
+
+    def encode_rows_bytes(self, pattern: Union["FlatPattern", "RowPlan"], extension: str) -> bytes:
+        buffer = io.BytesIO()
+        self._write_rows(pattern, buffer)
+        return buffer.getvalue()
+
+    def encode_strips(self, plan: "RowPlan", filepath: str, strip_rows: int) -> int:
+        # Rows are written from the templates, so memory use never exceeds a strip
+        return self.encode_rows(plan, filepath)
+
+
+class PNGEncoder(OpenCVEncoder):
+    """PNG with a configurable zlib level, strategy and row filter."""
+
+    extensions = [".png"]
+    bit_depths = (8, 16)
+
+    def __init__(self, level: Optional[int] = None, strategy: Optional[Union[int, str]] = None,
+                 filter: Optional[Union[int, str]] = None) -> None:
+        """
+        Args:
+            level: zlib compression level 0-9, or None for OpenCV's default
+            strategy: One of the cv2.IMWRITE_PNG_STRATEGY_* values or its name, or None for OpenCV's default
+            filter: One of the cv2.IMWRITE_PNG_FILTER_* values or its name, or None for OpenCV's
+                default. Ignored by OpenCV builds that cannot select the filter.
+        """
+        params: List[Union[int, str]] = []
+        if level is not None:
+            params += ["IMWRITE_PNG_COMPRESSION", level]
+        if strategy is not None:
+            params += ["IMWRITE_PNG_STRATEGY", strategy]
+        if filter is not None:
+            params += ["IMWRITE_PNG_FILTER", filter]
+        super().__init__(params)
+
+
+class TIFFEncoder(OpenCVEncoder):
+    """TIFF with a configurable compression scheme."""
+
+    extensions = [".tif", ".tiff"]
+    bit_depths = (8, 16)
+
+    # Values of the TIFF Compression tag
+    COMPRESSION_NONE = 1
+    COMPRESSION_LZW = 5
+    COMPRESSION_DEFLATE = 8
+
+    def __init__(self, compression: Optional[int] = None) -> None:
+        """
+        Args:
+            compression: TIFF compression tag value, or None for OpenCV's default (LZW)
+        """
+        self.compression = compression
+        params = ["IMWRITE_TIFF_COMPRESSION", compression] if compression is not None else []
+        super().__init__(params)
+
+    def encode_strips(self, plan: "RowPlan", filepath: str, strip_rows: int) -> int:
+        # One TIFF strip per rendered strip. LZW is not available without OpenCV,
+        # so everything but uncompressed output is written with Deflate.
+        compression = (self.COMPRESSION_NONE if self.compression == self.COMPRESSION_NONE
+                       else self.COMPRESSION_DEFLATE)
+        return _write_strip_tiff(filepath, plan, strip_rows, compression)
+
+
+class JPEGEncoder(OpenCVEncoder):
+    """JPEG with a configurable quality."""
+
+    extensions = [".jpg", ".jpeg"]
+
+    def __init__(self, quality: Optional[int] = None) -> None:
+        """
+        Args:
+            quality: JPEG quality 0-100, or None for OpenCV's default (95)
+        """
+        params = ["IMWRITE_JPEG_QUALITY", quality] if quality is not None else []
+        super().__init__(params)
+
+
+class PPMEncoder(Encoder):
+    """Uncompressed binary PPM written directly from the pixel buffer, without OpenCV."""
+
+    extensions = [".ppm"]
+    bit_depths = (8, 16)
+
+    @staticmethod
+    def _payload(image: np.ndarray) -> Tuple[bytes, np.ndarray]:
+        """Return the PPM header and the contiguous RGB samples for an image."""
+        height, width = image.shape[:2]
+        maxval = 65535 if image.dtype == np.uint16 else 255
+        # PPM stores RGB, most significant byte first for 16-bit samples
+        rgb = image[..., 2::-1] if image.ndim == 3 else np.repeat(image[..., np.newaxis], 3, axis=2)
+        if maxval > 255:
+            rgb = rgb.astype(">u2")
+        return f"P6\n{width} {height}\n{maxval}\n".encode("ascii"), np.ascontiguousarray(rgb)
+
+    def encode(self, image: np.ndarray, filepath: str) -> int:
+        return self.encode_timed(image, filepath)[0]
+    
+    def encode_bytes(self, image: np.ndarray, extension: str) -> bytes:
+        header, samples = self._payload(image)
+        return header + samples.tobytes()
+
+    def encode_timed(self, image: np.ndarray, filepath: str) -> Tuple[int, float, float]:
+        start = time.perf_counter()
+        header, samples = self._payload(image)
+        encoded = time.perf_counter()
+        with open(filepath, "wb") as f:
+            f.write(header)
+            samples.tofile(f)
+        return os.path.getsize(filepath), encoded - start, time.perf_counter() - encoded
+
+    def _write_rows(self, pattern: Union["FlatPattern", "RowPlan"], f: BinaryIO) -> None:
+        """Write a pattern's file from its row templates."""
+        templates, row_index = pattern.row_plan()
+        maxval = 65535 if templates.dtype == np.uint16 else 255
+        rows = templates[..., ::-1]
+        if maxval > 255:
+            rows = rows.astype(">u2")
+        rows = np.ascontiguousarray(rows).reshape(len(templates), -1)
+        f.write(f"P6\n{pattern.width} {pattern.height}\n{maxval}\n".encode("ascii"))
+        _write_row_runs(f, rows, row_index)
+
+    def encode_rows(self, pattern: Union["FlatPattern", "RowPlan"], filepath: str) -> int:
+        with open(filepath, "wb") as f:
+            self._write_rows(pattern, f)
+        return os.path.getsize(filepath)
+
+    def encode_rows_bytes(self, pattern: Union["FlatPattern", "RowPlan"], extension: str) -> bytes:
+        buffer = io.BytesIO()
+        self._write_rows(pattern, buffer)
+        return buffer.getvalue()
+
+    def encode_strips(self, plan: "RowPlan", filepath: str, strip_rows: int) -> int:
+        return self.encode_rows(plan, filepath)
+
+
+# TIFF field types
+_TIFF_SHORT = 3
+_TIFF_LONG = 4
+
+
+def _tiff_rgb_rows(rows: np.ndarray) -> np.ndarray:
+    """Reorder BGR rows to the RGB samples TIFF stores; "II" files keep 16-bit samples little-endian."""
+    rows = rows[..., ::-1]
+    if rows.dtype.itemsize == 2:
+        rows = rows.astype("<u2")
+    return np.ascontiguousarray(rows)
+
+
+def _write_tiff_directory(f: BinaryIO, width: int, height: int, bits: int, compression: int,
+                          strip_rows: int, offsets: List[int], counts: List[int]) -> bytes:
+    """
+    Describe a baseline RGB image whose strips are already written.
+
+    Values longer than four bytes live outside the directory and are written
+    to the file here; the directory itself is returned, so callers can place
+    it (or several copies of it) where they need.
+
+    Args:
+        f: File positioned after the strips
+        width: Image width
+        height: Image height
+        bits: Bits per sample
+        compression: TIFF Compression tag value of the strips
+        strip_rows: Number of rows per strip
+        offsets: File offset of every strip
+        counts: Byte count of every strip
+
+    Returns:
+        The directory, ending with a zero next-directory offset
+    """
+    entries = [
+        (256, _TIFF_LONG, [width]),  # ImageWidth
+        (257, _TIFF_LONG, [height]),  # ImageLength
+        (258, _TIFF_SHORT, [bits] * 3),  # BitsPerSample
+        (259, _TIFF_SHORT, [compression]),  # Compression
+        (262, _TIFF_SHORT, [2]),  # PhotometricInterpretation: RGB
+        (273, _TIFF_LONG, offsets),  # StripOffsets
+        (277, _TIFF_SHORT, [3]),  # SamplesPerPixel
+        (278, _TIFF_LONG, [strip_rows]),  # RowsPerStrip
+        (279, _TIFF_LONG, counts),  # StripByteCounts
+        (284, _TIFF_SHORT, [1]),  # PlanarConfiguration: chunky
+    ]
+    directory = struct.pack("<H", len(entries))
+    for tag, field_type, items in entries:
+        packed = struct.pack(f"<{len(items)}{'H' if field_type == _TIFF_SHORT else 'I'}", *items)
+        if len(packed) > 4:
+            f.write(b"\0" * (f.tell() % 2))
+            value = struct.pack("<I", f.tell())
+            f.write(packed)
+        else:
+            value = packed.ljust(4, b"\0")
+        directory += struct.pack("<HHI", tag, field_type, len(items)) + value
+    f.write(b"\0" * (f.tell() % 2))
+    return directory + struct.pack("<I", 0)
+
+
+def _write_strip_tiff(filepath: str, plan: "RowPlan", strip_rows: int, compression: int) -> int:
+    """
+    Write a baseline RGB TIFF one strip at a time.
+
+    Strips are rendered from the row plan, encoded and written in order; the
+    offset tables and the directory follow the image data, so nothing but the
+    current strip is ever held in memory.
+
+    Args:
+        filepath: Path to write to
+        plan: Row plan of the image
+        strip_rows: Number of rows per strip
+        compression: TIFFEncoder.COMPRESSION_NONE or COMPRESSION_DEFLATE
+
+    Returns:
+        Number of bytes written
+    """
+    rows = _tiff_rgb_rows(plan.templates).reshape(len(plan.templates), -1)
+    if compression == TIFFEncoder.COMPRESSION_NONE and plan.nbytes >= 1 << 32:
+        raise ValueError(f"{plan.width}x{plan.height} frames are too large for a TIFF file; use raw or ppm")
+
+    with open(filepath, "wb") as f:
+        # Header; the directory offset is filled in once the strips are written
+        f.write(b"II*\0\0\0\0\0")
+        offsets, counts = [], []
+        for top in range(0, plan.height, strip_rows):
+            strip = np.take(rows, plan.row_index[top:top + strip_rows], axis=0)
+            data = zlib.compress(strip) if compression == TIFFEncoder.COMPRESSION_DEFLATE else strip
+            offsets.append(f.tell())
+            f.write(data)
+            counts.append(len(data) if isinstance(data, bytes) else data.nbytes)
+        if f.tell() + 8 * len(offsets) >= 1 << 32:
+            raise ValueError(f"{filepath} is too large for a TIFF file; use raw or ppm")
+
+        directory = _write_tiff_directory(f, plan.width, plan.height, plan.dtype.itemsize * 8, compression,
+                                          strip_rows, offsets, counts)
+        offset = f.tell()
+        f.write(directory)
+        f.seek(4)
+        f.write(struct.pack("<I", offset))
+    return os.path.getsize(filepath)
+
+
+def _profile(bmp: Encoder, png: Encoder, tiff: Encoder, jpeg: Encoder,
+             ppm: Encoder) -> Dict[str, Encoder]:
+    """Map every supported extension to the encoder for its format."""
+    return {extension: encoder
+            for encoder in (bmp, png, tiff, jpeg, ppm)
+            for extension in encoder.extensions}
+
+
+# Named encoder profiles: file extension -> encoder
+PROFILES: Dict[str, Dict[str, Encoder]] = {
+    # OpenCV's defaults, as used before encoders were configurable
+    "default": _profile(BMPEncoder(), PNGEncoder(), TIFFEncoder(), JPEGEncoder(), PPMEncoder()),
+    # Minimal encode time: lowest zlib level without row filtering for PNG (flat patterns
+    # still compress well), no TIFF compression
+    "fastest": _profile(BMPEncoder(), PNGEncoder(level=1, filter="IMWRITE_PNG_FILTER_NONE"),
+                        TIFFEncoder(TIFFEncoder.COMPRESSION_NONE), JPEGEncoder(), PPMEncoder()),
+    # Minimal file size: maximum zlib effort for PNG, Deflate for TIFF
+    "smallest": _profile(BMPEncoder(), PNGEncoder(level=9, strategy="IMWRITE_PNG_STRATEGY_DEFAULT"),
+                         TIFFEncoder(TIFFEncoder.COMPRESSION_DEFLATE), JPEGEncoder(), PPMEncoder()),
+}
+
+# Extensions any profile can write
+SUPPORTED_EXTENSIONS = tuple(PROFILES["default"])
+
+
+def get_profile(profile: Union[str, Dict[str, Encoder]]) -> Dict[str, Encoder]:
+    """
+    Resolve an encoder profile.
+
+    Args:
+        profile: Name of a profile in PROFILES, or a mapping of extensions to
+            encoders; extensions it leaves out fall back to the default profile
+
+    Returns:
+        Mapping of every supported extension to an encoder
+    """
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"Encoder profile {profile} not found. Available profiles: {list(PROFILES)}")
+        return PROFILES[profile]
+    return {**PROFILES["default"], **profile}
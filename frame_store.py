@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Raw Frame Store
+
+This module stores a full pattern set as uncompressed frames in a single file,
+together with a small JSON index mapping pattern names to byte offsets. Frames
+are read back through np.memmap, so fetching one costs neither a copy nor a
+decode. A command-line tool builds stores and exports them to BMP/PNG.
+"""
+
+import json
+import os
+import logging
+import argparse
+import functools
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from encoders import get_profile
+from pattern_generator import DEFAULT_STRIP_ROWS, PatternGenerator, _run_jobs, parse_resolution
+
+logger = logging.getLogger(__name__)
+
+# File names inside a store directory
+FRAMES_FILENAME = "frames.raw"
+INDEX_FILENAME = "frames.json"
+
+# Frames start on page boundaries so each one can be mapped independently
+FRAME_ALIGNMENT = 4096
+
+STORE_VERSION = 1
+
+
+def _aligned(size: int) -> int:
+    """Round a byte count up to the frame alignment."""
+    return -(-size // FRAME_ALIGNMENT) * FRAME_ALIGNMENT
+
+
+class FrameStore:
+    """
+    Read-only access to a raw frame store.
+
+    Frames are returned as views into a memory map of the store file, so no
+    pixel data is read until it is used.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Open a frame store.
+
+        Args:
+            directory: Directory containing the store's frames.raw and frames.json
+        """
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILENAME)) as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported frame store version {index.get('version')} in {directory}")
+
+        self.width: int = index["width"]
+        self.height: int = index["height"]
+        self.channels: int = index["channels"]
+        # Stores written before channel orders were configurable hold BGR frames
+        self.channel_order: str = index.get("channel_order", "bgr")
+        self.dtype = np.dtype(index["dtype"])
+        self.offsets: Dict[str, int] = {frame["name"]: frame["offset"] for frame in index["frames"]}
+        self.filenames: Dict[str, str] = {frame["name"]: frame["filename"] for frame in index["frames"]}
+        self._data = np.memmap(os.path.join(directory, FRAMES_FILENAME), dtype=np.uint8, mode="r")
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """Shape of every frame in the store."""
+        return (self.height, self.width, self.channels)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.offsets
+
+    def pattern_names(self) -> List[str]:
+        """
+        List the patterns in the store.
+
+        Returns:
+            Pattern names in the order they were stored
+        """
+        return list(self.offsets)
+
+    def get(self, name: str) -> np.ndarray:
+        """
+        Fetch a frame without copying or decoding it.
+
+        Args:
+            name: Name of the pattern
+
+        Returns:
+            A read-only view of the frame
+        """
+        if name not in self.offsets:
+            raise ValueError(f"Pattern {name} not found. Available patterns: {self.pattern_names()}")
+        offset = self.offsets[name]
+        size = self.height * self.width * self.channels * self.dtype.itemsize
+        return self._data[offset:offset + size].view(self.dtype).reshape(self.shape)
+
+    # Lets a store stand in for a PatternGenerator wherever patterns are rendered by name
+    render = get
+
+    def iter_patterns(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """
+        Iterate over all frames in the store.
+
+        Yields:
+            (pattern name, frame) tuples in the order they were stored
+        """
+        for name in self.offsets:
+            yield name, self.get(name)
+
+
+def build_frame_store(generator: PatternGenerator, directory: Optional[str] = None,
+                      names: Optional[List[str]] = None, workers: int = 1) -> str:
+    """
+    Render patterns straight into a new frame store.
+
+    All frames have the same size, so every offset is known up front and
+    workers can render into the memory-mapped file concurrently. Frames are
+    rendered strip by strip straight into the map, so no worker ever holds a
+    full frame.
+
+    Args:
+        generator: Generator to render the patterns with
+        directory: Directory for the store, defaulting to the generator's output directory
+        names: Pattern names to store, or None for the full set
+        workers: Number of worker threads; 0 uses one per CPU core
+
+    Returns:
+        The store directory
+    """
+    names = generator.pattern_names() if names is None else names
+    if not names:
+        raise ValueError("A frame store needs at least one pattern; the pattern set or name filter selected none")
+    directory = directory or generator.output_dir
+    os.makedirs(directory, exist_ok=True)
+    filenames = {name: generator.get_spec(name).filename for name in names}
+
+    # Describe one frame to learn the layout (channels and dtype) the generator produces
+    first = generator.row_plan(names[0])
+    shape, dtype, frame_bytes = first.shape, first.dtype, first.nbytes
+    stride = _aligned(frame_bytes)
+    strip_rows = generator.strip_rows or DEFAULT_STRIP_ROWS
+    offsets = {name: i * stride for i, name in enumerate(names)}
+
+    frames_path = os.path.join(directory, FRAMES_FILENAME)
+    data = np.memmap(frames_path, dtype=np.uint8, mode="w+", shape=(max(stride * len(names), 1),))
+
+    def store(name: str) -> None:
+        plan = generator.row_plan(name)
+        if plan.shape != shape or plan.dtype != dtype:
+            raise ValueError(f"Pattern {name} has shape {plan.shape} {plan.dtype}, "
+                             f"expected {shape} {dtype}")
+        frame = data[offsets[name]:offsets[name] + frame_bytes].view(dtype).reshape(shape)
+        for top, strip in plan.iter_strips(strip_rows):
+            frame[top:top + len(strip)] = strip
+
+    jobs = [(name, functools.partial(store, name)) for name in names]
+    failed = [(name, error) for name, _, error in _run_jobs(jobs, workers) if error is not None]
+    data.flush()
+    del data
+    for name, error in failed:
+        logger.error(f"Failed to store pattern {name}: {error}")
+
+    stored = [name for name in names if name not in dict(failed)]
+    index = {
+        "version": STORE_VERSION,
+        "width": shape[1],
+        "height": shape[0],
+        "channels": shape[2],
+        "channel_order": generator.channel_order,
+        "dtype": dtype.name,
+        "frames": [{"name": name, "filename": filenames[name], "offset": offsets[name]}
+                   for name in stored]
+    }
+    index_path = os.path.join(directory, INDEX_FILENAME)
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(index_path + ".tmp", index_path)
+
+    logger.info(f"Stored {len(stored)} frames in {frames_path}")
+    return directory
+
+
+def export_frame_store(store: FrameStore, output_dir: str, image_format: str = "png",
+                       names: Optional[List[str]] = None) -> List[str]:
+    """
+    Write frames from a store out as regular image files.
+
+    Args:
+        store: Store to export from
+        output_dir: Directory to write the images to
+        image_format: Image file extension, e.g. "png" or "bmp"
+        names: Pattern names to export, or None for all
+
+    Returns:
+        Paths of the written files
+    """
+    encoder = get_profile("default").get(f".{image_format.lower()}")
+    if encoder is None:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name in (store.pattern_names() if names is None else names):
+        filepath = os.path.join(output_dir, f"{store.filenames[name]}.{image_format}")
+        image = store.get(name)
+        if store.channel_order != "bgr":
+            image = np.ascontiguousarray(image[..., 2::-1])
+        encoder.encode(image, filepath)
+        logger.info(f"Exported {name} to {filepath}")
+        paths.append(filepath)
+    return paths
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Build raw frame stores and export them to image files.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Render the full pattern set into a frame store')
+    build_parser.add_argument('resolution', help='Resolution as WIDTHxHEIGHT')
+    build_parser.add_argument('--workers', type=int, default=1,
+                              help='Number of patterns to render in parallel (0 = one per CPU core)')
+
+    export_parser = subparsers.add_parser('export', help='Export the frames of a store to image files')
+    export_parser.add_argument('store', help='Directory containing frames.raw and frames.json')
+    export_parser.add_argument('--format', default='png', help='Image format to export to (png, bmp, tiff)')
+    export_parser.add_argument('--output', default=None, help='Output directory (defaults to the store directory)')
+    export_parser.add_argument('patterns', nargs='*', help='Pattern names to export (default: all)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        width, height = parse_resolution(args.resolution)
+        build_frame_store(PatternGenerator(width, height), workers=args.workers)
+    else:
+        store = FrameStore(args.store)
+        export_frame_store(store, args.output or args.store, args.format, args.patterns or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,87 @@
 import sys
 import os
 import logging
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
 from PyQt5.QtWidgets import (QMainWindow, QApplication, QWidget, QPushButton, 
                           QAction, QLabel, QMenu, QMessageBox, QDialog, QComboBox, 
-                          QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit, QCheckBox,
-                          QSpinBox)
+                          QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit,
+                          QSpinBox, QProgressBar, QFileDialog)
 from PyQt5.QtGui import QIcon, QPixmap, QImage
-from PyQt5.QtCore import Qt
-from pattern_generator import PatternGenerator
-import cv2
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from pattern_generator import PatternGenerator, PatternSpec
+from pattern_suite import PatternSuite, load_suite
 import numpy as np
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Memory budget for rendered previews kept for instant redisplay
+DEFAULT_PREVIEW_CACHE_BYTES = 512 * 1024 * 1024
+
+# Resolution the pattern lists are built for until a valid one is entered
+DEFAULT_LIST_RESOLUTION = (1920, 1080)
+
+
+class PreviewCache:
+    """Least recently used cache of rendered previews, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._previews: "OrderedDict[Hashable, Tuple[QImage, np.ndarray]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[QImage]:
+        """Return a cached preview and mark it as recently used, or None if not cached."""
+        entry = self._previews.get(key)
+        if entry is None:
+            return None
+        self._previews.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, qimage: QImage, buffer: np.ndarray) -> None:
+        """Add a preview together with the pixel buffer it wraps, evicting old previews to stay within budget."""
+        if buffer.nbytes > self.max_bytes:
+            return
+        if key in self._previews:
+            self.current_bytes -= self._previews.pop(key)[1].nbytes
+        while self._previews and self.current_bytes + buffer.nbytes > self.max_bytes:
+            _, (_, evicted) = self._previews.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+        self._previews[key] = (qimage, buffer)
+        self.current_bytes += buffer.nbytes
+
+    def clear(self) -> None:
+        """Drop every cached preview."""
+        self._previews.clear()
+        self.current_bytes = 0
+
+
+class RenderSignals(QObject):
+    """Signals a RenderTask emits back to the GUI thread."""
+    finished = pyqtSignal(object, QImage, object)
+    failed = pyqtSignal(object, str)
+
+
+class RenderTask(QRunnable):
+    """Renders a pattern and converts it to a QImage on a worker thread."""
+
+    def __init__(self, key: Hashable, generator: PatternGenerator, spec: PatternSpec):
+        super().__init__()
+        self.key = key
+        self.generator = generator
+        self.spec = spec
+        self.signals = RenderSignals()
+
+    def run(self):
+        try:
+            # The generator renders RGBX, which the QImage wraps without a conversion copy
+            image = self.generator.render(self.spec)
+            height, width, channel = image.shape
+            qimage = QImage(image.data, width, height, channel * width, QImage.Format_RGBX8888)
+            self.signals.finished.emit(self.key, qimage, image)
+        except Exception as e:
+            self.signals.failed.emit(self.key, str(e))
+
 class Window(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -26,18 +92,20 @@ class Window(QMainWindow):
         self.height = 240
         self.current_label: Optional[QLabel] = None
         
-        # Pattern categories and their specific options
-        self.pattern_categories = {
-            "Solid Color": ["red", "green", "blue", "white", "black", "gray16", "gray32", "gray64", 
-                          "gray128", "yellow", "magenta", "cyan"],
-            "Grayscale": ["normal", "reversed"],
-            "Crosstalk": [
-                "white_black", "gray32_black", "black_blue", "black_cyan",
-                "gray32_white", "black_gray32", "green_gray32", "magenta_gray32",
-                "red_gray32", "yellow_gray32"
-            ],
-            "Grid": ["1x2", "1x16", "2x1", "3x32", "6x1", "6x16", "6x32"]
-        }
+        # Generators are reused per resolution; rendering happens on the thread pool
+        self.generators: Dict[Tuple[int, int], PatternGenerator] = {}
+        self.preview_cache = PreviewCache()
+        self.thread_pool = QThreadPool.globalInstance()
+        self.pending_key: Optional[Hashable] = None
+        self.pending_category = ""
+        
+        # Patterns come from the generator (the built-in set or a loaded suite), grouped by category
+        self.suite: Optional[PatternSuite] = None
+        # Bumped on every suite switch, so previews of a replaced suite are never reused,
+        # even when a reloaded or different suite has the same name
+        self.suite_generation = 0
+        self.pattern_categories: Dict[str, List[str]] = {}
+        self.pattern_dropdown: Optional[QComboBox] = None
 
         self.icons = {
             "window": "./icon/window.png",
@@ -74,10 +142,12 @@ class Window(QMainWindow):
         form_layout.addRow("Width:", self.width_input)
         form_layout.addRow("Height:", self.height_input)
         self.main_layout.addLayout(form_layout)
+        # Some pattern names depend on the resolution (e.g. 1x1920A)
+        self.width_input.editingFinished.connect(self.refresh_pattern_categories)
+        self.height_input.editingFinished.connect(self.refresh_pattern_categories)
 
         # Pattern category selection
         self.category_dropdown = QComboBox()
-        self.category_dropdown.addItems(self.pattern_categories.keys())
         self.category_dropdown.currentTextChanged.connect(self.on_category_changed)
         self.main_layout.addWidget(QLabel("Select Pattern Category:"))
         self.main_layout.addWidget(self.category_dropdown)
@@ -93,11 +163,52 @@ class Window(QMainWindow):
         display_button.clicked.connect(self.display_selected_pattern)
         self.main_layout.addWidget(display_button)
 
+        # Busy indicator shown while a pattern renders in the background
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.hide()
+        self.main_layout.addWidget(self.progress_bar)
+
         main_widget.setLayout(self.main_layout)
         self.setCentralWidget(main_widget)
 
-        # Initialize the options for the first category
+        # Fill the categories and the options for the first one
+        self.refresh_pattern_categories()
+
+    def entered_resolution(self) -> Optional[Tuple[int, int]]:
+        """Return the entered (width, height), or None if either is not a positive number"""
+        width, height = self.width_input.text(), self.height_input.text()
+        if not width.isdigit() or not height.isdigit() or int(width) == 0 or int(height) == 0:
+            return None
+        return int(width), int(height)
+
+    def generator_for(self, width: int, height: int) -> PatternGenerator:
+        """Return the generator for a resolution, creating it on first use"""
+        generator = self.generators.get((width, height))
+        if generator is None:
+            generator = PatternGenerator(width=width, height=height, channel_order="rgbx", suite=self.suite)
+            self.generators[(width, height)] = generator
+        return generator
+
+    def refresh_pattern_categories(self):
+        """Rebuild the category list from the generator's patterns, keeping the selection where possible"""
+        width, height = self.entered_resolution() or DEFAULT_LIST_RESOLUTION
+        categories = self.generator_for(width, height).pattern_categories(preview=True)
+        if categories == self.pattern_categories:
+            return
+        selected_category = self.category_dropdown.currentText()
+        selected_pattern = self.selected_pattern_name()
+        self.pattern_categories = categories
+        self.category_dropdown.blockSignals(True)
+        self.category_dropdown.clear()
+        self.category_dropdown.addItems(categories.keys())
+        if selected_category in categories:
+            self.category_dropdown.setCurrentText(selected_category)
+        self.category_dropdown.blockSignals(False)
         self.on_category_changed(self.category_dropdown.currentText())
+        if self.pattern_dropdown is not None and selected_pattern:
+            self.pattern_dropdown.setCurrentText(selected_pattern)
 
     def clear_options_layout(self):
         """Clear all widgets from the options layout"""
@@ -107,57 +218,44 @@ class Window(QMainWindow):
                 child.widget().deleteLater()
 
     def on_category_changed(self, category):
-        """Update the options based on the selected category"""
+        """List the patterns of the selected category"""
         self.clear_options_layout()
+        self.pattern_dropdown = None
+        if category not in self.pattern_categories:
+            return
+
+        self.options_layout.addWidget(QLabel("Select Pattern:"))
+        self.pattern_dropdown = QComboBox()
+        self.pattern_dropdown.addItems(self.pattern_categories[category])
+        self.pattern_dropdown.setObjectName("pattern_dropdown")
+        self.options_layout.addWidget(self.pattern_dropdown)
+
+    def selected_pattern_name(self) -> str:
+        """Return the name of the selected pattern, or an empty string if there is none"""
+        return self.pattern_dropdown.currentText() if self.pattern_dropdown is not None else ""
+
+    def load_pattern_suite(self):
+        """Replace the built-in patterns with a suite chosen from a file"""
+        path, _ = QFileDialog.getOpenFileName(self, "Load Pattern Suite", "",
+                                              "Pattern suites (*.json *.yaml *.yml)")
+        if not path:
+            return
+        try:
+            suite = load_suite(path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load pattern suite {path}: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to load pattern suite: {e}")
+            return
+        self.use_suite(suite)
 
-        if category == "Solid Color":
-            self.options_layout.addWidget(QLabel("Select Color:"))
-            color_dropdown = QComboBox()
-            color_dropdown.addItems(self.pattern_categories[category])
-            color_dropdown.setObjectName("color_dropdown")
-            self.options_layout.addWidget(color_dropdown)
-
-        elif category == "Grayscale":
-            reversed_check = QCheckBox("Reversed")
-            reversed_check.setObjectName("reversed_check")
-            self.options_layout.addWidget(reversed_check)
-
-        elif category == "Crosstalk":
-            self.options_layout.addWidget(QLabel("Select Combination:"))
-            combo_dropdown = QComboBox()
-            combo_dropdown.addItems(self.pattern_categories[category])
-            combo_dropdown.setObjectName("combo_dropdown")
-            self.options_layout.addWidget(combo_dropdown)
-
-        elif category == "Grid":
-            self.options_layout.addWidget(QLabel("Select Grid Pattern:"))
-            grid_dropdown = QComboBox()
-            grid_dropdown.addItems(self.pattern_categories[category])
-            grid_dropdown.setObjectName("grid_dropdown")
-            self.options_layout.addWidget(grid_dropdown)
-
-    def get_selected_options(self):
-        """Get the currently selected options based on the pattern category"""
-        category = self.category_dropdown.currentText()
-        options = {}
-
-        for i in range(self.options_layout.count()):
-            widget = self.options_layout.itemAt(i).widget()
-            if widget is None:
-                continue
-
-            if category == "Solid Color" and widget.objectName() == "color_dropdown":
-                options["color"] = widget.currentText()
-            elif category == "Grayscale" and widget.objectName() == "reversed_check":
-                options["reversed"] = widget.isChecked()
-            elif category == "Crosstalk" and widget.objectName() == "combo_dropdown":
-                bg_color, fg_color = widget.currentText().split("_")
-                options["background_color"] = bg_color
-                options["box_color"] = fg_color
-            elif category == "Grid" and widget.objectName() == "grid_dropdown":
-                options["pattern"] = widget.currentText()
-
-        return options
+    def use_suite(self, suite: Optional[PatternSuite]):
+        """Switch to a pattern suite, or back to the built-in patterns with None"""
+        self.suite = suite
+        self.suite_generation += 1
+        self.generators.clear()
+        self.preview_cache.clear()
+        self.refresh_pattern_categories()
+        self.statusBar().showMessage(f"Using pattern suite {suite.name}" if suite else "Using built-in patterns")
 
     def display_selected_pattern(self):
         width = self.width_input.text()
@@ -169,39 +267,59 @@ class Window(QMainWindow):
 
         width = int(width)
         height = int(height)
+        generator = self.generator_for(width, height)
 
         try:
-            # Create pattern generator
-            generator = PatternGenerator(width=width, height=height)
-            
-            # Generate pattern based on category and options
             category = self.category_dropdown.currentText()
-            options = self.get_selected_options()
-            
-            if category == "Solid Color":
-                image = generator.generate_solid_color(options["color"], save=False)
-            elif category == "Grayscale":
-                image = generator.generate_grayscale(reversed=options.get("reversed", False), save=False)
-            elif category == "Crosstalk":
-                image = generator.generate_crosstalk(
-                    background_color=options["background_color"],
-                    box_color=options["box_color"],
-                    save=False
-                )
-            elif category == "Grid":
-                pattern = options["pattern"]
-                rows, cols = map(int, pattern.split("x"))
-                image = generator.generate_grid(
-                    rows=rows,
-                    cols=cols,
-                    save=False
-                )
-
-            # Convert OpenCV image (BGR) to QImage (RGB)
-            height, width, channel = image.shape
-            bytes_per_line = 3 * width
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            qimage = QImage(image_rgb.data, width, height, bytes_per_line, QImage.Format_RGB888)
+            spec = generator.get_spec(self.selected_pattern_name())
+        except Exception as e:
+            logger.error(f"Error displaying pattern: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to display pattern: {e}")
+            return
+
+        key = (width, height, self.suite_generation, spec.name)
+        qimage = self.preview_cache.get(key)
+        if qimage is not None:
+            self.pending_key = None
+            self.progress_bar.hide()
+            self.statusBar().clearMessage()
+            self.show_preview(qimage, category)
+            return
+
+        self.pending_key = key
+        self.pending_category = category
+
+        task = RenderTask(key, generator, spec)
+        task.signals.finished.connect(self.on_render_finished)
+        task.signals.failed.connect(self.on_render_failed)
+        self.progress_bar.show()
+        self.statusBar().showMessage(f"Rendering {spec.name} at {width}x{height}...")
+        self.thread_pool.start(task)
+
+    def on_render_finished(self, key, qimage: QImage, buffer: np.ndarray):
+        """Cache a rendered preview and show it if it is still the one requested"""
+        self.preview_cache.put(key, qimage, buffer)
+        if key != self.pending_key:
+            return
+        self.pending_key = None
+        self.progress_bar.hide()
+        self.statusBar().clearMessage()
+        self.show_preview(qimage, self.pending_category)
+
+    def on_render_failed(self, key, message: str):
+        """Report a failed render if it is still the one requested"""
+        logger.error(f"Error displaying pattern: {message}")
+        if key != self.pending_key:
+            return
+        self.pending_key = None
+        self.progress_bar.hide()
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"Failed to display pattern: {message}")
+
+    def show_preview(self, qimage: QImage, category: str):
+        """Show a rendered pattern in a new window"""
+        try:
+            width, height = qimage.width(), qimage.height()
 
             # Create a new window to display the image
             image_window = QDialog(self)
@@ -224,6 +342,12 @@ class Window(QMainWindow):
         fileMenu = mainMenu.addMenu('File')
         helpMenu = mainMenu.addMenu('Help')
 
+        # Pattern suite buttons
+        self.addMenuAction(fileMenu, 'Load Pattern Suite...', None, 'Ctrl+O',
+                          'Replace the built-in patterns with a JSON or YAML suite', self.load_pattern_suite)
+        self.addMenuAction(fileMenu, 'Use Built-in Patterns', None, None,
+                          'Go back to the built-in patterns', lambda: self.use_suite(None))
+
         # Exit button
         self.addMenuAction(fileMenu, 'Exit', self.icons["exit"], 'Ctrl+Q', 
                           'Exit application', self.close)
@@ -234,7 +358,7 @@ class Window(QMainWindow):
 
     def addMenuAction(self, menu, name, icon_path, shortcut, status_tip, callback):
         try:
-            action = QAction(QIcon(icon_path) if icon_path else None, name, self)
+            action = QAction(QIcon(icon_path), name, self) if icon_path else QAction(name, self)
             if shortcut:
                 action.setShortcut(shortcut)
             action.setStatusTip(status_tip)
@@ -254,6 +378,7 @@ class Window(QMainWindow):
         event.accept()
 
 def main():
+    logging.basicConfig(level=logging.INFO)
     try:
         app = QApplication(sys.argv)
         window = Window()
@@ -2,96 +2,535 @@ import cv2
 import os
 import logging
 import sys
-from typing import List, Set, Optional
+import argparse
+import itertools
+import queue
+import threading
+import time
+import csv
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, NamedTuple, Set, Optional, Tuple, Union
+
+import numpy as np
+
+from pattern_generator import PatternGenerator, parse_resolution
+from frame_store import FrameStore
+from pattern_suite import load_suite
+from pattern_sequence import load_dwell_schedule
+from pattern_animation import AnimatedPattern, FrameRing, DEFAULT_RING_SLOTS, standard_animations
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Debug info OpenCV version
-logger.info(f"OpenCV version: {cv2.__version__}")
+# Default memory budget for decoded frames kept by the viewer
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Default frame rate animated patterns are played at
+DEFAULT_FPS = 60.0
+
+
+class FrameCache:
+    """Least recently used cache of decoded frames, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._frames: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return a cached frame and mark it as recently used, or None if not cached."""
+        frame = self._frames.get(key)
+        if frame is not None:
+            self._frames.move_to_end(key)
+        return frame
+
+    def put(self, key: str, frame: np.ndarray) -> None:
+        """Add a frame, evicting least recently used frames to stay within budget."""
+        if frame.nbytes > self.max_bytes:
+            return
+        if key in self._frames:
+            self.current_bytes -= self._frames.pop(key).nbytes
+        while self._frames and self.current_bytes + frame.nbytes > self.max_bytes:
+            _, evicted = self._frames.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+        self._frames[key] = frame
+        self.current_bytes += frame.nbytes
+
+
+class FramePrefetcher:
+    """Loads upcoming frames on a background thread while the current one is on screen."""
+
+    def __init__(self, load: Callable[[str], Optional[np.ndarray]], image_paths: List[str], depth: int = 2):
+        """
+        Args:
+            load: Function returning the frame for a path, or None if it cannot be loaded
+            image_paths: Paths to load, cycled through in order forever
+            depth: Maximum number of frames loaded ahead of the one being displayed
+        """
+        self.load = load
+        self.image_paths = image_paths
+        self._queue: "queue.Queue[Tuple[str, Optional[np.ndarray], float]]" = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+
+    def _run(self) -> None:
+        for image_path in itertools.cycle(self.image_paths):
+            start = time.perf_counter()
+            try:
+                image = self.load(image_path)
+            except Exception as e:
+                logger.error(f"Error loading {image_path}: {e}")
+                image = None
+            load_seconds = time.perf_counter() - start
+            # Wait for room in the queue, checking regularly whether to stop
+            while not self._stop.is_set():
+                try:
+                    self._queue.put((image_path, image, load_seconds), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if self._stop.is_set():
+                return
+
+    def start(self) -> None:
+        """Start loading frames in the background."""
+        self._thread.start()
+
+    def get(self) -> Tuple[str, Optional[np.ndarray], float]:
+        """Return the next (path, frame, load seconds) tuple, waiting if it is not loaded yet."""
+        return self._queue.get()
+
+    def stop(self) -> None:
+        """Stop the background thread and wait for it to finish."""
+        self._stop.set()
+        self._thread.join()
+
+
+class FrameTiming(NamedTuple):
+    """Timing of one displayed frame, in milliseconds."""
+    pattern: str
+    cycle: int
+    # Requested dwell time
+    dwell_ms: float
+    # Time spent reading and decoding (or rendering) the frame
+    load_ms: float
+    # Time from the end of the previous dwell until imshow returned
+    switch_ms: float
+    # Time from imshow returning until the next frame replaced it or the display closed
+    on_screen_ms: float
+
+
+class AnimationStats(NamedTuple):
+    """Playback of one animated pattern over its dwell."""
+    pattern: str
+    cycle: int
+    target_fps: float
+    achieved_fps: float
+    # Frames shown, and frames whose time slot passed before they could be shown
+    frames: int
+    dropped: int
+    seconds: float
+    # Mean time spent rendering a frame into the ring
+    render_ms: float
+
+
+def write_timings(timings: List[Union[FrameTiming, AnimationStats]], path: str) -> None:
+    """
+    Export frame timings or animation stats as JSON (for a .json path) or CSV.
+
+    Args:
+        timings: Timings or animation stats recorded by PatternViewer.display_patterns
+        path: Output file path
+    """
+    fields = type(timings[0])._fields if timings else FrameTiming._fields
+    with open(path, "w", newline="") as f:
+        if path.lower().endswith(".json"):
+            json.dump([timing._asdict() for timing in timings], f, indent=1)
+        else:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            writer.writerows(timings)
+    logger.info(f"Wrote {len(timings)} records to {path}")
+
 
 class PatternViewer:
-    def __init__(self, pattern_dir: str, specified_patterns: Optional[List[str]] = None):
+    def __init__(self, pattern_dir: Optional[str] = None, specified_patterns: Optional[List[str]] = None,
+                 generator: Optional[Union[PatternGenerator, FrameStore]] = None, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 prefetch: int = 2, dwell_ms: float = 1000, schedule: Optional[Dict[str, float]] = None,
+                 cycles: int = 0, animations: Optional[Dict[str, AnimatedPattern]] = None,
+                 fps: float = DEFAULT_FPS, ring_slots: int = DEFAULT_RING_SLOTS):
+        """
+        Set up a viewer that shows patterns from a directory or straight from a generator.
+
+        Args:
+            pattern_dir: Directory of pattern files (file mode)
+            specified_patterns: Filenames (file mode) or pattern names (generator mode) to show;
+                all patterns are shown if empty
+            generator: Generator to render patterns from in memory, or a frame store to map
+                them from, instead of reading image files
+            cache_bytes: Memory budget for decoded or rendered frames kept between cycles
+            prefetch: Number of upcoming frames to load on a background thread; 0 loads
+                each frame synchronously when it is due
+            dwell_ms: Default time each pattern stays on screen, in milliseconds
+            schedule: Per-pattern dwell times in milliseconds, keyed by pattern name,
+                filename or filename without extension
+            cycles: Number of passes over the patterns before stopping; 0 loops until ESC
+            animations: Animated patterns by name (see pattern_animation.py), shown after
+                the static patterns and played for their dwell time at ``fps``
+            fps: Frame rate animated patterns are played at
+            ring_slots: Number of preallocated buffers animation frames are rendered into
+        """
+        if pattern_dir is None and generator is None:
+            raise ValueError("Either a pattern directory or a generator is required")
+        if fps <= 0:
+            raise ValueError(f"fps must be positive, got {fps}")
         self.pattern_dir = pattern_dir
+        self.generator = generator
         self.image_paths: List[str] = []
         self.window_name = "test patterns"
         self.valid_extensions: Set[str] = {".bmp", ".jpeg", ".png", ".tif", ".tiff"}
         self.specified_patterns = specified_patterns if specified_patterns else []
+        self.frame_cache = FrameCache(cache_bytes)
+        self.prefetch = prefetch
+        self.dwell_ms = dwell_ms
+        self.schedule = schedule if schedule else {}
+        self.cycles = cycles
+        self.timings: List[FrameTiming] = []
+        self.animations = animations if animations else {}
+        self.fps = fps
+        self.ring_slots = ring_slots
+        self.animation_stats: List[AnimationStats] = []
+        # Rings by frame shape and dtype, allocated once and reused by every animation pass
+        self._rings: Dict[Tuple[Tuple[int, ...], str], FrameRing] = {}
 
     def load_image_paths(self) -> None:
-        """Load all valid image paths from the pattern directory."""
+        """
+        Load all valid image paths from the pattern directory, or pattern names from the generator,
+        followed by the names of the animated patterns.
+        """
+        if self.generator is not None:
+            self.image_paths = self.generator.pattern_names()
+            logger.info(f"Found {len(self.image_paths)} patterns in generator")
+        else:
+            try:
+                for file in os.listdir(self.pattern_dir):
+                    extension = os.path.splitext(file)[1].lower()
+                    if extension in self.valid_extensions:
+                        self.image_paths.append(os.path.join(self.pattern_dir, file))
+                logger.info(f"Found {len(self.image_paths)} valid pattern files")
+            except FileNotFoundError:
+                logger.error(f"Pattern directory {self.pattern_dir} not found")
+                raise
+        if self.animations:
+            self.image_paths += list(self.animations)
+            logger.info(f"Added {len(self.animations)} animated patterns")
+
+    def load_frame(self, image_path: str) -> Optional[np.ndarray]:
+        """
+        Return the frame for a pattern, decoding or rendering it only on first use.
+
+        Args:
+            image_path: Path of the pattern file, or pattern name in generator mode
+
+        Returns:
+            The frame, or None if it could not be loaded or is an animated pattern
+        """
+        if image_path in self.animations:
+            # Animated patterns are rendered frame by frame while they play
+            return None
+        if isinstance(self.generator, FrameStore):
+            # Frames are mapped straight from the store; there is nothing to decode or cache
+            image = self.generator.get(image_path)
+            if self.generator.channel_order != "bgr":
+                image = np.ascontiguousarray(image[..., 2::-1])
+            return image
+        # Rendered frames, uniform ones included, are kept within the cache's byte budget
+        image = self.frame_cache.get(image_path)
+        if image is None:
+            if self.generator is not None:
+                image = self.generator.render(image_path)
+            else:
+                image = cv2.imread(image_path)
+            if image is not None:
+                self.frame_cache.put(image_path, image)
+        return image
+
+    def dwell_for(self, image_path: str) -> float:
+        """Return the dwell time in milliseconds for a pattern path or name."""
+        filename = os.path.basename(image_path)
+        for key in (image_path, filename, os.path.splitext(filename)[0]):
+            if key in self.schedule:
+                return self.schedule[key]
+        return self.dwell_ms
+
+    def iter_frames(self) -> Iterator[Tuple[str, Optional[np.ndarray], float]]:
+        """
+        Yield (path, frame, load seconds) tuples in display order, cycling forever.
+
+        With prefetching enabled, frames are loaded on a background thread that
+        runs ahead of the display by up to ``self.prefetch`` frames, so switching
+        patterns does not wait for decoding or rendering.
+        """
+        if self.prefetch <= 0:
+            while True:
+                for image_path in self.image_paths:
+                    start = time.perf_counter()
+                    image = self.load_frame(image_path)
+                    yield image_path, image, time.perf_counter() - start
+
+        prefetcher = FramePrefetcher(self.load_frame, self.image_paths, self.prefetch)
+        prefetcher.start()
         try:
-            for file in os.listdir(self.pattern_dir):
-                extension = os.path.splitext(file)[1].lower()
-                if extension in self.valid_extensions:
-                    self.image_paths.append(os.path.join(self.pattern_dir, file))
-            logger.info(f"Found {len(self.image_paths)} valid pattern files")
-        except FileNotFoundError:
-            logger.error(f"Pattern directory {self.pattern_dir} not found")
-            raise
+            while True:
+                yield prefetcher.get()
+        finally:
+            prefetcher.stop()
 
     def create_window(self) -> None:
         """Create fullscreen window for pattern display."""
         cv2.namedWindow(self.window_name, cv2.WND_PROP_FULLSCREEN)
         cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
+    def _ring_for(self, animation: AnimatedPattern) -> FrameRing:
+        """Return the ring for an animation's frames, allocating it on first use."""
+        key = (tuple(animation.shape), animation.dtype.str)
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = FrameRing(animation.shape, animation.dtype, self.ring_slots)
+            logger.info(f"Allocated {len(ring.buffers)} animation buffers ({ring.nbytes / 1e6:.1f} MB)")
+        return ring
+
+    def play_animation(self, name: str, cycle: int, dwell_ms: float) -> Tuple[float, bool]:
+        """
+        Play an animated pattern for its dwell time at ``self.fps``.
+
+        Frame N is due ``N / fps`` seconds after the first one. When rendering
+        and showing a frame overruns its slot, the frames whose slots have
+        passed are dropped and the frame due now is shown instead, so motion
+        keeps to wall-clock time. Every frame is rendered into a slot of a
+        preallocated ring, so playback allocates no frame memory. The outcome
+        is appended to ``self.animation_stats`` and logged.
+
+        Args:
+            name: Name of the animated pattern
+            cycle: Pass over the patterns the animation is shown in
+            dwell_ms: Time the animation plays for, in milliseconds
+
+        Returns:
+            (time the first frame went up, whether ESC was pressed) tuple
+        """
+        animation = self.animations[name]
+        ring = self._ring_for(animation)
+        interval = 1 / self.fps
+        index = shown = dropped = 0
+        render_seconds = 0.0
+        escaped = False
+        start = end = None
+        while True:
+            render_start = time.perf_counter()
+            if start is not None:
+                # Skip frames whose slot has already passed
+                due = int((render_start - start) / interval)
+                if due > index:
+                    dropped += due - index
+                    index = due
+            frame = ring.render(animation, index)
+            render_seconds += time.perf_counter() - render_start
+            cv2.imshow(self.window_name, frame)
+            if start is None:
+                start = time.perf_counter()
+                end = start + dwell_ms / 1000
+            shown += 1
+            index += 1
+
+            # Wait for the next frame's slot or the end of the dwell, handling window events, or until ESC
+            remaining = min(start + index * interval, end) - time.perf_counter()
+            if cv2.waitKey(max(1, int(remaining * 1000))) == 27:  # ESC key
+                escaped = True
+                break
+            if time.perf_counter() >= end:
+                break
+
+        seconds = time.perf_counter() - start
+        stats = AnimationStats(name, cycle, self.fps, shown / seconds, shown, dropped, seconds,
+                               render_seconds * 1000 / shown)
+        self.animation_stats.append(stats)
+        logger.info(f"{name}: {stats.frames} frames in {stats.seconds:.2f} s, {stats.achieved_fps:.1f} of "
+                    f"{stats.target_fps:g} fps, {stats.dropped} dropped, {stats.render_ms:.2f} ms per render")
+        return start, escaped
+
     def display_patterns(self) -> None:
         """Display specified patterns in a loop until ESC is pressed."""
         if not self.image_paths:
             logger.error("No valid pattern files found")
             sys.exit(1)
 
-        if self.specified_patterns:
-            # Check if specified patterns contain valid files and exit if any do not exist 
-            for pattern in self.specified_patterns:
-                if not os.path.isfile(os.path.join(self.pattern_dir, pattern)):
-                    logger.error(f"Specified pattern file does not exist: {pattern}")
-                    sys.exit(1)
-            self.image_paths = [path for path in self.image_paths if os.path.basename(path) in self.specified_patterns]
+        if self.generator is not None:
+            if self.specified_patterns:
+                # Check if specified patterns exist in the generator and exit if any do not
+                for pattern in self.specified_patterns:
+                    if pattern not in self.image_paths:
+                        logger.error(f"Specified pattern does not exist: {pattern}")
+                        sys.exit(1)
+                self.image_paths = [name for name in self.image_paths if name in self.specified_patterns]
+        else:
+            if self.specified_patterns:
+                # Check if specified patterns contain valid files and exit if any do not exist 
+                for pattern in self.specified_patterns:
+                    if pattern not in self.animations and not os.path.isfile(os.path.join(self.pattern_dir, pattern)):
+                        logger.error(f"Specified pattern file does not exist: {pattern}")
+                        sys.exit(1)
+                self.image_paths = [path for path in self.image_paths if os.path.basename(path) in self.specified_patterns]
 
-        # Check if each path is valid
-        for image_path in self.image_paths:
-            if not os.path.isfile(image_path):
-                logger.error(f"Invalid pattern file path: {image_path}")
-                sys.exit(1)
+            # Check if each path is valid
+            for image_path in self.image_paths:
+                if image_path not in self.animations and not os.path.isfile(image_path):
+                    logger.error(f"Invalid pattern file path: {image_path}")
+                    sys.exit(1)
 
         self.create_window()
         
+        frames = self.iter_frames()
+        self.timings = []
+        self.animation_stats = []
+        pending: Optional[FrameTiming] = None
+        shown_at = None
+        # The previous frame's dwell ends here; the switch to the next frame starts
+        dwell_end = time.perf_counter()
         try:
-            while True:
-                for image_path in self.image_paths:
-                    image = cv2.imread(image_path)
-                    
-                    if image is None:
-                        logger.error(f"Error loading: {image_path}")
-                        continue
-                        
-                    cv2.imshow(self.window_name, image)
+            for index, (image_path, image, load_seconds) in enumerate(frames):
+                cycle = index // len(self.image_paths)
+                if self.cycles and cycle >= self.cycles:
+                    return
+                if image_path in self.animations:
+                    dwell_ms = self.dwell_for(image_path)
+                    first_shown_at, escaped = self.play_animation(image_path, cycle, dwell_ms)
+                    # The animation replaced the previous frame when its first frame went up
+                    if pending is not None:
+                        self.timings.append(pending._replace(on_screen_ms=(first_shown_at - shown_at) * 1000))
+                        pending = None
+                    self.timings.append(FrameTiming(image_path, cycle, dwell_ms, self.animation_stats[-1].render_ms,
+                                                    (first_shown_at - dwell_end) * 1000,
+                                                    (time.perf_counter() - first_shown_at) * 1000))
+                    if escaped:
+                        return
+                    dwell_end = time.perf_counter()
+                    continue
+                if image is None:
+                    logger.error(f"Error loading: {image_path}")
+                    continue
                     
-                    # Wait for 1 second or ESC key
-                    if cv2.waitKey(1000) == 27:  # ESC key
-                        cv2.destroyWindow(self.window_name)
+                cv2.imshow(self.window_name, image)
+                now = time.perf_counter()
+                if pending is not None:
+                    self.timings.append(pending._replace(on_screen_ms=(now - shown_at) * 1000))
+                shown_at = now
+                dwell_ms = self.dwell_for(image_path)
+                pending = FrameTiming(image_path, cycle, dwell_ms, load_seconds * 1000,
+                                      (now - dwell_end) * 1000, 0.0)
+                
+                # Wait out the dwell, measured from when the frame went up, or until ESC.
+                # Other keys do not cut the dwell short.
+                deadline = shown_at + dwell_ms / 1000
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    if cv2.waitKey(max(1, int(remaining * 1000))) == 27:  # ESC key
                         return
-                        
+                dwell_end = time.perf_counter()
+                    
         except KeyboardInterrupt:
             logger.info("Pattern display interrupted by user")
         finally:
+            frames.close()
             cv2.destroyWindow(self.window_name)
+            if pending is not None:
+                self.timings.append(pending._replace(on_screen_ms=(time.perf_counter() - shown_at) * 1000))
 
 def main():
-    if len(sys.argv) < 2:
+    logging.basicConfig(level=logging.INFO)
+    # Debug info OpenCV version
+    logger.info(f"OpenCV version: {cv2.__version__}")
+
+    parser = argparse.ArgumentParser(description='Display test patterns in a loop until ESC is pressed.')
+    parser.add_argument('pattern_dir', nargs='?', default=None,
+                        help='Directory containing pattern files')
+    parser.add_argument('patterns', nargs='*',
+                        help='Pattern filenames (or pattern names with --resolution) to display')
+    parser.add_argument('--resolution', type=str, default=None,
+                        help='Render patterns in memory at WIDTHxHEIGHT instead of reading files')
+    parser.add_argument('--suite', type=str, default=None,
+                        help='JSON or YAML pattern suite to render with --resolution instead of the built-in set')
+    parser.add_argument('--store', type=str, default=None,
+                        help='Show frames from a raw frame store directory instead of image files')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                        help='Memory budget for decoded frames kept between cycles')
+    parser.add_argument('--prefetch', type=int, default=2,
+                        help='Number of upcoming frames to load in the background (0 = load when due)')
+    parser.add_argument('--dwell', type=float, default=1000,
+                        help='Default time each pattern stays on screen, in milliseconds')
+    parser.add_argument('--schedule', type=str, default=None,
+                        help='JSON or CSV file with per-pattern dwell times in milliseconds')
+    parser.add_argument('--cycles', type=int, default=0,
+                        help='Number of passes over the patterns before exiting (0 = until ESC)')
+    parser.add_argument('--timing-out', type=str, default=None,
+                        help='Write per-frame timings to this CSV or JSON file on exit')
+    parser.add_argument('--animate', action='store_true',
+                        help='Add the animated patterns (moving bars, scrolling gradient, flicker) '
+                             'to the patterns shown with --resolution')
+    parser.add_argument('--fps', type=float, default=DEFAULT_FPS,
+                        help='Frame rate animated patterns are played at')
+    parser.add_argument('--animation-stats', type=str, default=None,
+                        help='Write achieved frame rates and dropped frames of every animation '
+                             'pass to this CSV or JSON file on exit')
+    args = parser.parse_args()
+    if args.suite and not args.resolution:
+        parser.error("--suite needs --resolution to render the suite's patterns")
+    if args.animate and (args.store or not args.resolution):
+        parser.error("--animate needs --resolution, without --store, to render the animated patterns")
+    if args.fps <= 0:
+        parser.error("--fps must be positive")
+
+    options = {
+        "cache_bytes": args.cache_mb * 1024 * 1024,
+        "prefetch": args.prefetch,
+        "dwell_ms": args.dwell,
+        "schedule": load_dwell_schedule(args.schedule) if args.schedule else None,
+        "cycles": args.cycles,
+        "fps": args.fps
+    }
+
+    if args.store:
+        # Without a directory, every positional argument is a pattern name
+        specified_patterns = ([args.pattern_dir] if args.pattern_dir else []) + args.patterns
+        viewer = PatternViewer(specified_patterns=specified_patterns, generator=FrameStore(args.store),
+                               **options)
+    elif args.resolution:
+        # Without a directory, every positional argument is a pattern name
+        specified_patterns = ([args.pattern_dir] if args.pattern_dir else []) + args.patterns
+        width, height = parse_resolution(args.resolution)
+        suite = load_suite(args.suite) if args.suite else None
+        generator = PatternGenerator(width, height, suite=suite)
+        animations = standard_animations(generator) if args.animate else None
+        viewer = PatternViewer(specified_patterns=specified_patterns, generator=generator,
+                               animations=animations, **options)
+    elif args.pattern_dir:
+        viewer = PatternViewer(pattern_dir=args.pattern_dir, specified_patterns=args.patterns, **options)
+    else:
         logger.error("Please specify the pattern directory as a command line argument.")
         sys.exit(1)
 
-    pattern_directory = sys.argv[1]  # Get the pattern directory from command line argument
-    specified_patterns = sys.argv[2:] if len(sys.argv) > 2 else None  # Get specified patterns from command line arguments
-    viewer = PatternViewer(pattern_dir=pattern_directory, specified_patterns=specified_patterns)
     try:
         viewer.load_image_paths()
         viewer.display_patterns()
     except Exception as e:
         logger.error(f"Error running pattern viewer: {e}")
+    finally:
+        if args.timing_out and viewer.timings:
+            write_timings(viewer.timings, args.timing_out)
+        if args.animation_stats and viewer.animation_stats:
+            write_timings(viewer.animation_stats, args.animation_stats)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Panel Layouts
+
+This module models the physical subpixel layout of a display panel, so
+patterns can address single subpixels instead of whole pixels. A layout is a
+small tile of pixels, each listing its subpixels left to right; the tile
+repeats over the panel. RGB stripe panels have three subpixels per pixel,
+PenTile panels alternate two-subpixel pixels (RG next to BG), and RGBW panels
+add white subpixels.
+
+Subpixel index maps (the source line, i.e. subpixel column, and the color of
+every subpixel) are computed once per layout and panel width and cached. They
+cover one tile of rows, so subpixel patterns are built as row templates with a
+single gather and mask over the map.
+"""
+
+import functools
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+# Subpixel colors, in the order color indices refer to
+SUBPIXEL_COLORS = "rgbw"
+
+# Input channels (R, G, B) that drive a subpixel of each color. White
+# subpixels are driven through equal R, G and B values; how a panel splits
+# those between its white and color subpixels is up to its controller.
+_COLOR_CHANNELS = np.array([
+    [True, False, False],
+    [False, True, False],
+    [False, False, True],
+    [True, True, True]
+])
+
+
+class PanelLayout(NamedTuple):
+    """Subpixel layout of a panel."""
+    name: str
+    # Tile of pixel rows; each pixel lists its subpixel colors left to right,
+    # e.g. (("rg", "bg"), ("bg", "rg")) for PenTile RGBG
+    tile: Tuple[Tuple[str, ...], ...]
+
+    @property
+    def colors(self) -> str:
+        """Subpixel colors present in the layout, in SUBPIXEL_COLORS order."""
+        present = set("".join("".join(row) for row in self.tile))
+        return "".join(color for color in SUBPIXEL_COLORS if color in present)
+
+
+# Built-in layouts by name
+PANEL_LAYOUTS: Dict[str, PanelLayout] = {
+    layout.name: layout for layout in [
+        PanelLayout("rgb_stripe", (("rgb",),)),
+        PanelLayout("bgr_stripe", (("bgr",),)),
+        PanelLayout("pentile_rgbg", (("rg", "bg"), ("bg", "rg"))),
+        PanelLayout("rgbw_stripe", (("rgbw",),)),
+        PanelLayout("pentile_rgbw", (("rg", "bw"), ("bw", "rg"))),
+    ]
+}
+
+
+class SubpixelMaps(NamedTuple):
+    """Index maps of one tile of rows at a panel width; arrays are (tile rows, width, subpixels per pixel)."""
+    # Subpixel column (source line) of every subpixel, counted from the left edge
+    column: np.ndarray
+    # Index into SUBPIXEL_COLORS of every subpixel
+    color: np.ndarray
+    # Input channels (R, G, B) driving every subpixel, with a trailing axis of 3
+    channels: np.ndarray
+
+
+def get_layout(layout: str) -> PanelLayout:
+    """
+    Look up a built-in panel layout by name.
+
+    Args:
+        layout: Name of the layout
+
+    Returns:
+        The panel layout
+    """
+    if layout not in PANEL_LAYOUTS:
+        raise ValueError(f"Panel layout {layout} not found. Available layouts: {list(PANEL_LAYOUTS)}")
+    return PANEL_LAYOUTS[layout]
+
+
+@functools.lru_cache(maxsize=16)
+def subpixel_maps(layout: PanelLayout, width: int) -> SubpixelMaps:
+    """
+    Compute the subpixel index maps of a layout at a panel width.
+
+    Maps are cached and shared between callers, so they are read-only.
+
+    Args:
+        layout: Panel layout
+        width: Panel width in pixels
+
+    Returns:
+        The index maps for one tile of rows
+    """
+    pixels = [pixel for row in layout.tile for pixel in row]
+    subpixels = len(pixels[0]) if pixels else 0
+    if not pixels or any(len(row) != len(layout.tile[0]) for row in layout.tile):
+        raise ValueError(f"Panel layout {layout.name} needs a rectangular, non-empty tile")
+    if any(len(pixel) != subpixels or set(pixel) - set(SUBPIXEL_COLORS) for pixel in pixels):
+        raise ValueError(f"Panel layout {layout.name}: every pixel needs the same number of "
+                         f"subpixels, each one of {list(SUBPIXEL_COLORS)}")
+
+    # Colors of one tile, then repeated across the width by gathering tile columns
+    tile = np.array([[[SUBPIXEL_COLORS.index(color) for color in pixel] for pixel in row]
+                     for row in layout.tile], np.int8)
+    color = tile[:, np.arange(width) % tile.shape[1]]
+    column = np.broadcast_to(np.arange(width * subpixels).reshape(1, width, subpixels), color.shape)
+    maps = SubpixelMaps(np.ascontiguousarray(column), color, _COLOR_CHANNELS[color])
+    for array in maps:
+        array.flags.writeable = False
+    return maps
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Animated Patterns
+
+This module describes moving test patterns for motion blur and response time
+testing: bars moving across the screen, scrolling gradients and flicker
+between colors. An animated pattern renders frame N of its motion into a
+buffer the caller owns, and a FrameRing holds a few preallocated buffers
+that frames are rendered into in turn, so playback at 60-240 fps allocates
+nothing per frame.
+
+Moving patterns keep one line of pixels along the direction of motion, stored
+twice end to end. Frame N is a window into that doubled line, offset by how
+far the pattern has moved, copied into the buffer with a single broadcast
+slice assignment (or, for vertical motion, a row gather with np.take into the
+buffer); nothing is rolled or tiled per frame. Copies always run over whole
+rows, since broadcasting single pixels copies a few bytes at a time.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pattern_generator import PatternGenerator
+
+# Buffers in a ring: one on screen, one being rendered and one spare
+DEFAULT_RING_SLOTS = 3
+
+# Moving patterns cross the screen in this many frames by default (2 s at 60 fps)
+DEFAULT_CROSSING_FRAMES = 120
+
+
+class AnimatedPattern:
+    """A pattern whose frames change over time, rendered frame by frame into caller-owned buffers."""
+
+    def __init__(self, name: str, shape: Tuple[int, int, int], dtype: np.dtype) -> None:
+        """
+        Args:
+            name: Name of the pattern
+            shape: Frame shape, (height, width, channels)
+            dtype: Sample type of the frames
+        """
+        self.name = name
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def period(self) -> int:
+        """Number of frames after which the animation repeats."""
+        raise NotImplementedError
+
+    def render_into(self, out: np.ndarray, index: int) -> None:
+        """
+        Render a frame into a buffer, without allocating.
+
+        Args:
+            out: Buffer of the pattern's shape and dtype
+            index: Frame number, counted from the start of the animation
+        """
+        raise NotImplementedError
+
+    def render(self, index: int) -> np.ndarray:
+        """Render a frame into a new array."""
+        out = np.empty(self.shape, self.dtype)
+        self.render_into(out, index)
+        return out
+
+
+class ScrollingPattern(AnimatedPattern):
+    """A pattern made of one line of pixels that moves along itself, wrapping around the screen."""
+
+    def __init__(self, name: str, line: np.ndarray, extent: int, speed: int, vertical: bool = False) -> None:
+        """
+        Args:
+            name: Name of the pattern
+            line: Pixels along the direction of motion, shape (length, channels); a
+                row for horizontal motion, a column for vertical motion
+            extent: Size of the screen across the motion (the height for
+                horizontal motion, the width for vertical motion)
+            speed: Pixels moved per frame; negative values move left or up
+            vertical: Whether the pattern moves down instead of right
+        """
+        length, channels = line.shape
+        super().__init__(name, (length, extent, channels) if vertical else (extent, length, channels), line.dtype)
+        self.length = length
+        self.speed = speed
+        self.vertical = vertical
+        if vertical:
+            # Each distinct color as a full row, and the doubled column as indices into them
+            colors, index = np.unique(line, axis=0, return_inverse=True)
+            self._rows = np.ascontiguousarray(np.broadcast_to(colors[:, np.newaxis], (len(colors), extent, channels)))
+            self._index = np.tile(index.ravel().astype(np.intp), 2)
+        else:
+            self._template = np.concatenate([line, line])[np.newaxis]
+
+    @property
+    def period(self) -> int:
+        return self.length // math.gcd(self.length, self.speed)
+
+    def render_into(self, out: np.ndarray, index: int) -> None:
+        # Moving by d pixels shows line[(x - d) % length] at x, a window starting at length - d
+        start = -index * self.speed % self.length
+        if self.vertical:
+            np.take(self._rows, self._index[start:start + self.length], axis=0, out=out, mode="clip")
+        else:
+            out[...] = self._template[:, start:start + self.length]
+
+
+class FlickerPattern(AnimatedPattern):
+    """Full-screen colors shown in turn, each for a fixed number of frames."""
+
+    def __init__(self, name: str, pixels: Sequence[Tuple[int, ...]], shape: Tuple[int, int, int],
+                 dtype: np.dtype, frames_per_color: int = 1) -> None:
+        """
+        Args:
+            name: Name of the pattern
+            pixels: Stored pixel values of the colors, in display order
+            shape: Frame shape, (height, width, channels)
+            dtype: Sample type of the frames
+            frames_per_color: Number of frames each color stays on screen
+        """
+        if len(pixels) < 2:
+            raise ValueError(f"Flicker needs at least two colors, got {len(pixels)}")
+        if frames_per_color < 1:
+            raise ValueError(f"frames_per_color must be at least 1, got {frames_per_color}")
+        super().__init__(name, shape, dtype)
+        self.frames_per_color = frames_per_color
+        # One full row per color, broadcast down the frame
+        self._rows = np.empty((len(pixels), shape[1], shape[2]), self.dtype)
+        self._rows[:] = np.array(pixels, self.dtype)[:, np.newaxis]
+
+    @property
+    def period(self) -> int:
+        return len(self._rows) * self.frames_per_color
+
+    def render_into(self, out: np.ndarray, index: int) -> None:
+        out[...] = self._rows[index // self.frames_per_color % len(self._rows)]
+
+
+class FrameRing:
+    """
+    Preallocated frame buffers that frames are rendered into in turn.
+
+    Frame N goes into buffer N modulo the number of slots, so the frames most
+    recently handed out stay intact while the next ones are rendered.
+    """
+
+    def __init__(self, shape: Tuple[int, int, int], dtype: np.dtype, slots: int = DEFAULT_RING_SLOTS) -> None:
+        """
+        Args:
+            shape: Frame shape, (height, width, channels)
+            dtype: Sample type of the frames
+            slots: Number of buffers
+        """
+        if slots < 1:
+            raise ValueError(f"slots must be at least 1, got {slots}")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.buffers: List[np.ndarray] = [np.empty(shape, dtype) for _ in range(slots)]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self.buffers)
+
+    def render(self, animation: AnimatedPattern, index: int) -> np.ndarray:
+        """
+        Render a frame of an animation into its slot.
+
+        Args:
+            animation: Animation of the ring's frame shape and dtype
+            index: Frame number
+
+        Returns:
+            The buffer holding the frame, valid until the ring comes round to its slot again
+        """
+        if animation.shape != self.shape or animation.dtype != self.dtype:
+            raise ValueError(f"{animation.name} renders {animation.shape} frames of {animation.dtype}, "
+                             f"the ring holds {self.shape} frames of {self.dtype}")
+        buffer = self.buffers[index % len(self.buffers)]
+        animation.render_into(buffer, index)
+        return buffer
+
+
+def moving_bar(generator: PatternGenerator, bar_size: Optional[int] = None, speed: Optional[int] = None,
+               color: str = "white", background: str = "black", vertical: bool = False) -> ScrollingPattern:
+    """
+    Describe a bar moving across the screen.
+
+    Args:
+        generator: Generator whose resolution, bit depth, channel order and colors the frames use
+        bar_size: Thickness of the bar in pixels, or None for 1/16 of the screen
+        speed: Pixels moved per frame, or None to cross the screen in DEFAULT_CROSSING_FRAMES frames
+        color: Name of the bar color
+        background: Name of the background color
+        vertical: Whether a horizontal bar moves down, instead of a vertical bar moving right
+
+    Returns:
+        The animated pattern
+    """
+    length, extent = (generator.height, generator.width) if vertical else (generator.width, generator.height)
+    bar_size = max(1, length // 16) if bar_size is None else bar_size
+    if not 1 <= bar_size <= length:
+        raise ValueError(f"bar_size must be between 1 and {length}, got {bar_size}")
+    line = np.empty((length, generator.channels), generator.dtype)
+    line[:] = generator.color_pixel(background)
+    line[:bar_size] = generator.color_pixel(color)
+    name = f"moving_bar_{'vertical_' if vertical else ''}{color}_on_{background}"
+    return ScrollingPattern(name, line, extent, _speed(speed, length), vertical)
+
+
+def scrolling_gradient(generator: PatternGenerator, speed: Optional[int] = None,
+                       levels: Optional[int] = None) -> ScrollingPattern:
+    """
+    Describe the horizontal grayscale gradient scrolling to the right.
+
+    Args:
+        generator: Generator whose resolution, bit depth and channel order the frames use
+        speed: Pixels moved per frame, or None to cross the screen in DEFAULT_CROSSING_FRAMES frames
+        levels: Number of grayscale levels, as for PatternGenerator.grayscale_rows
+
+    Returns:
+        The animated pattern
+    """
+    line = generator.grayscale_rows(levels).templates[0]
+    name = "scrolling_gradient" if levels is None else f"scrolling_gradient_{levels}"
+    return ScrollingPattern(name, line, generator.height, _speed(speed, generator.width))
+
+
+def flicker(generator: PatternGenerator, colors: Sequence[str] = ("white", "black"),
+            frames_per_color: int = 1) -> FlickerPattern:
+    """
+    Describe full-screen flicker between colors.
+
+    At a display rate of F fps, two colors shown for one frame each flicker at F / 2 Hz.
+
+    Args:
+        generator: Generator whose resolution, bit depth, channel order and colors the frames use
+        colors: Names of the colors, in display order
+        frames_per_color: Number of frames each color stays on screen
+
+    Returns:
+        The animated pattern
+    """
+    shape = (generator.height, generator.width, generator.channels)
+    name = f"flicker_{'_'.join(colors)}" + (f"_{frames_per_color}" if frames_per_color > 1 else "")
+    return FlickerPattern(name, [generator.color_pixel(color) for color in colors], shape,
+                          generator.dtype, frames_per_color)
+
+
+def _speed(speed: Optional[int], length: int) -> int:
+    """Default or check a speed in pixels per frame along a line of the given length."""
+    if speed is None:
+        return max(1, length // DEFAULT_CROSSING_FRAMES)
+    if speed == 0:
+        raise ValueError("speed must not be 0")
+    return speed
+
+
+def standard_animations(generator: PatternGenerator) -> Dict[str, AnimatedPattern]:
+    """
+    The built-in set of animated patterns at a generator's resolution.
+
+    Args:
+        generator: Generator whose resolution, bit depth, channel order and colors the frames use
+
+    Returns:
+        Dictionary of pattern names to animated patterns, in display order
+    """
+    animations = [
+        moving_bar(generator),
+        moving_bar(generator, vertical=True),
+        moving_bar(generator, color="gray128", background="gray64"),
+        scrolling_gradient(generator),
+        flicker(generator),
+        flicker(generator, ("red", "green", "blue")),
+    ]
+    return {animation.name: animation for animation in animations}
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pattern Cache
+
+This module keeps track of pattern files that have already been generated, so a
+rerun can skip patterns whose inputs have not changed instead of rendering and
+writing them again.
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from typing import Collection, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Name of the index file kept inside each output directory
+INDEX_FILENAME = ".pattern_cache.json"
+
+
+class PatternCache:
+    """
+    A content-addressed index of generated pattern files.
+
+    Each output directory holds an index mapping filenames to the cache key the
+    file was generated from, plus its size and modification time so files that
+    were edited or replaced on disk are not mistaken for cached artifacts. The
+    cache can also evict the least recently used files across all output
+    directories under its root to stay within a size budget.
+    """
+
+    def __init__(self, root: str = "patterns", max_bytes: Optional[int] = None) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            root: Directory containing the per-resolution output directories
+            max_bytes: Total size budget for cached files, or None for no limit
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._indexes: Dict[str, Dict[str, Dict]] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _index(self, output_dir: str) -> Dict[str, Dict]:
+        """Load (once) and return the index of an output directory."""
+        index = self._indexes.get(output_dir)
+        if index is None:
+            path = os.path.join(output_dir, INDEX_FILENAME)
+            try:
+                with open(path) as f:
+                    index = json.load(f)
+            except FileNotFoundError:
+                index = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable cache index {path}: {e}")
+                index = {}
+            self._indexes[output_dir] = index
+        return index
+
+    @staticmethod
+    def _stat(filepath: str) -> Optional[Tuple[int, int]]:
+        """Return (size, mtime_ns) of a file, or None if it does not exist."""
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def lookup(self, output_dir: str, filename: str, key: str) -> bool:
+        """
+        Check whether a file generated from the given key is already on disk.
+
+        Args:
+            output_dir: Directory the file lives in
+            filename: Filename including extension
+            key: Cache key of the pattern
+
+        Returns:
+            True if the file exists and was generated from ``key``
+        """
+        with self._lock:
+            entry = self._index(output_dir).get(filename)
+            stat = self._stat(os.path.join(output_dir, filename))
+            if (entry is None or entry["key"] != key or stat is None
+                    or (entry["size"], entry["mtime_ns"]) != stat):
+                self.misses += 1
+                return False
+            entry["last_used"] = time.time()
+            self._dirty.add(output_dir)
+            self.hits += 1
+            return True
+
+    def record(self, output_dir: str, filename: str, key: str) -> None:
+        """
+        Record that a file was generated from the given key.
+
+        Args:
+            output_dir: Directory the file lives in
+            filename: Filename including extension
+            key: Cache key of the pattern
+        """
+        with self._lock:
+            stat = self._stat(os.path.join(output_dir, filename))
+            if stat is None:
+                return
+            self._index(output_dir)[filename] = {
+                "key": key,
+                "size": stat[0],
+                "mtime_ns": stat[1],
+                "last_used": time.time()
+            }
+            self._dirty.add(output_dir)
+
+    def prune(self, output_dir: str, keep: Collection[str]) -> List[str]:
+        """
+        Delete files an output directory's index recorded that are no longer wanted.
+
+        Only files the cache itself recorded are considered, so files added to
+        the directory by other means are never touched.
+
+        Args:
+            output_dir: Directory to prune
+            keep: Filenames, including extension, of the files to keep
+
+        Returns:
+            Filenames that were removed
+        """
+        keep = set(keep)
+        removed = []
+        with self._lock:
+            index = self._index(output_dir)
+            for filename in sorted(set(index) - keep):
+                try:
+                    os.remove(os.path.join(output_dir, filename))
+                except FileNotFoundError:
+                    pass
+                del index[filename]
+                removed.append(filename)
+                logger.info(f"Removed orphaned pattern file {os.path.join(output_dir, filename)}")
+            if removed:
+                self._dirty.add(output_dir)
+        return removed
+
+    def evict(self) -> int:
+        """
+        Delete least recently used files until the cache fits its size budget.
+
+        All output directories under the root are considered together.
+
+        Returns:
+            Number of bytes freed
+        """
+        if self.max_bytes is None:
+            return 0
+
+        with self._lock:
+            if os.path.isdir(self.root):
+                for name in os.listdir(self.root):
+                    output_dir = os.path.join(self.root, name)
+                    if os.path.isfile(os.path.join(output_dir, INDEX_FILENAME)):
+                        self._index(output_dir)
+
+            entries = [(entry["last_used"], output_dir, filename, entry["size"])
+                       for output_dir, index in self._indexes.items()
+                       for filename, entry in index.items()]
+            total = sum(size for _, _, _, size in entries)
+            freed = 0
+            for _, output_dir, filename, size in sorted(entries):
+                if total - freed <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(output_dir, filename))
+                except FileNotFoundError:
+                    pass
+                del self._indexes[output_dir][filename]
+                self._dirty.add(output_dir)
+                freed += size
+                logger.info(f"Evicted {os.path.join(output_dir, filename)} from pattern cache")
+        return freed
+
+    def flush(self) -> None:
+        """Write every modified index back to disk."""
+        with self._lock:
+            for output_dir in self._dirty:
+                path = os.path.join(output_dir, INDEX_FILENAME)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._indexes[output_dir], f, indent=1, sort_keys=True)
+                os.replace(tmp_path, path)
+            self._dirty.clear()
@@ -8,17 +8,511 @@ functionality, appearance, and optical performance characteristics.
 """
 
 import numpy as np
-import cv2
 import os
 import logging
 import argparse
-from typing import Tuple, List, Dict, Optional, Union
+import hashlib
+import json
+import functools
+import threading
+import time
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Iterator, NamedTuple, Tuple, List, Dict, Optional, Union
+
+from encoders import Encoder, PROFILES, SUPPORTED_EXTENSIONS, get_profile
+from panel_layout import SUBPIXEL_COLORS, PANEL_LAYOUTS, PanelLayout, get_layout, subpixel_maps
+from pattern_cache import PatternCache
+from profiling import JSONLinesSink, Profiler, allocated_bytes, profiled
+
+if TYPE_CHECKING:
+    from pattern_suite import PatternSuite
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Version of the rendering code. Bump it whenever the pixels produced for an
+# existing pattern change, so cached files from older versions are regenerated.
+GENERATOR_VERSION = "2"
+
+# Rows per strip when rendering or writing frames in strips
+DEFAULT_STRIP_ROWS = 256
+
+# Define common colors (RGB format)
+COLORS: Dict[str, Tuple[int, int, int]] = {
+    "red": (255, 0, 0),
+    "green": (0, 255, 0),
+    "blue": (0, 0, 255),
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "gray16": (15, 15, 15),
+    "gray32": (31, 31, 31),
+    "gray64": (63, 63, 63),
+    "gray128": (127, 127, 127),
+    "yellow": (255, 255, 0),
+    "magenta": (255, 0, 255),
+    "cyan": (0, 255, 255)
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _grid_axis_parity(size: int, cells: int) -> np.ndarray:
+    """
+    Map each pixel along one grid axis to the parity of the cell covering it.
+    
+    Cells are ``size // cells`` pixels wide and their edges are inclusive on both
+    sides, so a shared edge belongs to the later cell and the closing edge of the
+    last cell is painted too. Pixels past that edge are marked -1.
+    
+    Args:
+        size: Number of pixels along the axis
+        cells: Number of cells along the axis
+        
+    Returns:
+        A read-only int array of length ``size`` holding 0, 1 or -1
+    """
+    cell_size = size // cells
+    index = np.arange(size)
+    if cell_size == 0:
+        # Every cell collapses onto the first pixel; the last one drawn wins
+        cell = np.where(index == 0, cells - 1, -1)
+    else:
+        cell = np.where(index <= cells * cell_size,
+                        np.minimum(index // cell_size, cells - 1), -1)
+    parity = np.where(cell < 0, -1, cell % 2)
+    parity.flags.writeable = False
+    return parity
+
+
+def _tile_rows(templates: np.ndarray, row_index: np.ndarray) -> np.ndarray:
+    """
+    Build an image by stacking precomputed row templates.
+    
+    Args:
+        templates: Array of shape (n, width, channels) with one row per layout
+        row_index: Template index to use for each output row
+        
+    Returns:
+        A new contiguous image of shape (len(row_index), width, channels)
+    """
+    return np.take(templates, row_index, axis=0)
+
+
+@functools.lru_cache(maxsize=None)
+def _code_lut(bit_depth: int) -> np.ndarray:
+    """
+    Lookup table from code values at a bit depth to stored pixel values.
+    
+    8-bit frames store codes as they are. Deeper frames are uint16 scaled to
+    the full 0-65535 range, so a 10-bit white is stored as 65535, not 1023.
+    
+    Args:
+        bit_depth: Bits per channel (8, 10, 12 or 16)
+        
+    Returns:
+        A read-only uint8 or uint16 array of length ``2 ** bit_depth``
+    """
+    codes = np.arange(1 << bit_depth)
+    if bit_depth == 8:
+        lut = codes.astype(np.uint8)
+    else:
+        lut = np.round(codes * 65535 / codes[-1]).astype(np.uint16)
+    lut.flags.writeable = False
+    return lut
+
+
+@functools.lru_cache(maxsize=None)
+def _color_lut(bit_depth: int) -> np.ndarray:
+    """
+    Lookup table from 8-bit color values to stored pixel values at a bit depth.
+    
+    Args:
+        bit_depth: Bits per channel (8, 10, 12 or 16)
+        
+    Returns:
+        A read-only uint8 or uint16 array of length 256
+    """
+    max_code = (1 << bit_depth) - 1
+    lut = _code_lut(bit_depth)[np.round(np.arange(256) * max_code / 255).astype(np.intp)]
+    lut.flags.writeable = False
+    return lut
+
+
+@functools.lru_cache(maxsize=None)
+def _gray_lut(levels: int, bit_depth: int = 8) -> np.ndarray:
+    """
+    Lookup table that quantizes gray codes to a number of levels.
+    
+    The levels are spread evenly over the code range, so ``2 ** bit_depth``
+    levels is the identity.
+    
+    Args:
+        levels: Number of output levels (2 to ``2 ** bit_depth``)
+        bit_depth: Bits per channel
+        
+    Returns:
+        A read-only array of length ``2 ** bit_depth`` holding stored pixel values
+    """
+    codes = 1 << bit_depth
+    steps = np.arange(codes) * levels // codes
+    lut = _code_lut(bit_depth)[steps * (codes - 1) // (levels - 1)]
+    lut.flags.writeable = False
+    return lut
+
+
+@functools.lru_cache(maxsize=64)
+def _gray_ramp(width: int, levels: int, reversed: bool, bit_depth: int = 8) -> np.ndarray:
+    """
+    One row of the horizontal grayscale gradient.
+    
+    Args:
+        width: Width of the row in pixels
+        levels: Number of grayscale levels (2 to ``2 ** bit_depth``)
+        reversed: Whether the ramp runs from white to black
+        bit_depth: Bits per channel
+        
+    Returns:
+        A read-only array of length ``width`` holding stored pixel values
+    """
+    max_code = (1 << bit_depth) - 1
+    ramp = _gray_lut(levels, bit_depth)[np.arange(width) * max_code // width]
+    if reversed:
+        ramp = _code_lut(bit_depth)[-1] - ramp
+    ramp.flags.writeable = False
+    return ramp
+
+
+# 4x4 Bayer matrix for ordered dithering
+_BAYER_4X4 = np.array([[0, 8, 2, 10],
+                       [12, 4, 14, 6],
+                       [3, 11, 1, 9],
+                       [15, 7, 13, 5]])
+
+
+@functools.lru_cache(maxsize=16)
+def _dithered_gray_rows(width: int, levels: int, reversed: bool, bit_depth: int = 8) -> np.ndarray:
+    """
+    The four distinct rows of an ordered-dithered grayscale gradient.
+    
+    Each column's exact position on the ramp falls between two levels; a 4x4
+    Bayer threshold picks one of them per pixel, so the column averages to the
+    exact value instead of showing a band.
+    
+    Args:
+        width: Width of the rows in pixels
+        levels: Number of grayscale levels (2 to ``2 ** bit_depth``)
+        reversed: Whether the ramp runs from white to black
+        bit_depth: Bits per channel
+        
+    Returns:
+        A read-only array of shape (4, width); row ``y % 4`` is used for image row ``y``
+    """
+    position = np.arange(width) * (levels - 1) / max(width - 1, 1)
+    if reversed:
+        position = (levels - 1) - position
+    threshold = (_BAYER_4X4[:, np.arange(width) % 4] + 0.5) / 16
+    steps = np.minimum(np.floor(position + threshold).astype(np.intp), levels - 1)
+    max_code = (1 << bit_depth) - 1
+    rows = _code_lut(bit_depth)[steps * max_code // (levels - 1)]
+    rows.flags.writeable = False
+    return rows
+
+
+def _run_jobs(jobs: List[Tuple[str, Callable[[], Any]]],
+              workers: int = 1) -> List[Tuple[str, Any, Optional[Exception]]]:
+    """
+    Run independent jobs, optionally on a thread pool.
+    
+    Exceptions are caught per job so one failure does not abort the others.
+    
+    Args:
+        jobs: List of (name, function) pairs
+        workers: Number of worker threads; 1 runs inline, 0 uses one per CPU core
+        
+    Returns:
+        List of (name, result, error) tuples in the same order as ``jobs``.
+        Exactly one of result and error is None.
+    """
+    if workers < 0:
+        raise ValueError(f"workers must be 0 or more, got {workers}")
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    def run(func: Callable[[], Any]) -> Tuple[Any, Optional[Exception]]:
+        try:
+            return func(), None
+        except Exception as e:
+            return None, e
+    
+    if workers == 1 or len(jobs) <= 1:
+        outcomes = [run(func) for _, func in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            outcomes = list(executor.map(run, [func for _, func in jobs]))
+    
+    return [(name, result, error) for (name, _), (result, error) in zip(jobs, outcomes)]
+
+
+def _log_encode_stats(profile: str, stats: Dict[str, Any]) -> None:
+    """
+    Log encode totals for a run.
+    
+    Args:
+        profile: Name of the encoder profile used
+        stats: Totals with files, frame_bytes, file_bytes and seconds entries
+    """
+    seconds = stats["seconds"]
+    throughput = stats["frame_bytes"] / 1e6 / seconds if seconds else 0.0
+    logger.info(f"Encoded {stats['files']} files with the '{profile}' profile: "
+                f"{stats['frame_bytes'] / 1e6:.1f} MB of frames to {stats['file_bytes'] / 1e6:.1f} MB "
+                f"in {seconds:.2f}s ({throughput:.1f} MB/s, summed over workers)")
+
+
+class PatternSpec(NamedTuple):
+    """Description of a pattern that can be rendered on demand."""
+    name: str
+    filename: str
+    # Name of the PatternGenerator.generate_* method and its keyword arguments
+    method: str
+    params: Dict[str, Any]
+    # Group the pattern is listed under, e.g. in the GUI
+    category: str = ""
+
+
+class _LayerOp(NamedTuple):
+    """One layer of a declarative pattern, ready to paint."""
+    kind: str
+    # Class of each image row as far as this layer is concerned, or None if it paints every row alike
+    rows: Optional[np.ndarray]
+    # Paints the layer onto templates (n, width, channels), given the layer's class for each template
+    paint: Callable[[np.ndarray, np.ndarray], None]
+    # Whether the layer paints every pixel, hiding the layers below it
+    covers: bool
+    # Fill color or (x0, y0, x1, y1, color) rectangle for layers a FlatPattern can hold, else None
+    flat: Any = None
+
+
+@functools.lru_cache(maxsize=64)
+def _subpixel_lit(layout: PanelLayout, width: int, kind: str, color: str = "", phase: int = 0,
+                  lines: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Work out which subpixels a subpixel pattern lights and which channels it sets.
+    
+    Args:
+        layout: Panel layout
+        width: Panel width in pixels
+        kind: One of PatternGenerator.SUBPIXEL_KINDS
+        color: Subpixel color for the color kinds
+        phase: 1 swaps lit and unlit subpixels of the inversion kinds
+        lines: Rows per band of dot inversion
+        
+    Returns:
+        Read-only (lit, channel_on) arrays over one period of rows: whether each
+        subpixel is lit, shape (rows, width, subpixels per pixel), and whether each
+        R, G and B channel is on, shape (rows, width, 3)
+    """
+    maps = subpixel_maps(layout, width)
+    tile_rows = len(maps.column)
+    # Rows repeat with the layout tile, and dot inversion also with every second band
+    period = int(np.lcm(tile_rows, 2 * lines)) if kind == "dot_inversion" else tile_rows
+    rows = np.arange(period)
+    column = maps.column[rows % tile_rows]
+    if kind == "color":
+        lit = maps.color[rows % tile_rows] == SUBPIXEL_COLORS.index(color)
+    elif kind == "color_off":
+        lit = maps.color[rows % tile_rows] != SUBPIXEL_COLORS.index(color)
+    elif kind == "column_inversion":
+        lit = column % 2 == phase
+    else:
+        lit = (column + (rows // lines)[:, None, None]) % 2 == phase
+    
+    # A channel is on where any subpixel it drives is lit
+    channel_on = np.any(lit[..., None] & maps.channels[rows % tile_rows], axis=2)
+    lit.flags.writeable = False
+    channel_on.flags.writeable = False
+    return lit, channel_on
+
+
+@functools.lru_cache(maxsize=64)
+def _subpixel_addressable(layout: PanelLayout, width: int, kind: str, color: str = "", phase: int = 0,
+                          lines: int = 1) -> bool:
+    """
+    Check that a subpixel pattern shows as intended, i.e. no unlit subpixel has every channel driving it on.
+    
+    White subpixels are driven through equal R, G and B values, so on RGBW
+    layouts a lit white subpixel also lights the color subpixels of its pixel,
+    and lit R, G and B subpixels light its white one.
+    """
+    lit, channel_on = _subpixel_lit(layout, width, kind, color, phase, lines)
+    channels = subpixel_maps(layout, width).channels[np.arange(len(lit)) % len(layout.tile)]
+    fully_driven = np.all(channel_on[:, :, None, :] | ~channels, axis=3)
+    return not np.any(fully_driven & ~lit)
+
+
+def _layer_coordinate(value: Union[int, str], size: int) -> int:
+    """
+    Resolve a layer coordinate and clip it to the frame.
+    
+    Args:
+        value: Pixels, or a percentage of the frame size such as "25%"
+        size: Frame width or height in pixels
+        
+    Returns:
+        The coordinate in pixels, between 0 and size
+    """
+    if isinstance(value, str) and value.endswith("%"):
+        pixels = int(size * float(value[:-1]) / 100)
+    elif isinstance(value, int) and not isinstance(value, bool):
+        pixels = value
+    else:
+        raise ValueError(f"Coordinates must be pixels or percentages such as \"25%\", got {value!r}")
+    return min(max(pixels, 0), size)
+
+
+class RowPlan(NamedTuple):
+    """
+    An image described as a few distinct rows plus the row each image row repeats.
+    
+    Every pattern in the standard set is built this way, so a plan costs a few
+    rows of memory at any frame height. Strips of any height are rendered from
+    it on demand.
+    """
+    # Array of shape (n, width, channels) holding the distinct rows
+    templates: np.ndarray
+    # Template index of each image row
+    row_index: np.ndarray
+    
+    @property
+    def width(self) -> int:
+        """Width of the image in pixels."""
+        return self.templates.shape[1]
+    
+    @property
+    def height(self) -> int:
+        """Height of the image in pixels."""
+        return len(self.row_index)
+    
+    @property
+    def dtype(self) -> np.dtype:
+        """Pixel type of the image."""
+        return self.templates.dtype
+    
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """Shape of the materialized image."""
+        return (self.height, self.width, self.templates.shape[2])
+    
+    @property
+    def nbytes(self) -> int:
+        """Size of the materialized image in bytes."""
+        return self.height * self.templates[0].nbytes
+    
+    def row_plan(self) -> "RowPlan":
+        """Return the plan itself, so plans and flat patterns can be used interchangeably."""
+        return self
+    
+    def strip(self, top: int, bottom: int) -> np.ndarray:
+        """
+        Render a horizontal strip of the image.
+        
+        Args:
+            top: First row of the strip
+            bottom: Row after the last row of the strip
+            
+        Returns:
+            A new array of shape (bottom - top, width, channels)
+        """
+        return _tile_rows(self.templates, self.row_index[top:bottom])
+    
+    def iter_strips(self, strip_rows: int = DEFAULT_STRIP_ROWS) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Render the image strip by strip, top to bottom.
+        
+        Args:
+            strip_rows: Number of rows per strip; the last strip may be shorter
+            
+        Yields:
+            (first row, strip) tuples
+        """
+        if strip_rows < 1:
+            raise ValueError(f"strip_rows must be at least 1, got {strip_rows}")
+        for top in range(0, self.height, strip_rows):
+            yield top, self.strip(top, top + strip_rows)
+    
+    def to_array(self) -> np.ndarray:
+        """
+        Materialize the image.
+        
+        Returns:
+            A new array of the full frame
+        """
+        return _tile_rows(self.templates, self.row_index)
+
+
+class FlatPattern(NamedTuple):
+    """
+    A uniform or piecewise-constant image: a background color plus solid rectangles.
+    
+    Flat patterns are described rather than rendered. Encoders that can stream
+    rows write them without building the frame, and pixels are only
+    materialized when a caller asks for an array.
+    """
+    width: int
+    height: int
+    # Background color as stored pixel values in the generator's channel order
+    color: Tuple[int, ...]
+    # (x0, y0, x1, y1, color) rectangles painted in order; end coordinates are exclusive
+    rects: Tuple[Tuple[int, int, int, int, Tuple[int, ...]], ...] = ()
+    # Pixel type, np.uint8 or np.uint16 for deeper frames
+    dtype: type = np.uint8
+    
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """Shape of the materialized image."""
+        return (self.height, self.width, len(self.color))
+    
+    @property
+    def nbytes(self) -> int:
+        """Size of the materialized image in bytes."""
+        return self.height * self.width * len(self.color) * np.dtype(self.dtype).itemsize
+    
+    def row_plan(self) -> RowPlan:
+        """
+        Describe the image as row templates.
+        
+        Returns:
+            One template per horizontal band between rectangle edges
+        """
+        edges = {0, self.height}
+        for _, y0, _, y1, _ in self.rects:
+            edges.update(min(max(y, 0), self.height) for y in (y0, y1))
+        edges = sorted(edges)
+        
+        # One template per horizontal band between rectangle edges
+        templates = np.empty((max(len(edges) - 1, 1), self.width, len(self.color)), self.dtype)
+        templates[:] = self.color
+        row_index = np.empty(self.height, np.intp)
+        for band, (top, bottom) in enumerate(zip(edges, edges[1:])):
+            for x0, y0, x1, y1, color in self.rects:
+                if y0 <= top < y1:
+                    templates[band, max(x0, 0):max(x1, 0)] = color
+            row_index[top:bottom] = band
+        return RowPlan(templates, row_index)
+    
+    def to_array(self) -> np.ndarray:
+        """
+        Materialize the image.
+        
+        Returns:
+            The image, a new writable array
+        """
+        if not self.rects:
+            # Frames are not cached; encoders write uniform patterns from their rows
+            frame = np.empty(self.shape, self.dtype)
+            frame[:] = self.color
+            return frame
+        return self.row_plan().to_array()
+
+
 class PatternGenerator:
     """
     A class to generate various test patterns for display testing.
@@ -27,39 +521,131 @@ class PatternGenerator:
     grid patterns, and more for testing display characteristics.
     """
     
-    def __init__(self, width: int, height: int) -> None:
+    # (background, box) color pairs in the full crosstalk set
+    CROSSTALK_COMBINATIONS = [
+        ("white", "black"),
+        ("gray32", "black"),
+        ("black", "blue"),
+        ("black", "cyan"),
+        ("gray32", "white"),
+        ("black", "gray32"),
+        ("green", "gray32"),
+        ("magenta", "gray32"),
+        ("red", "gray32"),
+        ("yellow", "gray32")
+    ]
+    
+    # Solid colors offered for previewing (e.g. in the GUI) but not part of the exported set
+    PREVIEW_SOLID_COLORS = ["gray128", "yellow", "magenta", "cyan"]
+    
+    # Grid filename suffix -> (line color, background color)
+    GRID_VARIANTS = {
+        "A": ("white", "black"),
+        "B": ("black", "white")
+    }
+    
+    # generate_* methods whose patterns can be described as a FlatPattern -> flat_* method
+    FLAT_METHODS = {
+        "generate_solid_color": "flat_solid_color",
+        "generate_crosstalk": "flat_crosstalk",
+        "generate_layers": "flat_layers"
+    }
+    
+    # generate_* methods -> method describing the same pattern as a RowPlan
+    ROW_PLAN_METHODS = {
+        "generate_grayscale": "grayscale_rows",
+        "generate_grid": "grid_rows",
+        "generate_skip_one_pixel": "skip_one_pixel_rows",
+        "generate_layers": "layer_rows",
+        "generate_subpixel": "subpixel_rows"
+    }
+    
+    # Subpixel pattern kinds of generate_subpixel
+    SUBPIXEL_KINDS = ("color", "color_off", "column_inversion", "dot_inversion")
+    
+    # Layer kinds of declarative patterns -> keys a layer of that kind may have
+    LAYER_KEYS = {
+        "fill": ("fill",),
+        "rect": ("rect", "color"),
+        "grid": ("grid", "color"),
+        "checker": ("checker", "color"),
+        "ramp": ("ramp", "reversed", "levels")
+    }
+    
+    # Supported bits per channel
+    BIT_DEPTHS = (8, 10, 12, 16)
+    
+    # Supported channel layouts: BGR for OpenCV, RGB and RGBX (X is opaque) for Qt and friends
+    CHANNEL_ORDERS = ("bgr", "rgb", "rgbx")
+    
+    # Channel of each layout holding R, G and B values (RGBX repeats R for X, which is set alike either way)
+    _RGB_CHANNELS = {"bgr": [2, 1, 0], "rgb": [0, 1, 2], "rgbx": [0, 1, 2, 0]}
+    
+    def __init__(self, width: int, height: int, image_format: str = "bmp",
+                 encoder_profile: Union[str, Dict[str, Encoder]] = "default",
+                 bit_depth: int = 8, strip_rows: Optional[int] = None,
+                 channel_order: str = "bgr", profiler: Optional[Profiler] = None,
+                 suite: Optional["PatternSuite"] = None,
+                 panel_layout: Optional[Union[str, PanelLayout]] = None) -> None:
         """
         Initialize the PatternGenerator with display dimensions.
         
         Args:
             width: Width of the display in pixels
             height: Height of the display in pixels
-            output_dir: Directory to save generated patterns
+            image_format: Default file format for saved patterns (bmp, png, jpg, tiff or ppm)
+            encoder_profile: Name of an encoder profile ("default", "fastest", "smallest")
+                or a mapping of file extensions to encoders
+            bit_depth: Bits per channel. Deeper than 8 bits produces uint16 frames
+                scaled to the full 16-bit range, which only png, tiff and ppm can store.
+            strip_rows: Export patterns strip by strip with this many rows per strip,
+                so memory use is bounded by the strip instead of the frame. Only
+                bmp, ppm and tiff can be written this way. None renders full frames.
+            channel_order: Channel layout of rendered frames ("bgr", "rgb" or "rgbx"),
+                so consumers get frames in the layout they need without converting
+                them. Saved files are the same whatever the layout.
+            profiler: Profiler recording the time and memory of every generate_*
+                and save_image call; None disables profiling
+            suite: Pattern suite replacing the built-in pattern set, see pattern_suite.py
+            panel_layout: Subpixel layout of the panel, a PanelLayout or the name of
+                one in PANEL_LAYOUTS (see panel_layout.py). Enables generate_subpixel
+                and adds the subpixel patterns to the built-in set; None leaves them out.
         """
+        if bit_depth not in self.BIT_DEPTHS:
+            raise ValueError(f"bit_depth must be one of {self.BIT_DEPTHS}, got {bit_depth}")
+        if strip_rows is not None and strip_rows < 1:
+            raise ValueError(f"strip_rows must be at least 1, got {strip_rows}")
+        if channel_order not in self.CHANNEL_ORDERS:
+            raise ValueError(f"channel_order must be one of {self.CHANNEL_ORDERS}, got {channel_order}")
+        
         self.width = width
         self.height = height
+        self.bit_depth = bit_depth
+        self.dtype = np.uint8 if bit_depth == 8 else np.uint16
+        self.strip_rows = strip_rows
+        self.channel_order = channel_order
+        self.channels = len(channel_order)
+        self.image_format = image_format
+        self.encoder_profile = encoder_profile if isinstance(encoder_profile, str) else "custom"
+        self.encoders = get_profile(encoder_profile)
+        self.profiler = profiler
+        self.panel_layout = get_layout(panel_layout) if isinstance(panel_layout, str) else panel_layout
+        
+        # Running totals of save_image calls, for the encode summary
+        self.encode_stats = {"files": 0, "frame_bytes": 0, "file_bytes": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
         self.output_dir = "patterns/" + str(width) + "x" + str(height)  
+        if bit_depth != 8:
+            self.output_dir += f"_{bit_depth}bit"
         
-        # Create output directory if it doesn't exist
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-            logger.info(f"Created output directory: {self.output_dir}")
+        # Per-instance copy of the shared color table (RGB format), plus the suite's own colors
+        self.colors = dict(COLORS)
+        self.suite = suite
+        if suite is not None:
+            self.colors.update(suite.colors)
         
-        # Define common colors (RGB format)
-        self.colors = {
-            "red": (255, 0, 0),
-            "green": (0, 255, 0),
-            "blue": (0, 0, 255),
-            "white": (255, 255, 255),
-            "black": (0, 0, 0),
-            "gray16": (15, 15, 15),
-            "gray32": (31, 31, 31),
-            "gray64": (63, 63, 63),
-            "gray128": (127, 127, 127),
-            "yellow": (255, 255, 0),
-            "magenta": (255, 0, 255),
-            "cyan": (0, 255, 255)
-        }
+        # Patterns that failed during the last generate_all_patterns run
+        self.failed_patterns: Dict[str, Exception] = {}
         
         logger.info(f"PatternGenerator initialized with resolution {width}x{height}")
     
@@ -73,31 +659,191 @@ class PatternGenerator:
         Returns:
             A numpy array representing the image
         """
-        image = np.zeros((self.height, self.width, 3), np.uint8)
-        # OpenCV uses BGR color order
-        bgr_color = tuple(reversed(rgb_color))
-        image[:] = bgr_color
+        image = np.zeros((self.height, self.width, self.channels), self.dtype)
+        image[:] = self._pixel(rgb_color)
         return image
     
-    def save_image(self, image: np.ndarray, filename: str) -> str:
+    def _pixel(self, rgb_color: Tuple[int, int, int]) -> Tuple[int, ...]:
+        """Convert an 8-bit RGB color to stored pixel values in the generator's bit depth and channel order."""
+        lut = _color_lut(self.bit_depth)
+        red, green, blue = (int(lut[value]) for value in rgb_color)
+        if self.channel_order == "bgr":
+            return (blue, green, red)
+        if self.channel_order == "rgb":
+            return (red, green, blue)
+        return (red, green, blue, int(lut[255]))
+    
+    def color_pixel(self, color_name: str) -> Tuple[int, ...]:
+        """
+        Look up a named color as stored pixel values.
+        
+        Args:
+            color_name: Name of the color (must be in self.colors)
+            
+        Returns:
+            The color at the generator's bit depth, in its channel order
+        """
+        return self._pixel(self.colors[color_name])
+    
+    def _to_bgr(self, image: Union[np.ndarray, FlatPattern, RowPlan]) -> Union[np.ndarray, FlatPattern, RowPlan]:
+        """Reorder a frame in the generator's channel order to the BGR layout encoders expect."""
+        if self.channel_order == "bgr":
+            return image
+        if isinstance(image, np.ndarray):
+            return np.ascontiguousarray(image[..., 2::-1])
+        if isinstance(image, RowPlan):
+            return RowPlan(np.ascontiguousarray(image.templates[..., 2::-1]), image.row_index)
+        return image._replace(color=image.color[2::-1],
+                              rects=tuple(rect[:4] + (rect[4][2::-1],) for rect in image.rects))
+    
+    def output_filename(self, filename: str) -> str:
+        """
+        Resolve the filename a pattern is saved under.
+        
+        Args:
+            filename: Filename with or without an image extension
+            
+        Returns:
+            The filename including its extension
+        """
+        if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            filename += '.' + self.image_format
+        return filename
+    
+    def encoder_for(self, filename: str) -> Encoder:
+        """
+        Look up the encoder a file is written with.
+        
+        Args:
+            filename: Filename with or without an image extension
+            
+        Returns:
+            The encoder for the file's format in the current profile
+        """
+        extension = os.path.splitext(self.output_filename(filename))[1].lower()
+        return self.encoders[extension]
+    
+    def save_image(self, image: Union[np.ndarray, FlatPattern, RowPlan], filename: str) -> str:
         """
         Save an image to the output directory.
         
+        Flat patterns and row plans are encoded without materializing them where
+        the encoder can stream rows. With ``strip_rows`` set they are always
+        written strip by strip.
+        
         Args:
-            image: The image to save
+            image: The image to save in the generator's channel order, or a flat
+                pattern or row plan describing it
             filename: The filename to save as
             
         Returns:
             The full path to the saved file
         """
-        if not filename.endswith(('.bmp', '.png', '.jpg', '.jpeg', '.tiff')):
-            filename += '.bmp'  # Default to BMP format
-            
-        filepath = os.path.join(self.output_dir, filename)
-        cv2.imwrite(filepath, image)
-        logger.info(f"Saved image to {filepath}")
+        # Create output directory if it doesn't exist; generators that only render never touch the disk
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir, exist_ok=True)
+            logger.info(f"Created output directory: {self.output_dir}")
+        filepath = os.path.join(self.output_dir, self.output_filename(filename))
+        encoder = self.encoder_for(filename)
+        bits = np.dtype(image.dtype).itemsize * 8
+        if bits not in encoder.bit_depths:
+            raise ValueError(f"Cannot save {bits}-bit image {filepath}: "
+                             f"{type(encoder).__name__} only writes {list(encoder.bit_depths)}-bit images")
+        start = time.perf_counter()
+        with self._measure("save", filename) as fields:
+            frame = self._to_bgr(image)
+            if isinstance(frame, np.ndarray) and self.profiler is not None:
+                file_bytes, encode_seconds, write_seconds = encoder.encode_timed(frame, filepath)
+                fields.update(encode_seconds=encode_seconds, write_seconds=write_seconds)
+            elif isinstance(frame, np.ndarray):
+                file_bytes = encoder.encode(frame, filepath)
+            elif self.strip_rows is not None:
+                file_bytes = encoder.encode_strips(frame.row_plan(), filepath, self.strip_rows)
+            else:
+                file_bytes = encoder.encode_rows(frame, filepath)
+            seconds = time.perf_counter() - start
+            fields.update(frame_bytes=image.nbytes, file_bytes=file_bytes)
+            fields.setdefault("encode_seconds", seconds)
+        with self._stats_lock:
+            self.encode_stats["files"] += 1
+            self.encode_stats["frame_bytes"] += image.nbytes
+            self.encode_stats["file_bytes"] += file_bytes
+            self.encode_stats["seconds"] += seconds
+        logger.info(f"Saved image to {filepath} ({file_bytes} bytes in {seconds * 1000:.1f} ms)")
         return filepath
     
+    def encode_image(self, image: Union[np.ndarray, FlatPattern, RowPlan], filename: str) -> bytes:
+        """
+        Encode an image in memory instead of saving it.
+        
+        Produces the same bytes save_image writes for full frames. Flat patterns
+        and row plans are streamed from their rows where the encoder can
+        (bmp, ppm); otherwise they are materialized for this call only.
+        
+        Args:
+            image: The image in the generator's channel order, or a flat pattern
+                or row plan describing it
+            filename: Filename or extension selecting the format, e.g. "red.png"
+            
+        Returns:
+            The encoded file contents
+        """
+        encoder = self.encoder_for(filename)
+        bits = np.dtype(image.dtype).itemsize * 8
+        if bits not in encoder.bit_depths:
+            raise ValueError(f"Cannot encode {bits}-bit image {filename}: "
+                             f"{type(encoder).__name__} only writes {list(encoder.bit_depths)}-bit images")
+        extension = os.path.splitext(self.output_filename(filename))[1].lower()
+        frame = self._to_bgr(image)
+        if isinstance(frame, np.ndarray):
+            return encoder.encode_bytes(frame, extension)
+        return encoder.encode_rows_bytes(frame, extension)
+    
+    def _measure(self, stage: str, name: str) -> Any:
+        """
+        Measure a block with the profiler, if there is one.
+        
+        Args:
+            stage: Stage to record the block under
+            name: Pattern or file name to record
+            
+        Returns:
+            A context manager yielding the dictionary of extra record fields
+        """
+        if self.profiler is None:
+            return contextlib.nullcontext({})
+        return self.profiler.measure(stage, name, resolution=f"{self.width}x{self.height}")
+    
+    def log_profile_summary(self) -> None:
+        """Log the profiler's totals since the last call, then reset them."""
+        if self.profiler is not None and self.profiler.summary():
+            logger.info("Profile summary:\n" + self.profiler.format_summary())
+            self.profiler.reset()
+    
+    def log_encode_summary(self) -> None:
+        """Log totals for the files encoded since the last call, then reset them."""
+        with self._stats_lock:
+            stats = dict(self.encode_stats)
+            self.encode_stats.update(files=0, frame_bytes=0, file_bytes=0, seconds=0.0)
+        if stats["files"]:
+            _log_encode_stats(self.encoder_profile, stats)
+    
+    def flat_solid_color(self, color_name: str = "white") -> FlatPattern:
+        """
+        Describe a solid color pattern without rendering it.
+        
+        Args:
+            color_name: Name of the color (must be in self.colors)
+            
+        Returns:
+            The pattern as a FlatPattern
+        """
+        if color_name not in self.colors:
+            raise ValueError(f"Color {color_name} not found. Available colors: {list(self.colors.keys())}")
+        
+        return FlatPattern(self.width, self.height, self.color_pixel(color_name), dtype=self.dtype)
+    
+    @profiled("generate")
     def generate_solid_color(self, color_name: str = "white", save: bool = True) -> np.ndarray:
         """
         Generate a solid color pattern.
@@ -109,15 +855,12 @@ class PatternGenerator:
         Returns:
             The generated image
         """
-        if color_name not in self.colors:
-            raise ValueError(f"Color {color_name} not found. Available colors: {list(self.colors.keys())}")
-        
-        image = self.create_blank(self.colors[color_name])
+        pattern = self.flat_solid_color(color_name)
         
         if save:
-            self.save_image(image, f"solid_{color_name}")
+            self.save_image(pattern, f"solid_{color_name}")
         
-        return image
+        return pattern.to_array()
     
     def generate_all_solid_colors(self) -> Dict[str, np.ndarray]:
         """
@@ -131,33 +874,70 @@ class PatternGenerator:
             result[color_name] = self.generate_solid_color(color_name)
         return result
     
-    def generate_grayscale(self, levels: int = 256, reversed: bool = False, save: bool = True) -> np.ndarray:
+    def grayscale_rows(self, levels: Optional[int] = None, reversed: bool = False,
+                       dither: bool = False) -> RowPlan:
+        """
+        Describe a grayscale gradient pattern as row templates.
+        
+        Args:
+            levels: Number of grayscale levels (2 to 2**bit_depth), or None for every
+                level the bit depth has
+            reversed: Whether to reverse the gradient (white to black)
+            dither: Whether to spread each column's exact value over the two nearest
+                levels with ordered dithering, instead of rounding it down
+            
+        Returns:
+            The pattern as a RowPlan
+        """
+        full_levels = 1 << self.bit_depth
+        if levels is None:
+            levels = full_levels
+        if not 2 <= levels <= full_levels:
+            raise ValueError(f"levels must be between 2 and {full_levels}, got {levels}")
+        
+        # Gradient from left to right; dithering cycles through four rows
+        if dither:
+            rows = _dithered_gray_rows(self.width, levels, reversed, self.bit_depth)
+            row_index = np.arange(self.height) % len(rows)
+        else:
+            rows = _gray_ramp(self.width, levels, reversed, self.bit_depth)[np.newaxis]
+            row_index = np.zeros(self.height, np.intp)
+        templates = np.empty(rows.shape + (self.channels,), rows.dtype)
+        templates[:] = rows[:, :, np.newaxis]
+        if self.channels == 4:
+            templates[..., 3] = _code_lut(self.bit_depth)[-1]
+        return RowPlan(templates, row_index)
+    
+    @profiled("generate")
+    def generate_grayscale(self, levels: Optional[int] = None, reversed: bool = False,
+                           save: bool = True, dither: bool = False) -> np.ndarray:
         """
         Generate a grayscale gradient pattern.
         
         Args:
-            levels: Number of grayscale levels
+            levels: Number of grayscale levels (2 to 2**bit_depth), or None for every
+                level the bit depth has
             reversed: Whether to reverse the gradient (white to black)
             save: Whether to save the image
+            dither: Whether to spread each column's exact value over the two nearest
+                levels with ordered dithering, instead of rounding it down
             
         Returns:
             The generated image
         """
-        image = np.zeros((self.height, self.width, 3), np.uint8)
-        
-        # Create gradient from left to right
-        for i in range(self.width):
-            value = int(i * 255 / self.width)
-            if reversed:
-                value = 255 - value
-            image[:, i] = (value, value, value)
+        image = self.grayscale_rows(levels, reversed, dither).to_array()
         
         if save:
             suffix = "_reversed" if reversed else ""
+            if dither:
+                suffix = f"_dithered{suffix}"
+            if levels is not None and levels != 1 << self.bit_depth:
+                suffix = f"_{levels}levels{suffix}"
             self.save_image(image, f"grayscale{suffix}")
         
         return image
     
+    @profiled("generate")
     def generate_grayscale_levels(self, save: bool = True) -> Dict[str, np.ndarray]:
         """
         Generate grayscale level patterns (gray16, gray32, gray64).
@@ -170,30 +950,26 @@ class PatternGenerator:
         """
         result = {}
         for level_name in ["gray16", "gray32", "gray64"]:
-            image = self.create_blank(self.colors[level_name])
+            pattern = self.flat_solid_color(level_name)
             if save:
-                self.save_image(image, f"img_{level_name}")
-            result[level_name] = image
+                self.save_image(pattern, f"img_{level_name}")
+            result[level_name] = pattern.to_array()
         return result
     
-    def generate_crosstalk(self, background_color: str = "white", 
-                          box_color: str = "black", save: bool = True) -> np.ndarray:
+    def flat_crosstalk(self, background_color: str = "white", box_color: str = "black") -> FlatPattern:
         """
-        Generate a crosstalk test pattern with a centered box.
+        Describe a crosstalk test pattern without rendering it.
         
         Args:
             background_color: Color name for the background
             box_color: Color name for the center box
-            save: Whether to save the image
             
         Returns:
-            The generated image
+            The pattern as a FlatPattern
         """
         if background_color not in self.colors or box_color not in self.colors:
             raise ValueError("Invalid color name")
         
-        image = self.create_blank(self.colors[background_color])
-        
         # Create a box in the center
         box_width = self.width // 3
         box_height = self.height // 3
@@ -201,21 +977,31 @@ class PatternGenerator:
         x_start = (self.width - box_width) // 2
         y_start = (self.height - box_height) // 2
         
-        # Define the box vertices
-        pts = np.array([
-            [x_start, y_start], 
-            [x_start + box_width, y_start], 
-            [x_start + box_width, y_start + box_height], 
-            [x_start, y_start + box_height]
-        ])
+        # The box edges are painted on both sides, as cv2.fillPoly did
+        box = (x_start, y_start, x_start + box_width + 1, y_start + box_height + 1,
+               self.color_pixel(box_color))
+        return FlatPattern(self.width, self.height, self.color_pixel(background_color), (box,), self.dtype)
+    
+    @profiled("generate")
+    def generate_crosstalk(self, background_color: str = "white", 
+                          box_color: str = "black", save: bool = True) -> np.ndarray:
+        """
+        Generate a crosstalk test pattern with a centered box.
         
-        # Fill the box with the specified color
-        cv2.fillPoly(image, [pts], tuple(reversed(self.colors[box_color])))
+        Args:
+            background_color: Color name for the background
+            box_color: Color name for the center box
+            save: Whether to save the image
+            
+        Returns:
+            The generated image
+        """
+        pattern = self.flat_crosstalk(background_color, box_color)
         
         if save:
-            self.save_image(image, f"crosstalk_{background_color}_{box_color}")
+            self.save_image(pattern, f"crosstalk_{background_color}_{box_color}")
         
-        return image
+        return pattern.to_array()
     
     def generate_all_crosstalk(self) -> Dict[str, np.ndarray]:
         """
@@ -225,33 +1011,16 @@ class PatternGenerator:
             Dictionary of pattern names to images
         """
         result = {}
-        combinations = [
-            ("white", "black"),
-            ("gray32", "black"),
-            ("black", "blue"),
-            ("black", "cyan"),
-            ("gray32", "white"),
-            ("black", "gray32"),
-            ("green", "gray32"),
-            ("magenta", "gray32"),
-            ("red", "gray32"),
-            ("yellow", "gray32")
-        ]
-        
-        for bg, fg in combinations:
+        for bg, fg in self.CROSSTALK_COMBINATIONS:
             name = f"crosstalk_{bg}_{fg}"
             result[name] = self.generate_crosstalk(bg, fg, save=True)
         
         return result
     
-    def generate_grid(self, rows: int, cols: int, 
-                     line_color: str = "white", 
-                     background_color: str = "black",
-                     line_thickness: int = 1,
-                     save: bool = True,
-                     suffix: str = "A") -> np.ndarray:
+    def grid_rows(self, rows: int, cols: int, line_color: str = "white",
+                  background_color: str = "black", line_thickness: int = 1) -> RowPlan:
         """
-        Generate a grid pattern.
+        Describe a grid pattern as row templates.
         
         Args:
             rows: Number of rows in the grid
@@ -259,59 +1028,66 @@ class PatternGenerator:
             line_color: Color name for the grid lines
             background_color: Color name for the background
             line_thickness: Thickness of grid lines in pixels
-            save: Whether to save the image
-            suffix: Suffix to add to the filename (A or B)
             
         Returns:
-            The generated image
+            The pattern as a RowPlan
         """
         if line_color not in self.colors or background_color not in self.colors:
             raise ValueError("Invalid color name")
         
-        image = self.create_blank(self.colors[background_color])
-        
-        # Calculate cell dimensions
-        cell_width = self.width // cols
-        cell_height = self.height // rows
-        
-        # Draw grid with alternating colors
-        for y in range(rows):
-            for x in range(cols):
-                # Calculate top-left corner of the cell
-                top_left_x = x * cell_width
-                top_left_y = y * cell_height
-                # Calculate bottom-right corner of the cell
-                bottom_right_x = (x + 1) * cell_width
-                bottom_right_y = (y + 1) * cell_height
-                # Determine color based on position
-                if (x + y) % 2 == 0:
-                    cell_color = self.colors[line_color]
-                else:
-                    cell_color = self.colors[background_color]
-                # Define the vertices of the cell
-                pts = np.array([
-                    [top_left_x, top_left_y],
-                    [bottom_right_x, top_left_y],
-                    [bottom_right_x, bottom_right_y],
-                    [top_left_x, bottom_right_y]
-                ])
-                # Fill the cell with the determined color
-                cv2.fillPoly(image, [pts], tuple(reversed(cell_color)))
+        line_pixel = self.color_pixel(line_color)
+        background_pixel = self.color_pixel(background_color)
         
-        if save:
-            self.save_image(image, f"{cols}x{rows}{suffix}")
+        # Parity of the cell covering each row and column (-1 where no cell does)
+        row_parity = _grid_axis_parity(self.height, rows)
+        col_parity = _grid_axis_parity(self.width, cols)
         
-        return image
+        # Only two distinct row layouts exist: rows in even cells light the
+        # even columns and rows in odd cells light the odd columns. Rows outside
+        # the grid stay background.
+        templates = np.empty((3, self.width, self.channels), self.dtype)
+        templates[:] = background_pixel
+        templates[0, col_parity == 0] = line_pixel
+        templates[1, col_parity == 1] = line_pixel
+        return RowPlan(templates, np.where(row_parity < 0, 2, row_parity))
     
-    def generate_all_grids(self) -> Dict[str, np.ndarray]:
+    @profiled("generate")
+    def generate_grid(self, rows: int, cols: int, 
+                     line_color: str = "white", 
+                     background_color: str = "black",
+                     line_thickness: int = 1,
+                     save: bool = True,
+                     suffix: str = "A") -> np.ndarray:
         """
-        Generate all grid patterns.
+        Generate a grid pattern.
         
+        Args:
+            rows: Number of rows in the grid
+            cols: Number of columns in the grid
+            line_color: Color name for the grid lines
+            background_color: Color name for the background
+            line_thickness: Thickness of grid lines in pixels
+            save: Whether to save the image
+            suffix: Suffix to add to the filename (A or B)
+            
         Returns:
-            Dictionary of pattern names to images
+            The generated image
         """
-        result = {}
-        grid_configs = [
+        image = self.grid_rows(rows, cols, line_color, background_color, line_thickness).to_array()
+        
+        if save:
+            self.save_image(image, f"{cols}x{rows}{suffix}")
+        
+        return image
+    
+    def grid_configs(self) -> List[Tuple[int, int]]:
+        """
+        List the (rows, cols) grid configurations in the full grid set.
+        
+        Returns:
+            List of (rows, cols) tuples
+        """
+        return [
             (1, 2),
             (1, 16),
             (1, self.width),
@@ -322,78 +1098,1039 @@ class PatternGenerator:
             (6, 32),
             (self.height, 1)
         ]
+    
+    def generate_all_grids(self) -> Dict[str, np.ndarray]:
+        """
+        Generate all grid patterns.
         
-        for rows, cols in grid_configs:
-            for suffix in ["A", "B"]:
-                bg_color = "black" if suffix == "A" else "white"
-                line_color = "white" if suffix == "A" else "black"
-                
+        Returns:
+            Dictionary of pattern names to images
+        """
+        result = {}
+        for rows, cols in self.grid_configs():
+            for suffix, (line_color, bg_color) in self.GRID_VARIANTS.items():
                 name = f"{cols}x{rows}{suffix}"
                 result[name] = self.generate_grid(rows, cols, line_color, bg_color, save=True, suffix=suffix)
         
         return result
     
-    def generate_skip_one_pixel(self, save: bool = True) -> np.ndarray:
+    def skip_one_pixel_rows(self, square_size: int = 2) -> RowPlan:
+        """
+        Describe a skip-one-pixel pattern (checkerboard) as row templates.
+        
+        Args:
+            square_size: Edge length of each checkerboard square in pixels
+            
+        Returns:
+            The pattern as a RowPlan
+        """
+        if square_size < 1:
+            raise ValueError(f"square_size must be at least 1, got {square_size}")
+        
+        # Square parity along each axis; a pixel is white where they match
+        col_parity = (np.arange(self.width) // square_size) % 2
+        row_parity = (np.arange(self.height) // square_size) % 2
+        
+        white = self._pixel((255, 255, 255))
+        templates = np.empty((2, self.width, self.channels), self.dtype)
+        templates[:] = self._pixel((0, 0, 0))
+        templates[0, col_parity == 0] = white
+        templates[1, col_parity == 1] = white
+        return RowPlan(templates, row_parity)
+    
+    @profiled("generate")
+    def generate_skip_one_pixel(self, save: bool = True, square_size: int = 2) -> np.ndarray:
         """
         Generate a skip-one-pixel pattern (checkerboard).
         
         Args:
             save: Whether to save the image
+            square_size: Edge length of each checkerboard square in pixels
             
         Returns:
             The generated image
         """
-        image = np.zeros((self.height, self.width, 3), np.uint8)
+        image = self.skip_one_pixel_rows(square_size).to_array()
+        
+        if save:
+            if square_size == 2:
+                self.save_image(image, "skip_one_pixel")
+            else:
+                self.save_image(image, f"checkerboard_{square_size}")
+        
+        return image
+    
+    def subpixel_rows(self, kind: str, color: str = "", phase: int = 0, lines: int = 1,
+                      on_color: str = "white", off_color: str = "black") -> RowPlan:
+        """
+        Describe a subpixel pattern of the panel layout as row templates.
+        
+        Kinds:
+        - "color": only the subpixels of one color are lit
+        - "color_off": every subpixel but those of one color is lit
+        - "column_inversion": alternate subpixel columns (source lines) are lit
+        - "dot_inversion": subpixels are lit in a checkerboard of subpixel
+          columns and bands of ``lines`` rows
+        
+        A channel is set to the on color where it drives a lit subpixel of
+        its pixel and to the off color elsewhere. The templates cover one
+        period of rows, gathered from the layout's cached subpixel maps.
+        
+        Args:
+            kind: One of SUBPIXEL_KINDS
+            color: Subpixel color for the color kinds, one of the layout's colors ("r", "g", "b" or "w")
+            phase: 1 swaps lit and unlit subpixels of the inversion kinds
+            lines: Rows per band of dot inversion (1 for 1-dot, 2 for 2-dot inversion)
+            on_color: Color name lit channels are set to
+            off_color: Color name unlit channels are set to
+            
+        Returns:
+            The pattern as a RowPlan
+        """
+        if self.panel_layout is None:
+            raise ValueError("Subpixel patterns need a panel layout; pass panel_layout to PatternGenerator")
+        if kind not in self.SUBPIXEL_KINDS:
+            raise ValueError(f"kind must be one of {self.SUBPIXEL_KINDS}, got {kind}")
+        if kind in ("color", "color_off") and (len(color) != 1 or color not in self.panel_layout.colors):
+            raise ValueError(f"Panel layout {self.panel_layout.name} has subpixel colors "
+                             f"{list(self.panel_layout.colors)}, got {color!r}")
+        if phase not in (0, 1) or lines < 1:
+            raise ValueError(f"phase must be 0 or 1 and lines at least 1, got {phase} and {lines}")
+        if on_color not in self.colors or off_color not in self.colors:
+            raise ValueError("Invalid color name")
         
-        # Create checkerboard pattern
-        square_size = 2  # 2x2 pixel squares
+        if not self.subpixel_addressable(kind, color, phase, lines):
+            raise ValueError(f"{self.subpixel_filename(kind, color, phase, lines)} cannot be shown on "
+                             f"{self.panel_layout.name}: white subpixels are driven through the R, G and B "
+                             f"channels, so it would light subpixels meant to stay dark")
         
-        for y in range(0, self.height, square_size):
-            for x in range(0, self.width, square_size):
-                if (x // square_size + y // square_size) % 2 == 0:
-                    image[y:min(y+square_size, self.height), 
-                         x:min(x+square_size, self.width)] = (255, 255, 255)
+        _, channel_on = _subpixel_lit(self.panel_layout, self.width, kind, color, phase, lines)
+        period = len(channel_on)
+        templates = np.where(channel_on[..., self._RGB_CHANNELS[self.channel_order]],
+                             np.array(self.color_pixel(on_color), self.dtype),
+                             np.array(self.color_pixel(off_color), self.dtype))
+        return RowPlan(templates, np.arange(self.height) % period)
+    
+    def subpixel_addressable(self, kind: str, color: str = "", phase: int = 0, lines: int = 1) -> bool:
+        """
+        Check whether a subpixel pattern can be shown on the panel layout.
+        
+        On layouts with white subpixels, patterns lighting a white subpixel next
+        to dark color subpixels of its pixel (or the R, G and B subpixels of a
+        pixel with a dark white one) cannot be told apart from brighter patterns,
+        e.g. "subpixel_no_r" shows as solid white on an RGBW stripe panel.
+        
+        Args:
+            kind: One of SUBPIXEL_KINDS
+            color: Subpixel color for the color kinds
+            phase: Phase of the inversion kinds
+            lines: Rows per band of dot inversion
+            
+        Returns:
+            Whether every subpixel meant to stay dark does
+        """
+        return _subpixel_addressable(self.panel_layout, self.width, kind, color, phase, lines)
+    
+    @staticmethod
+    def subpixel_filename(kind: str, color: str = "", phase: int = 0, lines: int = 1) -> str:
+        """
+        Name a subpixel pattern, e.g. "subpixel_r", "subpixel_no_g" or "dot_inversion_2line_B".
+        
+        Args:
+            kind: One of SUBPIXEL_KINDS
+            color: Subpixel color for the color kinds
+            phase: Phase of the inversion kinds, named A (0) or B (1) like grid variants
+            lines: Rows per band of dot inversion
+            
+        Returns:
+            The pattern name
+        """
+        if kind == "color":
+            return f"subpixel_{color}"
+        if kind == "color_off":
+            return f"subpixel_no_{color}"
+        name = kind if lines == 1 else f"{kind}_{lines}line"
+        return f"{name}_{'AB'[phase]}"
+    
+    @profiled("generate")
+    def generate_subpixel(self, kind: str, color: str = "", phase: int = 0, lines: int = 1,
+                          on_color: str = "white", off_color: str = "black", save: bool = True) -> np.ndarray:
+        """
+        Generate a subpixel pattern of the panel layout.
+        
+        Args:
+            kind: One of SUBPIXEL_KINDS, see subpixel_rows
+            color: Subpixel color for the color kinds ("r", "g", "b" or "w")
+            phase: 1 swaps lit and unlit subpixels of the inversion kinds
+            lines: Rows per band of dot inversion
+            on_color: Color name lit channels are set to
+            off_color: Color name unlit channels are set to
+            save: Whether to save the image
+            
+        Returns:
+            The generated image
+        """
+        image = self.subpixel_rows(kind, color, phase, lines, on_color, off_color).to_array()
         
         if save:
-            self.save_image(image, "skip_one_pixel")
+            self.save_image(image, self.subpixel_filename(kind, color, phase, lines))
         
         return image
     
-    def generate_all_patterns(self) -> Dict[str, np.ndarray]:
+    def _layer_pixel(self, color: Union[str, List[int]]) -> Tuple[int, ...]:
+        """Convert a layer color, a color name or an [r, g, b] list, to stored pixel values."""
+        if isinstance(color, str):
+            if color not in self.colors:
+                raise ValueError(f"Color {color} not found. Available colors: {list(self.colors.keys())}")
+            return self.color_pixel(color)
+        if (not isinstance(color, (list, tuple)) or len(color) != 3
+                or not all(isinstance(value, int) and 0 <= value <= 255 for value in color)):
+            raise ValueError(f"Colors must be names or [r, g, b] lists of 0-255 values, got {color!r}")
+        return self._pixel(tuple(color))
+    
+    def _layer_op(self, layer: Dict[str, Any]) -> _LayerOp:
         """
-        Generate all test patterns.
+        Prepare one layer of a declarative pattern for painting.
         
+        Args:
+            layer: Layer description, e.g. {"rect": [0, 0, "50%", "50%"], "color": "red"}
+            
         Returns:
-            Dictionary of all pattern names to images
+            The layer's row classes and paint function
         """
-        result = {}
+        kinds = [kind for kind in self.LAYER_KEYS if kind in layer]
+        if len(kinds) != 1:
+            raise ValueError(f"Each layer needs exactly one of {list(self.LAYER_KEYS)}, got {layer!r}")
+        kind = kinds[0]
+        unknown = set(layer) - set(self.LAYER_KEYS[kind])
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in {kind} layer; allowed: {list(self.LAYER_KEYS[kind])}")
+        
+        if kind == "fill":
+            pixel = self._layer_pixel(layer["fill"])
+            
+            def paint_fill(templates: np.ndarray, classes: np.ndarray) -> None:
+                templates[:] = pixel
+            return _LayerOp(kind, None, paint_fill, True, pixel)
+        
+        if kind == "ramp":
+            direction = layer["ramp"]
+            full_levels = 1 << self.bit_depth
+            levels = layer.get("levels") or full_levels
+            if direction not in ("horizontal", "vertical"):
+                raise ValueError(f"ramp must be horizontal or vertical, got {direction!r}")
+            if not 2 <= levels <= full_levels:
+                raise ValueError(f"levels must be between 2 and {full_levels}, got {levels}")
+            size = self.width if direction == "horizontal" else self.height
+            ramp = _gray_ramp(size, levels, bool(layer.get("reversed", False)), self.bit_depth)
+            opaque = _code_lut(self.bit_depth)[-1]
+            
+            def paint_ramp(templates: np.ndarray, classes: np.ndarray) -> None:
+                # Horizontal ramps vary along each row; rows of a vertical ramp are classed by their gray value
+                values = ramp[np.newaxis, :] if direction == "horizontal" else classes[:, np.newaxis]
+                templates[..., :3] = values[..., np.newaxis]
+                if self.channels == 4:
+                    templates[..., 3] = opaque
+            rows = None if direction == "horizontal" else ramp.astype(np.intp)
+            return _LayerOp(kind, rows, paint_ramp, True)
         
-        # Generate solid colors
-        result.update(self.generate_all_solid_colors())
+        pixel = self._layer_pixel(layer.get("color", "white"))
+        if kind == "rect":
+            if not isinstance(layer["rect"], (list, tuple)) or len(layer["rect"]) != 4:
+                raise ValueError(f"rect must be [x0, y0, x1, y1], got {layer['rect']!r}")
+            x0, x1 = (_layer_coordinate(value, self.width) for value in layer["rect"][::2])
+            y0, y1 = (_layer_coordinate(value, self.height) for value in layer["rect"][1::2])
+            rows = np.zeros(self.height, np.intp)
+            rows[y0:y1] = 1
+            
+            def paint_rect(templates: np.ndarray, classes: np.ndarray) -> None:
+                templates[classes == 1, x0:x1] = pixel
+            return _LayerOp(kind, rows, paint_rect, False, (x0, y0, x1, y1, pixel))
         
-        # Generate grayscale levels
-        result.update(self.generate_grayscale_levels())
+        if kind == "grid":
+            if (not isinstance(layer["grid"], (list, tuple)) or len(layer["grid"]) != 2
+                    or not all(isinstance(value, int) and value >= 1 for value in layer["grid"])):
+                raise ValueError(f"grid must be [rows, cols] with at least one of each, got {layer['grid']!r}")
+            grid_rows, grid_cols = layer["grid"]
+            # Cells alternate like generate_grid: a pixel is lit where its row and column cell parities match
+            rows = _grid_axis_parity(self.height, grid_rows)
+            cols = _grid_axis_parity(self.width, grid_cols)
+        else:
+            square_size = layer["checker"]
+            if not isinstance(square_size, int) or square_size < 1:
+                raise ValueError(f"checker must be a square size of at least 1, got {square_size!r}")
+            rows = (np.arange(self.height) // square_size) % 2
+            cols = (np.arange(self.width) // square_size) % 2
         
-        # Generate grayscale gradients
-        result["grayscale"] = self.generate_grayscale(save=True)
-        result["grayscale_reversed"] = self.generate_grayscale(reversed=True, save=True)
+        def paint_cells(templates: np.ndarray, classes: np.ndarray) -> None:
+            for parity in (0, 1):
+                templates[np.ix_(classes == parity, cols == parity)] = pixel
+        return _LayerOp(kind, rows, paint_cells, False)
+    
+    def layer_plan(self, layers: List[Dict[str, Any]]) -> Union[FlatPattern, RowPlan]:
+        """
+        Compile a declarative pattern into a flat pattern or row plan.
         
-        # Generate crosstalk patterns
-        result.update(self.generate_all_crosstalk())
+        Layers are painted in order over a black frame. Layers hidden under a
+        later fill or ramp are dropped; the rest is described as a FlatPattern
+        if it only holds fills and rectangles, or else as one row template per
+        distinct combination of the layers' row classes, so each layer is
+        painted with a few vectorized operations however tall the frame is.
+        
+        Args:
+            layers: Layer descriptions, bottom first (fill, rect, grid, checker or ramp)
+            
+        Returns:
+            The pattern as a FlatPattern or RowPlan
+        """
+        ops = [self._layer_op(layer) for layer in layers]
+        top_cover = max((index for index, op in enumerate(ops) if op.covers), default=0)
+        ops = ops[top_cover:]
         
-        # Generate grid patterns
-        result.update(self.generate_all_grids())
+        if all(op.flat is not None for op in ops):
+            color = ops[0].flat if ops and ops[0].kind == "fill" else self._pixel((0, 0, 0))
+            rects = tuple(op.flat for op in ops
+                          if op.kind == "rect" and op.flat[0] < op.flat[2] and op.flat[1] < op.flat[3])
+            return FlatPattern(self.width, self.height, color, rects, self.dtype)
         
-        # Generate skip-one-pixel pattern
-        result["skip_one_pixel"] = self.generate_skip_one_pixel(save=True)
+        classes = np.stack([np.zeros(self.height, np.intp) if op.rows is None else op.rows for op in ops])
+        combinations, row_index = np.unique(classes, axis=1, return_inverse=True)
+        templates = np.empty((combinations.shape[1], self.width, self.channels), self.dtype)
+        templates[:] = self._pixel((0, 0, 0))
+        for op, op_classes in zip(ops, combinations):
+            op.paint(templates, op_classes)
+        return RowPlan(templates, row_index.reshape(-1))
+    
+    def flat_layers(self, layers: List[Dict[str, Any]]) -> Optional[FlatPattern]:
+        """
+        Describe a declarative pattern as a FlatPattern, if it only holds fills and rectangles.
         
+        Args:
+            layers: Layer descriptions, bottom first
+            
+        Returns:
+            The flat pattern, or None if the pattern needs row templates
+        """
+        plan = self.layer_plan(layers)
+        return plan if isinstance(plan, FlatPattern) else None
+    
+    def layer_rows(self, layers: List[Dict[str, Any]]) -> RowPlan:
+        """
+        Describe a declarative pattern as row templates.
+        
+        Args:
+            layers: Layer descriptions, bottom first
+            
+        Returns:
+            The pattern as a RowPlan
+        """
+        return self.layer_plan(layers).row_plan()
+    
+    @profiled("generate")
+    def generate_layers(self, layers: List[Dict[str, Any]], save: bool = True,
+                        filename: str = "layers") -> np.ndarray:
+        """
+        Generate a pattern described by layers.
+        
+        Args:
+            layers: Layer descriptions, bottom first (see layer_plan)
+            save: Whether to save the image
+            filename: Filename to save as
+            
+        Returns:
+            The generated image
+        """
+        plan = self.layer_plan(layers)
+        
+        if save:
+            self.save_image(plan, filename)
+        
+        return plan.to_array()
+    
+    def pattern_specs(self) -> List[PatternSpec]:
+        """
+        Describe the full pattern set without rendering anything.
+        
+        With a suite, its patterns replace the built-in set.
+        
+        Returns:
+            List of pattern specs in export order
+        """
+        if self.suite is not None:
+            return list(self.suite.specs)
+        specs = []
+        for color_name in ["red", "green", "blue", "white", "black"]:
+            specs.append(PatternSpec(color_name, f"solid_{color_name}",
+                                     "generate_solid_color", {"color_name": color_name}, "Solid Color"))
+        for level_name in ["gray16", "gray32", "gray64"]:
+            specs.append(PatternSpec(level_name, f"img_{level_name}",
+                                     "generate_solid_color", {"color_name": level_name}, "Solid Color"))
+        specs.append(PatternSpec("grayscale", "grayscale", "generate_grayscale", {}, "Grayscale"))
+        specs.append(PatternSpec("grayscale_reversed", "grayscale_reversed",
+                                 "generate_grayscale", {"reversed": True}, "Grayscale"))
+        for bg, fg in self.CROSSTALK_COMBINATIONS:
+            name = f"crosstalk_{bg}_{fg}"
+            specs.append(PatternSpec(name, name, "generate_crosstalk",
+                                     {"background_color": bg, "box_color": fg}, "Crosstalk"))
+        for rows, cols in self.grid_configs():
+            for suffix, (line_color, bg_color) in self.GRID_VARIANTS.items():
+                name = f"{cols}x{rows}{suffix}"
+                specs.append(PatternSpec(name, name, "generate_grid",
+                                         {"rows": rows, "cols": cols, "line_color": line_color,
+                                          "background_color": bg_color}, "Grid"))
+        specs.append(PatternSpec("skip_one_pixel", "skip_one_pixel", "generate_skip_one_pixel", {},
+                                 "Skip One Pixel"))
+        if self.panel_layout is not None:
+            params = [{"kind": kind, "color": color}
+                      for color in self.panel_layout.colors for kind in ("color", "color_off")]
+            params += [{"kind": kind, "phase": phase, "lines": lines}
+                       for kind, lines in (("column_inversion", 1), ("dot_inversion", 1), ("dot_inversion", 2))
+                       for phase in (0, 1)]
+            # Patterns the layout's white subpixels would wash out are left out, and so are
+            # patterns that come out as one solid color (e.g. "subpixel_r" on RGB stripe
+            # panels), which the solid color patterns already cover
+            for param in params:
+                if not self.subpixel_addressable(**param):
+                    continue
+                _, channel_on = _subpixel_lit(self.panel_layout, self.width, **param)
+                if np.all(channel_on == channel_on[0, 0]):
+                    continue
+                name = self.subpixel_filename(**param)
+                specs.append(PatternSpec(name, name, "generate_subpixel", param, "Subpixel"))
+        return specs
+    
+    def preview_specs(self) -> List[PatternSpec]:
+        """
+        Describe the patterns offered for previewing only.
+        
+        They can be looked up and rendered by name like any other pattern, but
+        are never exported. A suite replaces them along with the built-in set.
+        
+        Returns:
+            List of pattern specs
+        """
+        if self.suite is not None:
+            return []
+        return [PatternSpec(color_name, f"solid_{color_name}", "generate_solid_color",
+                            {"color_name": color_name}, "Solid Color")
+                for color_name in self.PREVIEW_SOLID_COLORS]
+    
+    def pattern_categories(self, preview: bool = False) -> Dict[str, List[str]]:
+        """
+        Group the pattern names by category.
+        
+        Args:
+            preview: Whether to also list the preview-only patterns, after the
+                exported patterns of their category
+        
+        Returns:
+            Dictionary of categories to pattern names, both in export order
+        """
+        categories: Dict[str, List[str]] = {}
+        for spec in self.pattern_specs() + (self.preview_specs() if preview else []):
+            categories.setdefault(spec.category or "Other", []).append(spec.name)
+        return categories
+    
+    def pattern_names(self) -> List[str]:
+        """
+        List the names of all patterns in the full set.
+        
+        Returns:
+            Pattern names in export order
+        """
+        return [spec.name for spec in self.pattern_specs()]
+    
+    def get_spec(self, name: str) -> PatternSpec:
+        """
+        Look up a pattern spec by name, including the preview-only patterns.
+        
+        Args:
+            name: Name of the pattern
+            
+        Returns:
+            The matching pattern spec
+        """
+        for spec in self.pattern_specs() + self.preview_specs():
+            if spec.name == name:
+                return spec
+        raise ValueError(f"Pattern {name} not found. Available patterns: {self.pattern_names()}")
+    
+    def render(self, pattern: Union[str, PatternSpec]) -> np.ndarray:
+        """
+        Render a single pattern on demand without saving it.
+        
+        Args:
+            pattern: Pattern name or spec
+            
+        Returns:
+            The generated image
+        """
+        spec = self.get_spec(pattern) if isinstance(pattern, str) else pattern
+        return getattr(self, spec.method)(save=False, **spec.params)
+    
+    def render_flat(self, pattern: Union[str, PatternSpec]) -> Optional[FlatPattern]:
+        """
+        Describe a single pattern as a FlatPattern, if it is uniform or piecewise constant.
+        
+        Args:
+            pattern: Pattern name or spec
+            
+        Returns:
+            The flat pattern, or None if the pattern has to be rendered as an array
+        """
+        spec = self.get_spec(pattern) if isinstance(pattern, str) else pattern
+        method = self.FLAT_METHODS.get(spec.method)
+        if method is None:
+            return None
+        return getattr(self, method)(**spec.params)
+    
+    def row_plan(self, pattern: Union[str, PatternSpec]) -> RowPlan:
+        """
+        Describe a single pattern as row templates, without rendering the frame.
+        
+        Args:
+            pattern: Pattern name or spec
+            
+        Returns:
+            The pattern as a RowPlan
+        """
+        spec = self.get_spec(pattern) if isinstance(pattern, str) else pattern
+        flat = self.render_flat(spec)
+        if flat is not None:
+            return flat.row_plan()
+        method = self.ROW_PLAN_METHODS.get(spec.method)
+        if method is None:
+            raise ValueError(f"Pattern {spec.name} cannot be described as row templates")
+        return getattr(self, method)(**spec.params)
+    
+    def iter_strips(self, pattern: Union[str, PatternSpec],
+                    strip_rows: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Render a single pattern strip by strip, top to bottom.
+        
+        Args:
+            pattern: Pattern name or spec
+            strip_rows: Rows per strip, defaulting to the generator's strip_rows
+                or DEFAULT_STRIP_ROWS
+            
+        Yields:
+            (first row, strip) tuples
+        """
+        return self.row_plan(pattern).iter_strips(strip_rows or self.strip_rows or DEFAULT_STRIP_ROWS)
+    
+    def iter_patterns(self, names: Optional[List[str]] = None) -> Iterator[Tuple[str, np.ndarray]]:
+        """
+        Render patterns one at a time.
+        
+        Only the image currently being consumed is kept alive, so the full set
+        can be streamed at any resolution.
+        
+        Args:
+            names: Pattern names to render, or None for the full set
+            
+        Yields:
+            (pattern name, image) tuples in export order
+        """
+        specs = self.pattern_specs() if names is None else [self.get_spec(name) for name in names]
+        for spec in specs:
+            yield spec.name, self.render(spec)
+    
+    def cache_key(self, spec: PatternSpec) -> str:
+        """
+        Compute the content address of a pattern file.
+        
+        The key covers everything the file depends on: the generator method and
+        its arguments, the resolution, the bit depth, the color table, the
+        generator version, the output format and the encoder settings.
+        
+        Args:
+            spec: Pattern spec
+            
+        Returns:
+            A hex digest identifying the file contents
+        """
+        description = {
+            "method": spec.method,
+            "params": spec.params,
+            "resolution": [self.width, self.height],
+            "bit_depth": self.bit_depth,
+            "colors": self.colors,
+            "version": GENERATOR_VERSION,
+            "format": os.path.splitext(self.output_filename(spec.filename))[1],
+            "encoder": self.encoder_for(spec.filename).settings()
+        }
+        if self.strip_rows is not None:
+            # Strip-by-strip writers lay files out differently from full-frame ones
+            description["strip_rows"] = self.strip_rows
+        if spec.method == "generate_subpixel":
+            description["panel_layout"] = self.panel_layout._asdict()
+        encoded = json.dumps(description, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+    
+    def _export(self, spec: PatternSpec,
+                cache: Optional[PatternCache] = None) -> Tuple[Union[np.ndarray, FlatPattern, RowPlan], str]:
+        """
+        Render a single pattern and save it.
+        
+        Flat patterns are saved without materializing them, and so is every
+        pattern when exporting in strips.
+        
+        Args:
+            spec: Pattern spec
+            cache: Cache to record the saved file in
+            
+        Returns:
+            The generated image, flat pattern or row plan and the path it was saved to
+        """
+        with self._measure("generate", spec.filename) as fields:
+            if self.strip_rows is not None:
+                image = self.row_plan(spec)
+            else:
+                image = self.render_flat(spec)
+                if image is None:
+                    image = self.render(spec)
+            fields["alloc_bytes"] = allocated_bytes(image)
+        filepath = self.save_image(image, spec.filename)
+        if cache is not None:
+            cache.record(self.output_dir, os.path.basename(filepath), self.cache_key(spec))
+        return image, filepath
+    
+    def _stale_specs(self, cache: Optional[PatternCache], force: bool) -> List[PatternSpec]:
+        """
+        List the patterns whose output is missing or out of date.
+        
+        Args:
+            cache: Cache to check, or None to treat every pattern as stale
+            force: Whether to treat every pattern as stale
+            
+        Returns:
+            The subset of pattern_specs() that has to be generated
+        """
+        specs = self.pattern_specs()
+        if cache is None or force:
+            return specs
+        stale = []
+        for spec in specs:
+            if cache.lookup(self.output_dir, self.output_filename(spec.filename), self.cache_key(spec)):
+                logger.debug(f"Pattern {spec.name} is up to date")
+            else:
+                stale.append(spec)
+        logger.info(f"{len(specs) - len(stale)} of {len(specs)} patterns in {self.output_dir} are up to date, "
+                    f"{len(stale)} to generate")
+        return stale
+    
+    def prune_orphans(self, cache: PatternCache) -> List[str]:
+        """
+        Delete generated files the current pattern set no longer produces.
+        
+        Files are orphaned when a pattern was removed or renamed, e.g. after
+        editing a suite or changing the output format. Only files the cache
+        recorded in this output directory are deleted.
+        
+        Args:
+            cache: Cache whose index lists the previously generated files
+            
+        Returns:
+            Filenames that were removed
+        """
+        keep = {self.output_filename(spec.filename) for spec in self.pattern_specs()}
+        removed = cache.prune(self.output_dir, keep)
+        if removed:
+            logger.info(f"Removed {len(removed)} orphaned pattern files from {self.output_dir}")
+        return removed
+    
+    def _export_all(self, keep_images: bool, workers: int, cache: Optional[PatternCache],
+                    force: bool, prune: bool = False) -> Dict[str, Any]:
+        """
+        Export every stale pattern and collect either the images or the file paths.
+        
+        Args:
+            keep_images: Whether to return images (True) or file paths (False)
+            workers: Number of worker threads; 0 uses one per CPU core
+            cache: Cache of previously generated files, or None to regenerate everything
+            force: Whether to regenerate cached patterns anyway
+            prune: Whether to delete cached files the pattern set no longer produces
+            
+        Returns:
+            Dictionary of successfully exported pattern names to images or paths
+        """
+        def export(spec: PatternSpec) -> Any:
+            image, filepath = self._export(spec, cache)
+            if not keep_images:
+                return filepath
+            return image if isinstance(image, np.ndarray) else image.to_array()
+        
+        jobs = [(spec.name, functools.partial(export, spec))
+                for spec in self._stale_specs(cache, force)]
+        
+        result = {}
+        self.failed_patterns = {}
+        for name, outcome, error in _run_jobs(jobs, workers):
+            if error is None:
+                result[name] = outcome
+            else:
+                logger.error(f"Failed to generate pattern {name}: {error}")
+                self.failed_patterns[name] = error
+        
+        if self.failed_patterns:
+            logger.error(f"{len(self.failed_patterns)} of {len(jobs)} patterns failed")
+        self.log_encode_summary()
+        self.log_profile_summary()
+        if cache is not None:
+            if prune:
+                self.prune_orphans(cache)
+            cache.evict()
+            cache.flush()
         return result
+    
+    def export_all_patterns(self, workers: int = 1, cache: Optional[PatternCache] = None,
+                            force: bool = False, prune: bool = False) -> Dict[str, str]:
+        """
+        Generate and save all test patterns without keeping them in memory.
+        
+        Behaves like generate_all_patterns, but each image is released as soon
+        as it has been written, so memory use stays at one frame per worker.
+        
+        Args:
+            workers: Number of worker threads; 0 uses one per CPU core
+            cache: Cache of previously generated files, or None to regenerate everything
+            force: Whether to regenerate cached patterns anyway
+            prune: Whether to delete cached files the pattern set no longer produces
+            
+        Returns:
+            Dictionary of successfully written pattern names to file paths
+        """
+        return self._export_all(False, workers, cache, force, prune)
+    
+    def generate_all_patterns(self, workers: int = 1, cache: Optional[PatternCache] = None,
+                              force: bool = False, prune: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Generate all test patterns.
+        
+        Patterns are rendered and encoded independently, so with more than one
+        worker they are spread over a thread pool (OpenCV and NumPy release the
+        GIL while encoding and filling). A failing pattern does not stop the
+        run; its error is logged and recorded in ``self.failed_patterns``.
+        
+        With a cache, patterns whose file is already on disk and was generated
+        from identical inputs are skipped and left out of the result. Its index
+        of the previous run's files doubles as a manifest: with ``prune``, files
+        no longer in the pattern set are deleted, so adding or changing one
+        pattern only writes that pattern and leaves no stale files behind.
+        
+        Every image is kept in the returned dictionary; use export_all_patterns
+        or iter_patterns to avoid holding the full set in memory.
+        
+        Args:
+            workers: Number of worker threads; 0 uses one per CPU core
+            cache: Cache of previously generated files, or None to regenerate everything
+            force: Whether to regenerate cached patterns anyway
+            prune: Whether to delete cached files the pattern set no longer produces
+            
+        Returns:
+            Dictionary of all successfully generated pattern names to images,
+            in the same order regardless of the number of workers
+        """
+        return self._export_all(True, workers, cache, force, prune)
 
-if __name__ == "__main__":
+
+class ResolutionSummary(NamedTuple):
+    """Outcome of exporting the full pattern set for one resolution."""
+    width: int
+    height: int
+    # Number of patterns generated, not counting ones skipped as cached
+    patterns: int
+    cached: int
+    failed: int
+    # Time spent rendering and writing this resolution's patterns, summed over workers
+    seconds: float
+    bytes_written: int
+
+
+def parse_resolution(text: str) -> Tuple[int, int]:
+    """
+    Parse a resolution written as WIDTHxHEIGHT.
+    
+    Args:
+        text: Resolution string such as "1920x1080"
+        
+    Returns:
+        A (width, height) tuple
+    """
+    try:
+        width, height = (int(part) for part in text.strip().lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid resolution {text!r}, expected WIDTHxHEIGHT") from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid resolution {text!r}, dimensions must be positive")
+    return width, height
+
+
+def load_resolution_manifest(path: str) -> List[Tuple[int, int]]:
+    """
+    Read resolutions from a manifest file.
+    
+    The manifest lists one or more WIDTHxHEIGHT entries per line, separated by
+    commas or whitespace. Blank lines and anything after a '#' are ignored.
+    
+    Args:
+        path: Path to the manifest file
+        
+    Returns:
+        List of (width, height) tuples in file order
+    """
+    resolutions = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            for entry in line.replace(",", " ").split():
+                resolutions.append(parse_resolution(entry))
+    return resolutions
+
+
+def generate_batch(resolutions: List[Tuple[int, int]], workers: int = 1,
+                   cache: Optional[PatternCache] = None, force: bool = False,
+                   image_format: str = "bmp",
+                   encoder_profile: Union[str, Dict[str, Encoder]] = "default",
+                   bit_depth: int = 8, strip_rows: Optional[int] = None,
+                   profiler: Optional[Profiler] = None,
+                   suite: Optional["PatternSuite"] = None, prune: bool = False,
+                   panel_layout: Optional[Union[str, PanelLayout]] = None) -> List[ResolutionSummary]:
+    """
+    Export the full pattern set for several resolutions in one run.
+    
+    Every (resolution, pattern) job is scheduled on a single shared worker pool,
+    and images are dropped as soon as they are written so memory use does not
+    grow with the number of resolutions.
+    
+    Args:
+        resolutions: List of (width, height) tuples
+        workers: Number of worker threads; 0 uses one per CPU core
+        cache: Cache of previously generated files, or None to regenerate everything
+        force: Whether to regenerate cached patterns anyway
+        image_format: File format for saved patterns
+        encoder_profile: Encoder profile name or mapping of file extensions to encoders
+        bit_depth: Bits per channel (8, 10, 12 or 16)
+        strip_rows: Write patterns strip by strip with this many rows per strip
+        profiler: Profiler shared by every resolution; its summary is logged at the end
+        suite: Pattern suite to export instead of the built-in pattern set
+        prune: Whether to delete cached files the pattern set no longer produces
+        panel_layout: Subpixel layout of the panel, adding the subpixel patterns
+        
+    Returns:
+        One summary per distinct resolution, in the order given. Patterns
+        skipped because they were cached count as neither time nor bytes.
+    """
+    if not resolutions:
+        raise ValueError("generate_batch needs at least one resolution")
+    generators = [PatternGenerator(width, height, image_format, encoder_profile, bit_depth, strip_rows,
+                                   profiler=profiler, suite=suite, panel_layout=panel_layout)
+                  for width, height in dict.fromkeys(resolutions)]
+    
+    def export(generator: PatternGenerator, spec: PatternSpec) -> Tuple[float, int]:
+        start = time.perf_counter()
+        _, filepath = generator._export(spec, cache)
+        return time.perf_counter() - start, os.path.getsize(filepath)
+    
+    jobs = []
+    job_counts = []
+    for generator in generators:
+        stale = generator._stale_specs(cache, force)
+        job_counts.append((len(stale), len(generator.pattern_specs()) - len(stale)))
+        for spec in stale:
+            key = f"{generator.width}x{generator.height}/{spec.name}"
+            jobs.append((key, functools.partial(export, generator, spec)))
+    
+    start = time.perf_counter()
+    outcomes = iter(_run_jobs(jobs, workers))
+    logger.info(f"Exported {len(jobs)} patterns for {len(generators)} resolutions "
+                f"in {time.perf_counter() - start:.2f}s")
+    
+    summaries = []
+    for generator, (count, cached) in zip(generators, job_counts):
+        failed = bytes_written = 0
+        seconds = 0.0
+        for _ in range(count):
+            key, outcome, error = next(outcomes)
+            if error is None:
+                seconds += outcome[0]
+                bytes_written += outcome[1]
+            else:
+                failed += 1
+                logger.error(f"Failed to generate pattern {key}: {error}")
+        summaries.append(ResolutionSummary(generator.width, generator.height, count,
+                                           cached, failed, seconds, bytes_written))
+    
+    totals = {"files": 0, "frame_bytes": 0, "file_bytes": 0, "seconds": 0.0}
+    for generator in generators:
+        for key in totals:
+            totals[key] += generator.encode_stats[key]
+    if totals["files"]:
+        _log_encode_stats(generators[0].encoder_profile, totals)
+    generators[0].log_profile_summary()
+    
+    if cache is not None:
+        if prune:
+            for generator in generators:
+                generator.prune_orphans(cache)
+        cache.evict()
+        cache.flush()
+    return summaries
+
+
+def format_batch_summary(summaries: List[ResolutionSummary]) -> str:
+    """
+    Format batch summaries as a plain-text table.
+    
+    Args:
+        summaries: Summaries returned by generate_batch
+        
+    Returns:
+        The table, including a totals row
+    """
+    lines = [f"{'Resolution':>12}  {'Patterns':>8}  {'Cached':>6}  {'Failed':>6}  "
+             f"{'Time (s)':>9}  {'MB':>10}"]
+    for summary in summaries:
+        resolution = f"{summary.width}x{summary.height}"
+        lines.append(f"{resolution:>12}  {summary.patterns:>8}  {summary.cached:>6}  {summary.failed:>6}  "
+                     f"{summary.seconds:>9.2f}  {summary.bytes_written / 1e6:>10.1f}")
+    lines.append(f"{'Total':>12}  {sum(s.patterns for s in summaries):>8}  "
+                 f"{sum(s.cached for s in summaries):>6}  "
+                 f"{sum(s.failed for s in summaries):>6}  "
+                 f"{sum(s.seconds for s in summaries):>9.2f}  "
+                 f"{sum(s.bytes_written for s in summaries) / 1e6:>10.1f}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     parser = argparse.ArgumentParser(description='Generate display test patterns.')
     parser.add_argument('--width', type=int, default=2560, help='Width of the display in pixels')
     parser.add_argument('--height', type=int, default=1664, help='Height of the display in pixels')
+    parser.add_argument('--resolutions', type=str, default=None,
+                        help='Comma-separated list of resolutions to generate, e.g. 1920x1080,2560x1664')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='File listing resolutions to generate, one WIDTHxHEIGHT per line')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of patterns to generate in parallel (0 = one per CPU core)')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerate every pattern even if an up-to-date file already exists')
+    parser.add_argument('--prune', action='store_true',
+                        help='Delete previously generated files that are no longer part of the pattern set')
+    parser.add_argument('--cache-max-mb', type=float, default=None,
+                        help='Delete least recently used pattern files once all resolutions exceed this size')
+    parser.add_argument('--format', choices=['bmp', 'png', 'tiff', 'ppm', 'raw'], default='bmp',
+                        help='Output format; raw writes a memory-mapped frame store per resolution')
+    parser.add_argument('--profile', choices=list(PROFILES), default='default',
+                        help='Encoder settings: fastest favours encode time, smallest favours file size')
+    parser.add_argument('--bit-depth', type=int, choices=PatternGenerator.BIT_DEPTHS, default=8,
+                        help='Bits per channel; deeper than 8 writes 16-bit png, tiff, ppm or raw frames')
+    parser.add_argument('--strip-rows', type=int, default=None,
+                        help='Render and write patterns in strips of this many rows to bound memory use '
+                             '(bmp, ppm, tiff and raw)')
+    parser.add_argument('--suite', type=str, default=None,
+                        help='JSON or YAML pattern suite to generate instead of the built-in pattern set')
+    parser.add_argument('--telemetry', type=str, default=None,
+                        help='Profile every pattern and append the timings to this JSON lines file')
+    parser.add_argument('--sequence', choices=['mkv', 'avi', 'tiff'], default=None,
+                        help='Write all patterns into one lossless video or multi-page TIFF per resolution, '
+                             'patterns/WIDTHxHEIGHT.EXT, instead of one file per pattern')
+    parser.add_argument('--fps', type=float, default=30.0, help='Frame rate of --sequence output')
+    parser.add_argument('--dwell', type=float, default=1000,
+                        help='Time each pattern stays on screen in --sequence output, in milliseconds')
+    parser.add_argument('--schedule', type=str, default=None,
+                        help='JSON or CSV file with per-pattern dwell times in milliseconds for --sequence')
+    parser.add_argument('--codec', choices=['FFV1', 'HFYU'], default='FFV1',
+                        help='Lossless video codec for --sequence mkv or avi')
+    parser.add_argument('--panel-layout', choices=list(PANEL_LAYOUTS), default=None,
+                        help='Subpixel layout of the panel; adds single-subpixel, column- and dot-inversion patterns')
     args = parser.parse_args()
+    if args.strip_rows is not None and args.strip_rows < 1:
+        parser.error("--strip-rows must be at least 1")
+    if args.strip_rows is not None and args.format == 'png' and not args.sequence:
+        parser.error("--format png cannot be written in strips; use bmp, ppm, tiff or raw")
+    if args.bit_depth > 8 and args.format == 'bmp' and not args.sequence:
+        parser.error(f"--format bmp cannot store {args.bit_depth}-bit patterns; use png, tiff, ppm or raw")
+    if args.prune and args.format == 'raw':
+        parser.error("--prune only applies to patterns saved as files; raw frame stores are rebuilt on every run")
+    if args.telemetry and args.format == 'raw':
+        parser.error("--telemetry only profiles patterns saved as files; use bmp, png, tiff or ppm")
+    if args.sequence and (args.format == 'raw' or args.prune or args.telemetry):
+        parser.error("--sequence writes one file per resolution; it cannot be combined with "
+                     "--format raw, --prune or --telemetry")
+    if args.sequence in ('mkv', 'avi') and args.bit_depth > 8:
+        parser.error(f"--sequence {args.sequence} holds 8-bit frames; use --sequence tiff for "
+                     f"{args.bit_depth}-bit patterns")
+    if args.fps <= 0:
+        parser.error("--fps must be positive")
+
+    suite = None
+    if args.suite:
+        from pattern_suite import load_suite
+        try:
+            suite = load_suite(args.suite)
+        except (OSError, ValueError) as e:
+            parser.error(f"Invalid pattern suite {args.suite}: {e}")
+    profiler = Profiler([JSONLinesSink(args.telemetry)]) if args.telemetry else None
+    max_bytes = int(args.cache_max_mb * 1e6) if args.cache_max_mb is not None else None
+    cache = PatternCache("patterns", max_bytes=max_bytes)
 
-    generator = PatternGenerator(width=args.width, height=args.height)
-    generator.generate_all_patterns()
\ No newline at end of file
+    if args.resolutions or args.manifest:
+        resolutions = []
+        try:
+            if args.resolutions:
+                resolutions += [parse_resolution(entry) for entry in args.resolutions.split(",") if entry.strip()]
+            if args.manifest:
+                resolutions += load_resolution_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        if not resolutions:
+            parser.error("--resolutions and --manifest list no resolutions")
+    else:
+        resolutions = [(args.width, args.height)]
+
+    if args.sequence:
+        from pattern_sequence import export_sequence
+        odd = [f"{width}x{height}" for width, height in resolutions if width % 2 or height % 2]
+        if args.sequence in ('mkv', 'avi') and odd:
+            parser.error(f"--sequence {args.sequence} needs even resolutions, got {', '.join(odd)}; "
+                         f"use --sequence tiff")
+        schedule = None
+        if args.schedule:
+            from pattern_sequence import load_dwell_schedule
+            try:
+                schedule = load_dwell_schedule(args.schedule)
+            except (OSError, ValueError) as e:
+                parser.error(f"Invalid schedule {args.schedule}: {e}")
+        for width, height in dict.fromkeys(resolutions):
+            generator = PatternGenerator(width, height, encoder_profile=args.profile, bit_depth=args.bit_depth,
+                                         strip_rows=args.strip_rows, suite=suite, panel_layout=args.panel_layout)
+            export_sequence(generator, f"{generator.output_dir}.{args.sequence}", fps=args.fps,
+                            dwell_ms=args.dwell, schedule=schedule, codec=args.codec)
+    elif args.format == 'raw':
+        from frame_store import build_frame_store
+        for width, height in dict.fromkeys(resolutions):
+            build_frame_store(PatternGenerator(width, height, bit_depth=args.bit_depth, strip_rows=args.strip_rows,
+                                               suite=suite, panel_layout=args.panel_layout),
+                              workers=args.workers)
+    elif args.resolutions or args.manifest:
+        summaries = generate_batch(resolutions, workers=args.workers, cache=cache, force=args.force,
+                                   image_format=args.format, encoder_profile=args.profile,
+                                   bit_depth=args.bit_depth, strip_rows=args.strip_rows, profiler=profiler,
+                                   suite=suite, prune=args.prune, panel_layout=args.panel_layout)
+        print(format_batch_summary(summaries))
+        if any(summary.failed for summary in summaries):
+            raise SystemExit(1)
+    else:
+        generator = PatternGenerator(width=args.width, height=args.height, image_format=args.format,
+                                     encoder_profile=args.profile, bit_depth=args.bit_depth,
+                                     strip_rows=args.strip_rows, profiler=profiler, suite=suite,
+                                     panel_layout=args.panel_layout)
+        generator.export_all_patterns(workers=args.workers, cache=cache, force=args.force, prune=args.prune)
+        if generator.failed_patterns:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pattern Sequences
+
+This module writes a whole pattern set into a single sequence file for
+playback hardware: a lossless video (FFV1 or HuffYUV through
+cv2.VideoWriter) or a multi-page TIFF. Each pattern is repeated for as many
+frames as its dwell time lasts at the sequence's frame rate. Patterns are
+rendered and written one at a time, so no more than one frame is held in
+memory whatever the length of the sequence.
+"""
+
+import os
+import json
+import time
+import zlib
+import struct
+import logging
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from encoders import TIFFEncoder, _tiff_rgb_rows, _write_tiff_directory
+from pattern_generator import DEFAULT_STRIP_ROWS, PatternGenerator, RowPlan
+
+logger = logging.getLogger(__name__)
+
+# Sequence file extensions and what they hold
+VIDEO_EXTENSIONS = (".mkv", ".avi")
+TIFF_EXTENSIONS = (".tif", ".tiff")
+SEQUENCE_EXTENSIONS = VIDEO_EXTENSIONS + TIFF_EXTENSIONS
+
+# Lossless codecs cv2.VideoWriter can write BGR frames with. OpenCV's
+# uncompressed AVI output is subsampled to I420, so it is not offered.
+VIDEO_CODECS = ("FFV1", "HFYU")
+
+DEFAULT_FPS = 30.0
+
+# Time each pattern stays on screen unless a schedule says otherwise, as in loop.py
+DEFAULT_DWELL_MS = 1000.0
+
+
+def load_dwell_schedule(path: str) -> Dict[str, float]:
+    """
+    Read per-pattern dwell times from a schedule file.
+
+    A .json file holds an object mapping pattern names to dwell times in
+    milliseconds. Any other file is read as lines of "pattern,milliseconds";
+    blank lines and anything after a '#' are ignored.
+
+    Args:
+        path: Path to the schedule file
+
+    Returns:
+        Dictionary of pattern names to dwell times in milliseconds
+    """
+    with open(path) as f:
+        if path.lower().endswith(".json"):
+            return {str(name): float(ms) for name, ms in json.load(f).items()}
+        schedule = {}
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            name, ms = (part.strip() for part in line.rsplit(",", 1))
+            schedule[name] = float(ms)
+        return schedule
+
+
+class SequenceSummary(NamedTuple):
+    """Outcome of writing one sequence file."""
+    path: str
+    patterns: int
+    # Frames in the sequence, counting repeats
+    frames: int
+    file_bytes: int
+    seconds: float
+
+
+def frame_count(dwell_ms: float, fps: float) -> int:
+    """
+    Number of frames a pattern is repeated for.
+
+    Args:
+        dwell_ms: Time the pattern stays on screen, in milliseconds
+        fps: Frame rate of the sequence
+
+    Returns:
+        The dwell in frames, at least one
+    """
+    # Rounded half up, so equal fractions of a frame always round the same way
+    return max(1, int(dwell_ms * fps / 1000 + 0.5))
+
+
+class TIFFSequenceWriter:
+    """
+    Writes frames as the pages of a multi-page TIFF.
+
+    A frame's strips are written once; the pages repeating it share them and
+    only add a directory each, so long dwell times barely grow the file.
+    """
+
+    def __init__(self, filepath: str, width: int, height: int, dtype: np.dtype,
+                 compression: int = TIFFEncoder.COMPRESSION_NONE,
+                 strip_rows: int = DEFAULT_STRIP_ROWS) -> None:
+        """
+        Args:
+            filepath: Path to write to
+            width: Frame width
+            height: Frame height
+            dtype: Sample type of the frames, uint8 or uint16
+            compression: TIFFEncoder.COMPRESSION_NONE or COMPRESSION_DEFLATE
+            strip_rows: Number of rows per strip
+        """
+        self.filepath = filepath
+        self.width = width
+        self.height = height
+        self.bits = np.dtype(dtype).itemsize * 8
+        self.compression = compression
+        self.strip_rows = strip_rows
+        self._file = open(filepath, "wb")
+        # Header; its directory offset is the first one filled in
+        self._file.write(b"II*\0\0\0\0\0")
+        self._next_offset = 4
+
+    def _strips(self, frame: Union[np.ndarray, RowPlan]) -> Iterator[np.ndarray]:
+        """Yield the frame's strips as RGB samples, top to bottom."""
+        if isinstance(frame, np.ndarray):
+            for top in range(0, self.height, self.strip_rows):
+                yield _tiff_rgb_rows(frame[top:top + self.strip_rows])
+        else:
+            rows = _tiff_rgb_rows(frame.templates).reshape(len(frame.templates), -1)
+            for top in range(0, self.height, self.strip_rows):
+                yield np.take(rows, frame.row_index[top:top + self.strip_rows], axis=0)
+
+    def write(self, frame: Union[np.ndarray, RowPlan], repeat: int = 1) -> None:
+        """
+        Append a frame as one or more identical pages.
+
+        Args:
+            frame: BGR frame, or a row plan describing it
+            repeat: Number of pages showing the frame
+        """
+        if frame.shape != (self.height, self.width, 3):
+            raise ValueError(f"Expected {self.width}x{self.height} BGR frames, got shape {frame.shape}")
+        f = self._file
+        offsets, counts = [], []
+        for strip in self._strips(frame):
+            data = zlib.compress(strip) if self.compression == TIFFEncoder.COMPRESSION_DEFLATE else strip
+            offsets.append(f.tell())
+            f.write(data)
+            counts.append(len(data) if isinstance(data, bytes) else data.nbytes)
+        directory = _write_tiff_directory(f, self.width, self.height, self.bits, self.compression,
+                                          self.strip_rows, offsets, counts)
+        first = f.tell()
+        if first + len(directory) * repeat >= 1 << 32:
+            raise ValueError(f"{self.filepath} is too large for a TIFF file; use a video or fewer patterns")
+        # Consecutive copies of the directory, each pointing at the next
+        pages = bytearray(directory * repeat)
+        for page in range(repeat - 1):
+            end = (page + 1) * len(directory)
+            pages[end - 4:end] = struct.pack("<I", first + end)
+        f.write(pages)
+        f.seek(self._next_offset)
+        f.write(struct.pack("<I", first))
+        f.seek(0, os.SEEK_END)
+        self._next_offset = first + len(pages) - 4
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class VideoSequenceWriter:
+    """Writes frames to a lossless video through cv2.VideoWriter."""
+
+    def __init__(self, filepath: str, width: int, height: int, fps: float = DEFAULT_FPS,
+                 codec: str = "FFV1") -> None:
+        """
+        Args:
+            filepath: Path to write to, ending in .mkv or .avi
+            width: Frame width
+            height: Frame height
+            fps: Frame rate
+            codec: One of VIDEO_CODECS
+        """
+        if codec not in VIDEO_CODECS:
+            raise ValueError(f"codec must be one of {VIDEO_CODECS}, got {codec}")
+        # OpenCV crops odd-sized frames to even sizes, which would lose the last row or column
+        if width % 2 or height % 2:
+            raise ValueError(f"Videos need even frame sizes, got {width}x{height}; use a .tiff sequence")
+        import cv2
+        self.filepath = filepath
+        self.width = width
+        self.height = height
+        self._writer = cv2.VideoWriter(filepath, cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+        if not self._writer.isOpened():
+            raise IOError(f"Failed to open {filepath} for writing with the {codec} codec")
+
+    def write(self, frame: np.ndarray, repeat: int = 1) -> None:
+        """
+        Append a frame, repeated for a number of video frames.
+
+        Args:
+            frame: 8-bit BGR frame
+            repeat: Number of video frames showing the frame
+        """
+        if frame.shape != (self.height, self.width, 3) or frame.dtype != np.uint8:
+            raise ValueError(f"Expected {self.width}x{self.height} 8-bit BGR frames, "
+                             f"got shape {frame.shape} of {frame.dtype}")
+        for _ in range(repeat):
+            self._writer.write(frame)
+
+    def close(self) -> None:
+        self._writer.release()
+
+
+def export_sequence(generator: PatternGenerator, filepath: str, fps: float = DEFAULT_FPS,
+                    dwell_ms: float = DEFAULT_DWELL_MS, schedule: Optional[Dict[str, float]] = None,
+                    names: Optional[List[str]] = None, codec: str = "FFV1") -> SequenceSummary:
+    """
+    Write a generator's patterns into a single sequence file.
+
+    Videos hold 8-bit frames; multi-page TIFFs also hold 16-bit frames and are
+    compressed like the TIFF files of the generator's encoder profile (Deflate
+    unless the profile writes uncompressed TIFF). TIFF pages are written from
+    row plans where the pattern has one, so the frame is never rendered in full;
+    video frames are rendered one at a time.
+
+    Args:
+        generator: Generator rendering the patterns
+        filepath: Output path; the extension selects a video (.mkv, .avi) or a TIFF (.tif, .tiff)
+        fps: Frame rate the dwell times are converted at
+        dwell_ms: Time each pattern stays on screen, in milliseconds
+        schedule: Per-pattern dwell times in milliseconds overriding dwell_ms,
+            keyed by pattern name or filename, e.g. from load_dwell_schedule
+        names: Pattern names in sequence order, or None for the full set
+        codec: Video codec, one of VIDEO_CODECS
+
+    Returns:
+        Summary of the written sequence
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension not in SEQUENCE_EXTENSIONS:
+        raise ValueError(f"Unsupported sequence file {filepath}; use one of {list(SEQUENCE_EXTENSIONS)}")
+    if fps <= 0:
+        raise ValueError(f"fps must be positive, got {fps}")
+    specs = generator.pattern_specs() if names is None else [generator.get_spec(name) for name in names]
+    schedule = schedule or {}
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    if extension in TIFF_EXTENSIONS:
+        # As in TIFFEncoder.encode_strips, LZW is not available without OpenCV
+        uncompressed = getattr(generator.encoder_for("sequence.tiff"), "compression", None) == \
+            TIFFEncoder.COMPRESSION_NONE
+        compression = TIFFEncoder.COMPRESSION_NONE if uncompressed else TIFFEncoder.COMPRESSION_DEFLATE
+        writer = TIFFSequenceWriter(filepath, generator.width, generator.height, generator.dtype, compression,
+                                    generator.strip_rows or DEFAULT_STRIP_ROWS)
+    else:
+        if generator.bit_depth > 8:
+            raise ValueError(f"Videos hold 8-bit frames; write {generator.bit_depth}-bit patterns to a .tiff sequence")
+        writer = VideoSequenceWriter(filepath, generator.width, generator.height, fps, codec)
+
+    frames = 0
+    try:
+        for spec in specs:
+            repeat = frame_count(schedule.get(spec.name, schedule.get(spec.filename, dwell_ms)), fps)
+            if spec.method not in generator.FLAT_METHODS and spec.method not in generator.ROW_PLAN_METHODS:
+                frame = generator._to_bgr(generator.render(spec))
+            elif extension in TIFF_EXTENSIONS:
+                frame = generator._to_bgr(generator.row_plan(spec))
+            else:
+                frame = generator._to_bgr(generator.row_plan(spec)).to_array()
+            writer.write(frame, repeat)
+            frames += repeat
+            logger.info(f"Added {spec.name} to {filepath} ({repeat} frames)")
+            # Release the frame before the next one is rendered
+            del frame
+    finally:
+        writer.close()
+
+    summary = SequenceSummary(filepath, len(specs), frames, os.path.getsize(filepath), time.perf_counter() - start)
+    logger.info(f"Wrote {summary.patterns} patterns as {summary.frames} frames to {filepath} "
+                f"({summary.file_bytes / 1e6:.1f} MB in {summary.seconds:.2f} s)")
+    return summary
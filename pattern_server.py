@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pattern Server
+
+This module serves test patterns over HTTP from a long-running process, so test
+stations can fetch encoded patterns without starting the generator or reading
+files from shared disk:
+
+    GET /pattern/{WIDTH}x{HEIGHT}/{name}.{format}   encoded pattern, e.g. /pattern/1920x1080/red.png
+    GET /pattern/{WIDTH}x{HEIGHT}                   JSON pattern names by category
+    GET /metrics                                    JSON request, cache and latency statistics
+
+Encoded patterns are kept in a least recently used cache bounded by size, and
+concurrent requests for a pattern that is not cached yet wait for a single
+render instead of rendering it once each. Responses carry a strong ETag derived
+from the pattern's cache key, so clients can revalidate with If-None-Match
+without the server rendering anything.
+"""
+
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple, Union
+
+from encoders import PROFILES, SUPPORTED_EXTENSIONS, Encoder
+from pattern_generator import PatternGenerator, parse_resolution
+from pattern_suite import PatternSuite, load_suite
+
+logger = logging.getLogger(__name__)
+
+# Memory budget for encoded patterns
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# Largest frame the server renders, in pixels (16K x 16K)
+DEFAULT_MAX_PIXELS = 16384 * 16384
+
+# Seconds clients may reuse a response before revalidating it
+DEFAULT_MAX_AGE = 3600
+
+# Number of recent request latencies kept for the metrics percentiles
+_LATENCY_WINDOW = 1000
+
+# Content type of every extension in encoders.SUPPORTED_EXTENSIONS
+_CONTENT_TYPES = {
+    ".bmp": "image/bmp",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".ppm": "image/x-portable-pixmap"
+}
+
+
+class EncodedCache:
+    """
+    Least recently used cache of encoded patterns, bounded by total size in bytes.
+
+    get_or_create coalesces concurrent misses: the first caller for a key
+    creates the value while later callers wait for its result.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _put(self, key: Hashable, data: bytes) -> None:
+        """Add an entry, evicting least recently used entries to stay within budget. Call with the lock held."""
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self.current_bytes -= len(self._entries.pop(key))
+        while self._entries and self.current_bytes + len(data) > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+        self._entries[key] = data
+        self.current_bytes += len(data)
+
+    def get_or_create(self, key: Hashable, create: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """
+        Return the cached value for a key, creating it once on a miss.
+
+        Args:
+            key: Cache key
+            create: Function producing the value; called by at most one thread per missing key
+
+        Returns:
+            Tuple of (value, whether it came from the cache without waiting for a render)
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data, True
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result(), False
+        try:
+            data = create()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._put(key, data)
+            del self._pending[key]
+        future.set_result(data)
+        return data, False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit and size counters."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "entries": len(self._entries), "bytes": self.current_bytes, "max_bytes": self.max_bytes}
+
+
+class PatternService:
+    """Renders, encodes and caches patterns for the HTTP handler."""
+
+    def __init__(self, encoder_profile: Union[str, Dict[str, Encoder]] = "default", bit_depth: int = 8,
+                 suite: Optional[PatternSuite] = None, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 max_pixels: int = DEFAULT_MAX_PIXELS, max_age: int = DEFAULT_MAX_AGE) -> None:
+        """
+        Args:
+            encoder_profile: Encoder profile name or mapping of file extensions to encoders
+            bit_depth: Bits per channel of the served patterns
+            suite: Pattern suite to serve instead of the built-in pattern set
+            cache_bytes: Memory budget for encoded patterns
+            max_pixels: Largest frame to render, in pixels; larger requests are rejected
+            max_age: Seconds clients may reuse a response before revalidating it
+        """
+        self.encoder_profile = encoder_profile
+        self.bit_depth = bit_depth
+        self.suite = suite
+        self.max_pixels = max_pixels
+        self.max_age = max_age
+        self.cache = EncodedCache(cache_bytes)
+        self._generators: Dict[Tuple[int, int], PatternGenerator] = {}
+        self._generators_lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+        self.started = time.time()
+
+    def generator(self, resolution: str) -> PatternGenerator:
+        """
+        Return the generator for a resolution, creating it on first use.
+
+        Args:
+            resolution: Resolution as WIDTHxHEIGHT
+
+        Returns:
+            The generator
+        """
+        width, height = parse_resolution(resolution)
+        if width * height > self.max_pixels:
+            raise ValueError(f"Resolution {width}x{height} exceeds the limit of {self.max_pixels} pixels")
+        with self._generators_lock:
+            generator = self._generators.get((width, height))
+            if generator is None:
+                generator = PatternGenerator(width, height, encoder_profile=self.encoder_profile,
+                                             bit_depth=self.bit_depth, suite=self.suite)
+                self._generators[(width, height)] = generator
+            return generator
+
+    def etag(self, generator: PatternGenerator, name: str, extension: str) -> str:
+        """
+        Compute the ETag of an encoded pattern without rendering it.
+
+        Args:
+            generator: Generator for the requested resolution
+            name: Pattern name
+            extension: File extension with dot
+
+        Returns:
+            The quoted ETag
+        """
+        spec = generator.get_spec(name)
+        return '"' + generator.cache_key(spec._replace(filename=spec.filename + extension)) + '"'
+
+    def encode(self, generator: PatternGenerator, name: str, extension: str) -> bytes:
+        """Render and encode one pattern."""
+        start = time.perf_counter()
+        # Described patterns are encoded from their rows where the format allows,
+        # so a render never holds more than the frame the encoder needs
+        spec = generator.get_spec(name)
+        image = generator.render_flat(spec)
+        if image is None and spec.method in generator.ROW_PLAN_METHODS:
+            image = generator.row_plan(spec)
+        elif image is None:
+            image = generator.render(spec)
+        data = generator.encode_image(image, name + extension)
+        with self._stats_lock:
+            self.renders += 1
+            self.render_seconds += time.perf_counter() - start
+        return data
+
+    def pattern(self, generator: PatternGenerator, name: str, extension: str, etag: str) -> Tuple[bytes, bool]:
+        """
+        Return an encoded pattern from the cache, rendering it once if it is missing.
+
+        Args:
+            generator: Generator for the requested resolution
+            name: Pattern name
+            extension: File extension with dot
+            etag: The pattern's ETag, which also keys the cache
+
+        Returns:
+            Tuple of (encoded bytes, whether it was a cache hit)
+        """
+        return self.cache.get_or_create(etag, lambda: self.encode(generator, name, extension))
+
+    def record(self, seconds: float, status: int) -> None:
+        """Record the latency and outcome of a request."""
+        with self._stats_lock:
+            self.requests += 1
+            self._latencies.append(seconds)
+            if status == 304:
+                self.not_modified += 1
+            elif status >= 400:
+                self.errors += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Describe the server's activity so far.
+
+        Returns:
+            A JSON-serializable dictionary of request, render, cache and latency statistics
+        """
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            metrics = {
+                "uptime_seconds": time.time() - self.started,
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "errors": self.errors,
+                "renders": self.renders,
+                "render_seconds": self.render_seconds
+            }
+
+        def percentile(fraction: float) -> float:
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+        metrics["latency_ms"] = {
+            "mean": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+            "window": len(latencies)
+        }
+        metrics["cache"] = self.cache.stats()
+        return metrics
+
+
+class PatternRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler for the pattern, listing and metrics endpoints."""
+
+    server_version = "PatternServer/1.0"
+    # Set on the handler class created for each server
+    service: PatternService
+
+    def do_GET(self) -> None:
+        start = time.perf_counter()
+        status = 500
+        try:
+            status = self._handle()
+        except Exception as e:
+            logger.error(f"Error serving {self.path}: {e}")
+            status = self._send_error(500, str(e))
+        finally:
+            self.service.record(time.perf_counter() - start, status)
+
+    def _handle(self) -> int:
+        """Serve the request and return the response status."""
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if parts == ["metrics"]:
+            return self._send_json(self.service.metrics())
+        if len(parts) not in (2, 3) or parts[0] != "pattern":
+            return self._send_error(404, f"Unknown path {self.path}")
+        try:
+            generator = self.service.generator(parts[1])
+        except ValueError as e:
+            return self._send_error(400, str(e))
+        if len(parts) == 2:
+            # Every name /pattern/WxH/NAME serves, including the preview-only patterns
+            return self._send_json(generator.pattern_categories(preview=True))
+
+        name, dot, fmt = parts[2].rpartition(".")
+        extension = "." + fmt.lower()
+        if not dot or extension not in SUPPORTED_EXTENSIONS:
+            return self._send_error(404, f"Unknown format in {parts[2]}; use one of {list(SUPPORTED_EXTENSIONS)}")
+        try:
+            etag = self.service.etag(generator, name, extension)
+        except ValueError as e:
+            return self._send_error(404, str(e))
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={self.service.max_age}"}
+
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self.send_response(304)
+            for header, value in headers.items():
+                self.send_header(header, value)
+            self.end_headers()
+            return 304
+
+        try:
+            data, hit = self.service.pattern(generator, name, extension, etag)
+        except (ValueError, TypeError, KeyError) as e:
+            # Patterns that cannot be rendered at this resolution or bit depth, e.g. a suite
+            # layer whose values only fail once they are applied
+            logger.warning(f"Cannot render {self.path}: {e!r}")
+            return self._send_error(400, f"Cannot render {name}: {e}")
+        headers["X-Cache"] = "HIT" if hit else "MISS"
+        return self._send(200, data, _CONTENT_TYPES.get(extension, "application/octet-stream"), headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> int:
+        """Send a complete response and return its status."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def _send_json(self, payload: Any, status: int = 200) -> int:
+        return self._send(status, json.dumps(payload, indent=1).encode(), "application/json",
+                          {"Cache-Control": "no-store"})
+
+    def _send_error(self, status: int, message: str) -> int:
+        return self._send_json({"error": message}, status)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host: str, port: int, service: PatternService) -> ThreadingHTTPServer:
+    """
+    Create a threaded HTTP server for a pattern service.
+
+    Args:
+        host: Address to listen on
+        port: Port to listen on; 0 picks a free port
+        service: Service answering the requests
+
+    Returns:
+        The server, ready for serve_forever()
+    """
+    handler = type("BoundPatternRequestHandler", (PatternRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve display test patterns over HTTP.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--profile', choices=list(PROFILES), default='default',
+                        help='Encoder settings: fastest favours encode time, smallest favours file size')
+    parser.add_argument('--bit-depth', type=int, choices=PatternGenerator.BIT_DEPTHS, default=8,
+                        help='Bits per channel; deeper than 8 can be served as png, tiff or ppm')
+    parser.add_argument('--suite', type=str, default=None,
+                        help='JSON or YAML pattern suite to serve instead of the built-in pattern set')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                        help='Memory budget for encoded patterns')
+    parser.add_argument('--max-age', type=int, default=DEFAULT_MAX_AGE,
+                        help='Seconds clients may reuse a pattern before revalidating it')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    suite = load_suite(args.suite) if args.suite else None
+    service = PatternService(args.profile, args.bit_depth, suite, args.cache_mb * 1024 * 1024,
+                             max_age=args.max_age)
+    server = make_server(args.host, args.port, service)
+    logger.info(f"Serving patterns on http://{args.host}:{server.server_address[1]}/pattern/WIDTHxHEIGHT/NAME.FORMAT")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
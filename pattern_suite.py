@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pattern Suites
+
+This module loads declarative pattern suites, so new sets of patterns can be
+defined without code changes. A suite is a JSON or YAML file that lists
+patterns as stacks of layers:
+
+    name: panel_qa
+    colors:
+      orange: [255, 128, 0]
+    patterns:
+      - name: window_white
+        category: Window
+        layers:
+          - fill: black
+          - rect: ["40%", "40%", "60%", "60%"]
+            color: white
+      - name: orange_checker
+        layers:
+          - fill: orange
+          - checker: 4
+            color: black
+
+Layers are painted bottom first over a black frame:
+
+- ``fill: COLOR`` paints the whole frame
+- ``rect: [x0, y0, x1, y1]`` paints a rectangle; coordinates are pixels or
+  percentages of the frame, end coordinates are exclusive
+- ``grid: [rows, cols]`` paints alternating cells of a grid, like the built-in grids
+- ``checker: SIZE`` paints alternating squares of a checkerboard
+- ``ramp: horizontal|vertical`` paints a gray gradient, optionally ``reversed``
+  and quantized to ``levels``
+
+Colors are names from the color table or the suite's ``colors``, or [r, g, b]
+lists. PatternGenerator compiles every pattern into a flat pattern or row plan
+(see PatternGenerator.layer_plan), so suite patterns render and save as fast as
+the built-in ones.
+"""
+
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from pattern_generator import COLORS, PatternGenerator, PatternSpec
+
+try:
+    import yaml
+except ImportError:  # YAML suites need PyYAML; JSON suites work without it
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+# Filenames a suite pattern may be saved under, without the extension
+_FILENAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class PatternSuite(NamedTuple):
+    """A named set of declarative patterns."""
+    name: str
+    # Colors the suite adds to the color table (RGB format)
+    colors: Dict[str, Tuple[int, int, int]]
+    # One generate_layers spec per pattern, in suite order
+    specs: List[PatternSpec]
+
+
+def _check_color(color: Any, colors: Dict[str, Tuple[int, int, int]], where: str) -> None:
+    """Raise ValueError unless a layer color is a known name or an [r, g, b] list."""
+    if isinstance(color, str):
+        if color not in colors:
+            raise ValueError(f"{where}: unknown color {color!r}")
+    elif (not isinstance(color, list) or len(color) != 3
+          or not all(isinstance(value, int) and 0 <= value <= 255 for value in color)):
+        raise ValueError(f"{where}: colors must be names or [r, g, b] lists of 0-255 values, got {color!r}")
+
+
+def _check_ramp(layer: Dict[str, Any], where: str) -> None:
+    """Raise ValueError unless a ramp layer has a direction, a boolean reversed and integer levels."""
+    if layer["ramp"] not in ("horizontal", "vertical"):
+        raise ValueError(f"{where}: ramp must be horizontal or vertical, got {layer['ramp']!r}")
+    if not isinstance(layer.get("reversed", False), bool):
+        raise ValueError(f"{where}: ramp reversed must be true or false, got {layer['reversed']!r}")
+    levels = layer.get("levels")
+    # The upper bound depends on the bit depth, so it is checked when the pattern is rendered
+    if levels is not None and (isinstance(levels, bool) or not isinstance(levels, int) or levels < 2):
+        raise ValueError(f"{where}: ramp levels must be an integer of at least 2, got {levels!r}")
+
+
+def parse_suite(data: Dict[str, Any], default_name: str = "suite") -> PatternSuite:
+    """
+    Build a pattern suite from its parsed JSON or YAML document.
+
+    The structure and colors are checked here; values that depend on the
+    resolution or bit depth are checked when a pattern is rendered.
+
+    Args:
+        data: The parsed document
+        default_name: Suite name to use if the document has none
+
+    Returns:
+        The pattern suite
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("patterns"), list):
+        raise ValueError("A pattern suite must be a mapping with a list of patterns")
+    if not data["patterns"]:
+        raise ValueError("A pattern suite needs at least one pattern")
+
+    if not isinstance(data.get("colors") or {}, dict):
+        raise ValueError(f"Suite colors must be a mapping of names to [r, g, b] lists, got {data['colors']!r}")
+    suite_colors = {}
+    for color_name, rgb in (data.get("colors") or {}).items():
+        _check_color(rgb, {}, f"Color {color_name}")
+        suite_colors[color_name] = tuple(rgb)
+    colors = dict(COLORS, **suite_colors)
+
+    specs = []
+    names = set()
+    filenames = {}
+    for position, pattern in enumerate(data["patterns"]):
+        if not isinstance(pattern, dict) or not isinstance(pattern.get("name"), str):
+            raise ValueError(f"Pattern {position} needs a name")
+        name = pattern["name"]
+        if name in names:
+            raise ValueError(f"Pattern {name} is defined twice")
+        names.add(name)
+        filename = pattern.get("filename", name)
+        if not isinstance(filename, str) or not _FILENAME_PATTERN.match(filename):
+            raise ValueError(f"Pattern {name}: filename {filename!r} may only hold letters, digits, '_', '-' and '.'")
+        if filename in filenames:
+            raise ValueError(f"Pattern {name}: filename {filename!r} is already used by pattern {filenames[filename]}")
+        filenames[filename] = name
+        layers = pattern.get("layers")
+        if not isinstance(layers, list) or not layers:
+            raise ValueError(f"Pattern {name} needs a non-empty list of layers")
+        for layer in layers:
+            if not isinstance(layer, dict):
+                raise ValueError(f"Pattern {name}: layers must be mappings, got {layer!r}")
+            kinds = [kind for kind in PatternGenerator.LAYER_KEYS if kind in layer]
+            if len(kinds) != 1:
+                raise ValueError(f"Pattern {name}: each layer needs exactly one of "
+                                 f"{list(PatternGenerator.LAYER_KEYS)}, got {layer!r}")
+            unknown = set(layer) - set(PatternGenerator.LAYER_KEYS[kinds[0]])
+            if unknown:
+                raise ValueError(f"Pattern {name}: unknown keys {sorted(unknown)} in {kinds[0]} layer")
+            if kinds[0] == "fill":
+                _check_color(layer["fill"], colors, f"Pattern {name}")
+            elif kinds[0] == "ramp":
+                _check_ramp(layer, f"Pattern {name}")
+            elif "color" in layer:
+                _check_color(layer["color"], colors, f"Pattern {name}")
+        specs.append(PatternSpec(name, filename, "generate_layers", {"layers": layers},
+                                 pattern.get("category", "Custom")))
+
+    return PatternSuite(data.get("name", default_name), suite_colors, specs)
+
+
+def load_suite(path: str) -> PatternSuite:
+    """
+    Load a pattern suite from a JSON or YAML file.
+
+    Args:
+        path: Path to a .json, .yaml or .yml file
+
+    Returns:
+        The pattern suite, named after the file unless it names itself
+    """
+    with open(path) as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError(f"Reading {path} requires PyYAML (pip install pyyaml); or use a JSON suite")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    suite = parse_suite(data, os.path.splitext(os.path.basename(path))[0])
+    logger.info(f"Loaded pattern suite {suite.name} with {len(suite.specs)} patterns from {path}")
+    return suite
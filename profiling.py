@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pattern Profiling
+
+This module provides opt-in profiling for PatternGenerator. A Profiler measures
+each generate_* and save_image call, splitting saves into encode and
+file-write time, and passes one record per call to pluggable sinks (an
+in-memory collector or a JSON lines file). It also keeps running totals for an
+end-of-run summary.
+"""
+
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileRecord(NamedTuple):
+    """Measurements for one profiled call."""
+    # Pattern name, filename or generator method the call worked on
+    name: str
+    # "generate" or "save"
+    stage: str
+    # Wall time of the call, excluding time spent in nested profiled calls
+    seconds: float
+    # Bytes allocated for the result (generate)
+    alloc_bytes: int = 0
+    # Uncompressed frame bytes encoded, and bytes written to disk (save)
+    frame_bytes: int = 0
+    file_bytes: int = 0
+    # Split of a save between encoding and file I/O. Encoders that write while
+    # encoding (row streaming, strips) report their whole time as encode time.
+    encode_seconds: float = 0.0
+    write_seconds: float = 0.0
+    # Resolution of the generator, e.g. "3840x2160"
+    resolution: str = ""
+    thread: str = ""
+    timestamp: float = 0.0
+
+
+class MemorySink:
+    """Sink collecting records in memory."""
+
+    def __init__(self) -> None:
+        self.records: List[ProfileRecord] = []
+        self._lock = threading.Lock()
+
+    def emit(self, record: ProfileRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def close(self) -> None:
+        pass
+
+
+class JSONLinesSink:
+    """Sink appending one JSON object per record to a file."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: File to append records to
+        """
+        self.path = path
+        # Line buffered, so records reach the file as they are emitted
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def emit(self, record: ProfileRecord) -> None:
+        line = json.dumps(record._asdict())
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def allocated_bytes(result: Any) -> int:
+    """
+    Estimate the memory a generator result allocated.
+
+    Args:
+        result: An image, a flat pattern or row plan, or a dictionary of images
+
+    Returns:
+        Size in bytes of the arrays the result holds
+    """
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, dict):
+        return sum(allocated_bytes(value) for value in result.values())
+    if isinstance(result, tuple):
+        return sum(allocated_bytes(value) for value in result)
+    return 0
+
+
+class Profiler:
+    """
+    Measures profiled calls and forwards a record for each to its sinks.
+
+    Nested calls on the same thread (a generate_* call saving its image) are
+    recorded separately, and their time is excluded from the enclosing call,
+    so generate and save time never overlap in the totals.
+    """
+
+    def __init__(self, sinks: Optional[List[Any]] = None) -> None:
+        """
+        Args:
+            sinks: Objects with emit(record) and close() methods; defaults to one MemorySink
+        """
+        self.sinks = list(sinks) if sinks is not None else [MemorySink()]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._patterns: Dict[str, float] = {}
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        """Return this thread's stack of open measurements."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def active(self, stage: str) -> bool:
+        """Whether a measurement of the given stage is already open on this thread."""
+        return any(frame["stage"] == stage for frame in self._stack())
+
+    @contextmanager
+    def measure(self, stage: str, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Measure a block of code.
+
+        Args:
+            stage: Stage the block belongs to, e.g. "generate" or "save"
+            name: Pattern name, filename or method the block works on
+            **fields: Further ProfileRecord fields known up front, e.g. resolution
+
+        Yields:
+            A dictionary the block fills with further ProfileRecord fields
+            (alloc_bytes, file_bytes, ...). Nothing is recorded if the block raises.
+        """
+        frame = {"stage": stage, "child_seconds": 0.0}
+        stack = self._stack()
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException:
+            stack.pop()
+            raise
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1]["child_seconds"] += elapsed
+        self.emit(ProfileRecord(name=name, stage=stage, seconds=elapsed - frame["child_seconds"],
+                                thread=threading.current_thread().name, timestamp=time.time(), **fields))
+
+    def emit(self, record: ProfileRecord) -> None:
+        """Add a record to the totals and pass it to every sink."""
+        with self._lock:
+            totals = self._totals.setdefault(record.stage, dict.fromkeys(
+                ("calls", "seconds", "alloc_bytes", "frame_bytes", "file_bytes",
+                 "encode_seconds", "write_seconds"), 0))
+            totals["calls"] += 1
+            for key in ("seconds", "alloc_bytes", "frame_bytes", "file_bytes", "encode_seconds", "write_seconds"):
+                totals[key] += getattr(record, key)
+            self._patterns[record.name] = self._patterns.get(record.name, 0.0) + record.seconds
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return the totals recorded so far.
+
+        Returns:
+            Dictionary of stage names to totals (calls, seconds, alloc_bytes,
+            frame_bytes, file_bytes, encode_seconds, write_seconds)
+        """
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._totals.items()}
+
+    def format_summary(self, top: int = 5) -> str:
+        """
+        Format the totals as a plain-text report.
+
+        Args:
+            top: Number of slowest patterns to list
+
+        Returns:
+            The report
+        """
+        summary = self.summary()
+        lines = [f"{'Stage':>10}  {'Calls':>6}  {'Time (s)':>9}  {'Encode (s)':>10}  {'Write (s)':>9}  "
+                 f"{'Alloc MB':>9}  {'Written MB':>10}"]
+        for stage, totals in summary.items():
+            lines.append(f"{stage:>10}  {int(totals['calls']):>6}  {totals['seconds']:>9.3f}  "
+                         f"{totals['encode_seconds']:>10.3f}  {totals['write_seconds']:>9.3f}  "
+                         f"{totals['alloc_bytes'] / 1e6:>9.1f}  {totals['file_bytes'] / 1e6:>10.1f}")
+        with self._lock:
+            slowest = sorted(self._patterns.items(), key=lambda item: item[1], reverse=True)[:top]
+        if slowest:
+            lines.append("Slowest: " + ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in slowest))
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Clear the totals; records already passed to sinks are kept there."""
+        with self._lock:
+            self._totals.clear()
+            self._patterns.clear()
+
+    def close(self) -> None:
+        """Close every sink."""
+        for sink in self.sinks:
+            sink.close()
+
+
+def profiled(stage: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator recording calls of a method through its object's ``profiler``.
+
+    Calls are only measured when the object has a profiler and no measurement
+    of the same stage is already open on the thread, so a method called from
+    an already profiled export is not recorded twice.
+
+    Args:
+        stage: Stage to record the calls under
+
+    Returns:
+        The decorator
+    """
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            profiler = getattr(self, "profiler", None)
+            if profiler is None or profiler.active(stage):
+                return method(self, *args, **kwargs)
+            with profiler.measure(stage, method.__name__, resolution=f"{self.width}x{self.height}") as fields:
+                result = method(self, *args, **kwargs)
+                fields["alloc_bytes"] = allocated_bytes(result)
+            return result
+        return wrapper
+    return decorate
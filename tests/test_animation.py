@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from pattern_animation import FrameRing, flicker, moving_bar, scrolling_gradient
+from pattern_generator import PatternGenerator
+
+WIDTH, HEIGHT = 64, 36
+
+
+@pytest.fixture
+def generator():
+    return PatternGenerator(WIDTH, HEIGHT)
+
+
+def test_ring_reuses_its_buffers(generator):
+    animation = moving_bar(generator, bar_size=4, speed=3)
+    ring = FrameRing(animation.shape, animation.dtype, slots=3)
+    buffers = [buffer.__array_interface__["data"][0] for buffer in ring.buffers]
+    for index in range(10):
+        frame = ring.render(animation, index)
+        assert frame is ring.buffers[index % 3]
+    assert [buffer.__array_interface__["data"][0] for buffer in ring.buffers] == buffers
+
+
+def test_ring_rejects_other_shapes(generator):
+    ring = FrameRing((HEIGHT, WIDTH + 1, 3), np.uint8)
+    with pytest.raises(ValueError):
+        ring.render(moving_bar(generator), 0)
+
+
+@pytest.mark.parametrize("vertical", [False, True])
+@pytest.mark.parametrize("speed", [3, -5])
+def test_moving_bar_frame_is_shifted_window(generator, vertical, speed):
+    animation = moving_bar(generator, bar_size=4, speed=speed, vertical=vertical)
+    axis = 0 if vertical else 1
+    length = HEIGHT if vertical else WIDTH
+    background = np.array(generator.color_pixel("black"), np.uint8)
+    bar = np.array(generator.color_pixel("white"), np.uint8)
+    first = animation.render(0)
+    ring = FrameRing(animation.shape, animation.dtype)
+    for index in (0, 1, 7, animation.period - 1, animation.period, 2 * animation.period + 5):
+        frame = ring.render(animation, index)
+        np.testing.assert_array_equal(frame, np.roll(first, index * speed, axis=axis), err_msg=str(index))
+        # The bar covers the 4 lines starting at its offset, wrapping around
+        lines = (np.arange(4) + index * speed) % length
+        line = frame[:, 0] if vertical else frame[0]
+        assert (line[lines] == bar).all()
+        assert (np.delete(line, lines, axis=0) == background).all()
+
+
+def test_scrolling_gradient_and_flicker_wrap(generator):
+    gradient = scrolling_gradient(generator, speed=2)
+    np.testing.assert_array_equal(gradient.render(gradient.period), gradient.render(0))
+    np.testing.assert_array_equal(gradient.render(5), np.roll(generator.render("grayscale"), 10, axis=1))
+
+    animation = flicker(generator, ("red", "green"), frames_per_color=2)
+    expected = [generator.render(color) for color in ("red", "red", "green", "green", "red")]
+    for index, frame in enumerate(expected):
+        np.testing.assert_array_equal(animation.render(index), frame)
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pattern_generator import generate_batch
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_generate_batch_rejects_no_resolutions():
+    with pytest.raises(ValueError):
+        generate_batch([])
+
+
+@pytest.mark.parametrize("option, value", [("--resolutions", " "), ("--manifest", "empty.txt")])
+def test_cli_rejects_empty_resolution_lists(tmp_path, option, value):
+    (tmp_path / "empty.txt").write_text("# nothing here\n")
+    env = dict(os.environ, PYTHONPATH=REPO)
+    result = subprocess.run([sys.executable, "-m", "pattern_generator", option, value], cwd=tmp_path,
+                            capture_output=True, text=True, env=env)
+    assert result.returncode == 2, result.stderr
+    assert "no resolutions" in result.stderr and "Traceback" not in result.stderr
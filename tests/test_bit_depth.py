@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+
+from pattern_generator import PatternGenerator
+
+# Wide enough for a full-range 10-bit gradient to hold every code
+WIDTH, HEIGHT = 1024, 8
+
+
+def _generator(tmp_path, image_format, bit_depth):
+    generator = PatternGenerator(WIDTH, HEIGHT, image_format, bit_depth=bit_depth)
+    generator.output_dir = str(tmp_path)
+    return generator
+
+
+def _codes(image, bit_depth):
+    """Code values of stored 16-bit samples, asserting they are exact LUT outputs."""
+    max_code = (1 << bit_depth) - 1
+    codes = np.round(image.astype(np.float64) * max_code / 65535).astype(np.int64)
+    np.testing.assert_array_equal(np.round(codes * 65535 / max_code), image)
+    return codes
+
+
+@pytest.mark.parametrize("image_format", ["png", "tiff", "ppm"])
+@pytest.mark.parametrize("bit_depth", [10, 16])
+def test_deep_images_round_trip(tmp_path, image_format, bit_depth):
+    generator = _generator(tmp_path, image_format, bit_depth)
+    for name in ("white", "red", "grayscale", "32x3A", "crosstalk_gray32_black"):
+        expected = generator.render(name)
+        path = generator.save_image(expected, generator.get_spec(name).filename)
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        assert image.dtype == np.uint16, name
+        np.testing.assert_array_equal(image, expected, err_msg=name)
+        _codes(image, bit_depth)
+
+    white = cv2.imread(generator.save_image(generator.render("white"), "white_check"), cv2.IMREAD_UNCHANGED)
+    assert (white == 65535).all()
+
+
+@pytest.mark.parametrize("bit_depth", [10, 16])
+def test_gradient_is_quantized_per_code(tmp_path, bit_depth):
+    generator = _generator(tmp_path, "png", bit_depth)
+    path = generator.save_image(generator.render("grayscale"), "grayscale")
+    codes = _codes(cv2.imread(path, cv2.IMREAD_UNCHANGED)[0, :, 0], bit_depth)
+    # Column x shows code x * max_code // width, black at the left edge
+    max_code = (1 << bit_depth) - 1
+    np.testing.assert_array_equal(codes, np.arange(WIDTH) * max_code // WIDTH)
+
+
+@pytest.mark.parametrize("image_format", ["png", "tiff", "ppm"])
+@pytest.mark.parametrize("bit_depth", [10, 16])
+def test_dithered_gradient_round_trips(tmp_path, image_format, bit_depth):
+    generator = _generator(tmp_path, image_format, bit_depth)
+    levels = 64
+    expected = generator.generate_grayscale(levels, dither=True, save=False)
+    path = generator.save_image(expected, "grayscale_dithered")
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    np.testing.assert_array_equal(image, expected)
+    codes = _codes(image, bit_depth)
+    # Dithering only picks between the requested levels
+    max_code = (1 << bit_depth) - 1
+    assert set(np.unique(codes)) <= {step * max_code // (levels - 1) for step in range(levels)}
+    assert len(np.unique(codes)) == levels
+
+
+@pytest.mark.parametrize("image_format", ["bmp", "jpg"])
+def test_save_image_rejects_unsupported_bit_depths(tmp_path, image_format):
+    generator = _generator(tmp_path, image_format, 16)
+    with pytest.raises(ValueError, match="16-bit"):
+        generator.save_image(generator.render("white"), "white")
+    with pytest.raises(ValueError, match="16-bit"):
+        generator.save_image(generator.render_flat("white"), "white")
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from pattern_cache import INDEX_FILENAME, PatternCache
+from pattern_generator import PatternGenerator, generate_batch
+
+RESOLUTION = (32, 18)
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def _run(cache, resolutions=(RESOLUTION,), **kwargs):
+    return generate_batch(list(resolutions), cache=cache, **kwargs)
+
+
+def _output_dir(width, height):
+    return os.path.join("patterns", f"{width}x{height}")
+
+
+def test_rerun_without_changes_skips_every_pattern():
+    first, = _run(PatternCache())
+    assert first.patterns > 0 and first.cached == 0
+    mtimes = {name: os.stat(os.path.join(_output_dir(*RESOLUTION), name)).st_mtime_ns
+              for name in os.listdir(_output_dir(*RESOLUTION))}
+
+    cache = PatternCache()
+    second, = _run(cache)
+    assert (second.patterns, second.cached) == (0, first.patterns)
+    assert (cache.hits, cache.misses) == (first.patterns, 0)
+    for name, mtime in mtimes.items():
+        if name != INDEX_FILENAME:
+            assert os.stat(os.path.join(_output_dir(*RESOLUTION), name)).st_mtime_ns == mtime
+
+
+def test_edited_file_is_regenerated():
+    first, = _run(PatternCache())
+    path = os.path.join(_output_dir(*RESOLUTION), "solid_red.bmp")
+    with open(path, "rb") as f:
+        original = f.read()
+    with open(path, "r+b") as f:
+        f.seek(-3, os.SEEK_END)
+        f.write(b"\x01\x02\x03")
+
+    second, = _run(PatternCache())
+    assert (second.patterns, second.cached) == (1, first.patterns - 1)
+    with open(path, "rb") as f:
+        assert f.read() == original
+
+
+@pytest.mark.parametrize("changed", [{"encoder_profile": "smallest"}, {"bit_depth": 16}])
+def test_profile_and_bit_depth_change_the_key(changed):
+    base = PatternGenerator(*RESOLUTION, "png")
+    other = PatternGenerator(*RESOLUTION, "png", **changed)
+    spec = base.get_spec("grayscale")
+    assert base.cache_key(spec) != other.cache_key(spec)
+    assert base.cache_key(spec) == PatternGenerator(*RESOLUTION, "png").cache_key(spec)
+
+    first, = _run(PatternCache(), image_format="png")
+    second, = _run(PatternCache(), image_format="png", **changed)
+    assert (second.patterns, second.cached) == (first.patterns, 0)
+
+
+def test_prune_removes_only_recorded_files():
+    _run(PatternCache())
+    output_dir = _output_dir(*RESOLUTION)
+    foreign = os.path.join(output_dir, "notes.bmp")
+    with open(foreign, "w") as f:
+        f.write("not a pattern")
+    bmp_files = {name for name in os.listdir(output_dir) if name.endswith(".bmp")} - {"notes.bmp"}
+
+    _run(PatternCache(), image_format="png", prune=True)
+    remaining = set(os.listdir(output_dir))
+    assert not bmp_files & remaining
+    assert "notes.bmp" in remaining
+    with open(os.path.join(output_dir, INDEX_FILENAME)) as f:
+        assert all(name.endswith(".png") for name in json.load(f))
+
+
+def test_eviction_drops_least_recently_used_files():
+    small, large = RESOLUTION, (48, 27)
+    _run(PatternCache(), [small, large])
+    with open(os.path.join(_output_dir(*large), INDEX_FILENAME)) as f:
+        large_bytes = sum(entry["size"] for entry in json.load(f).values())
+
+    # Rerunning only the large set touches its files, leaving the small set least recently used
+    cache = PatternCache(max_bytes=large_bytes)
+    summary, = _run(cache, [large])
+    assert summary.patterns == 0
+    assert not [name for name in os.listdir(_output_dir(*small)) if name.endswith(".bmp")]
+    with open(os.path.join(_output_dir(*small), INDEX_FILENAME)) as f:
+        assert json.load(f) == {}
+    large_files = [name for name in os.listdir(_output_dir(*large)) if name.endswith(".bmp")]
+    assert len(large_files) == summary.cached
+
+
+def test_eviction_keeps_files_within_budget(tmp_path):
+    cache = PatternCache(str(tmp_path), max_bytes=250)
+    output_dir = str(tmp_path / "8x8")
+    os.makedirs(output_dir)
+    for name in ("a.bmp", "b.bmp", "c.bmp"):
+        with open(os.path.join(output_dir, name), "wb") as f:
+            f.write(bytes(100))
+        cache.record(output_dir, name, name)
+    assert cache.lookup(output_dir, "a.bmp", "a.bmp")
+
+    assert cache.evict() == 100
+    assert sorted(os.listdir(output_dir)) == ["a.bmp", "c.bmp"]
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from frame_store import FrameStore, build_frame_store
+from pattern_generator import PatternGenerator
+
+
+def test_empty_pattern_list_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="at least one pattern"):
+        build_frame_store(PatternGenerator(32, 18), str(tmp_path / "store"), names=[])
+    assert not (tmp_path / "store").exists()
+
+
+def test_stored_frames_match_rendered_frames(tmp_path):
+    generator = PatternGenerator(33, 17)
+    names = ["red", "grayscale", "32x3A", "crosstalk_white_black"]
+    store = FrameStore(build_frame_store(generator, str(tmp_path / "store"), names=names))
+    assert store.pattern_names() == names
+    for name in names:
+        assert np.array_equal(store.get(name), generator.render(name))
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+import pytest
+
+from pattern_generator import COLORS, PatternGenerator
+
+RESOLUTIONS = [(64, 36), (65, 37), (33, 17), (7, 5), (1920, 1080)]
+
+
+def legacy_grid(width, height, rows, cols, line_color, background_color):
+    """The original grid renderer, filling every cell with cv2.fillPoly."""
+    image = np.zeros((height, width, 3), np.uint8)
+    image[:] = tuple(reversed(COLORS[background_color]))
+    cell_width = width // cols
+    cell_height = height // rows
+    for y in range(rows):
+        for x in range(cols):
+            top_left_x = x * cell_width
+            top_left_y = y * cell_height
+            bottom_right_x = (x + 1) * cell_width
+            bottom_right_y = (y + 1) * cell_height
+            if (x + y) % 2 == 0:
+                cell_color = COLORS[line_color]
+            else:
+                cell_color = COLORS[background_color]
+            pts = np.array([
+                [top_left_x, top_left_y],
+                [bottom_right_x, top_left_y],
+                [bottom_right_x, bottom_right_y],
+                [top_left_x, bottom_right_y]
+            ])
+            cv2.fillPoly(image, [pts], tuple(reversed(cell_color)))
+    return image
+
+
+@pytest.mark.parametrize("width, height", RESOLUTIONS)
+def test_grids_match_legacy_fillpoly(width, height, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = PatternGenerator(width, height)
+    assert (1, width) in generator.grid_configs() and (height, 1) in generator.grid_configs()
+    grids = generator.generate_all_grids()
+    assert len(grids) == len(generator.grid_configs()) * len(generator.GRID_VARIANTS)
+    for rows, cols in generator.grid_configs():
+        for suffix, (line_color, background_color) in generator.GRID_VARIANTS.items():
+            expected = legacy_grid(width, height, rows, cols, line_color, background_color)
+            image = grids[f"{cols}x{rows}{suffix}"]
+            assert image.dtype == expected.dtype and image.shape == expected.shape
+            assert image.tobytes() == expected.tobytes(), f"{cols}x{rows}{suffix} at {width}x{height}"
+
+
+@pytest.mark.parametrize("rows, cols", [(5, 3), (4, 7), (36, 64), (37, 65)])
+def test_other_grid_sizes_match_legacy_fillpoly(rows, cols):
+    generator = PatternGenerator(65, 37)
+    image = generator.generate_grid(rows, cols, "red", "cyan", save=False)
+    assert image.tobytes() == legacy_grid(65, 37, rows, cols, "red", "cyan").tobytes()
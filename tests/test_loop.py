@@ -0,0 +1,14 @@
+from loop import PatternViewer
+from pattern_generator import PatternGenerator
+
+
+def test_uniform_frames_are_cached_within_budget():
+    generator = PatternGenerator(64, 32)
+    frame_bytes = 64 * 32 * 3
+    viewer = PatternViewer(generator=generator, cache_bytes=2 * frame_bytes)
+    viewer.load_image_paths()
+    for name in ["red", "green", "blue", "white"]:
+        assert viewer.load_frame(name).shape == (32, 64, 3)
+    assert viewer.frame_cache.current_bytes == 2 * frame_bytes
+    assert viewer.frame_cache.get("white") is viewer.load_frame("white")
+    assert viewer.frame_cache.get("red") is None
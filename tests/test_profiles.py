@@ -0,0 +1,28 @@
+import os
+
+import cv2
+import pytest
+
+from encoders import get_profile
+from pattern_generator import PatternGenerator
+
+NAMES = ("red", "grayscale", "crosstalk_white_black", "32x3A", "skip_one_pixel")
+
+
+@pytest.mark.parametrize("image_format", ["bmp", "png", "tiff", "jpg", "ppm"])
+def test_default_profile_matches_opencv(tmp_path, image_format):
+    generator = PatternGenerator(64, 36, image_format)
+    generator.output_dir = str(tmp_path / "generator")
+    encoder = get_profile("default")[f".{image_format}"]
+    for name in NAMES:
+        image = generator.render(name)
+        reference = str(tmp_path / f"reference.{image_format}")
+        assert cv2.imwrite(reference, image)
+        encoded = str(tmp_path / f"encoded.{image_format}")
+        encoder.encode(image, encoded)
+        with open(reference, "rb") as f:
+            expected = f.read()
+        # Full frames, and row plans streamed by encoders that can
+        for path in (encoded, generator.save_image(image, name), generator.save_image(generator.row_plan(name), name)):
+            with open(path, "rb") as f:
+                assert f.read() == expected, (name, os.path.basename(path))
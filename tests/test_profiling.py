@@ -0,0 +1,27 @@
+import json
+import os
+
+from pattern_generator import PatternGenerator
+from profiling import JSONLinesSink, Profiler
+
+
+def test_json_lines_sink_writes_one_record_per_save(tmp_path):
+    path = str(tmp_path / "telemetry.jsonl")
+    sink = JSONLinesSink(path)
+    generator = PatternGenerator(64, 36, "png")
+    generator.output_dir = str(tmp_path / "patterns")
+    images = {"grayscale": generator.render("grayscale"), "solid_red": generator.render_flat("red"),
+              "grid_32x3A": generator.row_plan("32x3A")}
+    # Attached after rendering, so only the saves are recorded
+    generator.profiler = Profiler([sink])
+    saved = [generator.save_image(image, filename) for filename, image in images.items()]
+    sink.close()
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["stage"] for record in records] == ["save"] * len(saved)
+    for record, filepath in zip(records, saved):
+        assert record["name"] == os.path.splitext(os.path.basename(filepath))[0]
+        assert record["file_bytes"] == os.path.getsize(filepath)
+        assert record["frame_bytes"] == 64 * 36 * 3
+        assert record["resolution"] == "64x36"
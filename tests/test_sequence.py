@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pattern_sequence import frame_count, load_dwell_schedule
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("dwell_ms, frames", [(150, 2), (250, 3), (350, 4), (450, 5), (10, 1), (0, 1)])
+def test_frame_count_rounds_half_up(dwell_ms, frames):
+    assert frame_count(dwell_ms, 10) == frames
+
+
+def test_load_dwell_schedule_csv(tmp_path):
+    path = tmp_path / "schedule.csv"
+    path.write_text("# pattern,ms\nred, 250\n\ngreen,500 # long\n")
+    assert load_dwell_schedule(str(path)) == {"red": 250.0, "green": 500.0}
+
+
+def test_load_dwell_schedule_json(tmp_path):
+    path = tmp_path / "schedule.json"
+    path.write_text(json.dumps({"red": 250, "green": 500.5}))
+    assert load_dwell_schedule(str(path)) == {"red": 250.0, "green": 500.5}
+
+
+def test_schedule_loading_does_not_import_opencv():
+    code = "import sys, pattern_sequence; sys.exit('cv2' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO,
+                            env=dict(os.environ, PYTHONPATH=REPO))
+    assert result.returncode == 0
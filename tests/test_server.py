@@ -0,0 +1,82 @@
+import json
+import threading
+import tracemalloc
+import urllib.error
+import urllib.request
+
+import pytest
+
+from encoders import SUPPORTED_EXTENSIONS
+from pattern_generator import PatternGenerator
+from pattern_server import _CONTENT_TYPES, PatternService, make_server
+
+
+def test_every_supported_extension_has_an_image_content_type():
+    for extension in SUPPORTED_EXTENSIONS:
+        assert _CONTENT_TYPES.get(extension, "").startswith("image/"), extension
+
+
+@pytest.mark.parametrize("extension", [".bmp", ".ppm", ".png", ".tiff"])
+@pytest.mark.parametrize("bit_depth", [8, 16])
+def test_described_patterns_encode_like_full_frames(extension, bit_depth):
+    generator = PatternGenerator(67, 31, bit_depth=bit_depth)
+    if bit_depth not in generator.encoder_for("x" + extension).bit_depths:
+        pytest.skip(f"{extension} does not hold {bit_depth}-bit images")
+    for name in ["red", "crosstalk_white_black", "grayscale", "32x3A"]:
+        flat = generator.render_flat(name)
+        described = flat if flat is not None else generator.row_plan(name)
+        expected = generator.encode_image(generator.render(name), name + extension)
+        assert generator.encode_image(described, name + extension) == expected, name
+
+
+def test_encoding_a_flat_pattern_keeps_no_frame_alive():
+    generator = PatternGenerator(1000, 1000)
+    frame_bytes = 1000 * 1000 * 3
+    tracemalloc.start()
+    try:
+        for name in ["white", "black", "red"]:
+            generator.encode_image(generator.render_flat(name), name + ".png")
+        assert tracemalloc.get_traced_memory()[0] < frame_bytes // 10
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def server():
+    service = PatternService()
+    httpd = make_server("127.0.0.1", 0, service)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", service
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read()
+
+
+def test_listing_includes_every_servable_pattern(server):
+    url, _ = server
+    status, _, body = get(f"{url}/pattern/64x32")
+    assert status == 200
+    names = [name for names in json.loads(body).values() for name in names]
+    assert "red" in names and "cyan" in names
+    assert get(f"{url}/pattern/64x32/cyan.png")[0] == 200
+
+
+@pytest.mark.parametrize("error", [TypeError, KeyError])
+def test_render_errors_are_client_errors(server, monkeypatch, error):
+    url, service = server
+
+    def fail(*args):
+        raise error("bad layer")
+
+    monkeypatch.setattr(service, "encode", fail)
+    status, content_type, body = get(f"{url}/pattern/64x32/red.png")
+    assert status == 400 and content_type == "application/json"
+    assert "red" in json.loads(body)["error"]
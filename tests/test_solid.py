@@ -0,0 +1,15 @@
+import numpy as np
+
+from pattern_generator import PatternGenerator
+
+
+def test_solid_frames_are_fresh_writable_arrays():
+    generator = PatternGenerator(32, 18)
+    first = generator.generate_solid_color("red", save=False)
+    second = generator.generate_solid_color("red", save=False)
+    assert first.flags.writeable and first is not second
+    first[:] = 0
+    assert np.all(second == generator.color_pixel("red"))
+    assert generator.render_flat("white").to_array().flags.writeable
+    levels = generator.generate_grayscale_levels(save=False)
+    assert all(image.flags.writeable for image in levels.values())
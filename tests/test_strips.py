@@ -0,0 +1,39 @@
+import cv2
+import numpy as np
+import pytest
+
+from pattern_generator import PatternGenerator
+
+WIDTH, HEIGHT = 64, 36
+# Does not divide the height, so the last strip is short
+STRIP_ROWS = 7
+
+
+def _generators(tmp_path, image_format, bit_depth=8):
+    full = PatternGenerator(WIDTH, HEIGHT, image_format, bit_depth=bit_depth)
+    strips = PatternGenerator(WIDTH, HEIGHT, image_format, bit_depth=bit_depth, strip_rows=STRIP_ROWS)
+    full.output_dir = str(tmp_path / "full")
+    strips.output_dir = str(tmp_path / "strips")
+    return full, strips
+
+
+@pytest.mark.parametrize("bit_depth", [8, 16])
+def test_strip_tiff_reads_back_as_generated(tmp_path, bit_depth):
+    _, strips = _generators(tmp_path, "tiff", bit_depth)
+    for spec in strips.pattern_specs():
+        path = strips.save_image(strips.row_plan(spec), spec.filename)
+        expected = getattr(strips, spec.method)(save=False, **spec.params)
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        assert image is not None, spec.name
+        assert image.dtype == expected.dtype, spec.name
+        np.testing.assert_array_equal(image, expected, err_msg=spec.name)
+
+
+@pytest.mark.parametrize("image_format, bit_depth", [("bmp", 8), ("ppm", 8), ("ppm", 16)])
+def test_strip_output_is_byte_identical_to_full_frames(tmp_path, image_format, bit_depth):
+    full, strips = _generators(tmp_path, image_format, bit_depth)
+    for spec in full.pattern_specs():
+        full_path = full.save_image(full.render(spec), spec.filename)
+        strip_path = strips.save_image(strips.row_plan(spec), spec.filename)
+        with open(full_path, "rb") as f, open(strip_path, "rb") as g:
+            assert f.read() == g.read(), spec.name
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from panel_layout import PANEL_LAYOUTS
+from pattern_generator import PatternGenerator
+
+
+@pytest.mark.parametrize("layout", list(PANEL_LAYOUTS))
+@pytest.mark.parametrize("width, height", [(64, 36), (65, 37)])
+def test_no_subpixel_pattern_is_uniform(layout, width, height):
+    generator = PatternGenerator(width, height, panel_layout=layout)
+    for spec in generator.pattern_specs():
+        if spec.category != "Subpixel":
+            continue
+        image = generator.render(spec)
+        assert not np.all(image == image[0, 0]), f"{spec.name} on {layout} is a uniform frame"
+
+
+def test_rgbw_washed_out_patterns_are_rejected():
+    generator = PatternGenerator(64, 36, panel_layout="rgbw_stripe")
+    for kind, color, phase in [("color_off", "r", 0), ("color", "w", 0), ("column_inversion", "", 1)]:
+        assert not generator.subpixel_addressable(kind, color, phase)
+        with pytest.raises(ValueError):
+            generator.generate_subpixel(kind, color, phase, save=False)
+    assert "subpixel_no_r" not in generator.pattern_names()
+
+
+def test_subpixel_patterns_listed_only_with_layout():
+    assert not any(name.startswith("subpixel_") for name in PatternGenerator(64, 36).pattern_names())
+    assert "subpixel_r" in PatternGenerator(64, 36, panel_layout="pentile_rgbw").pattern_names()
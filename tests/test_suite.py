@@ -0,0 +1,66 @@
+import pytest
+
+from pattern_generator import PatternGenerator
+from pattern_suite import parse_suite
+
+
+def test_empty_suite_is_rejected():
+    with pytest.raises(ValueError):
+        parse_suite({"patterns": []})
+
+
+def test_preview_colors_are_listed_but_not_exported():
+    generator = PatternGenerator(32, 18)
+    preview = generator.pattern_categories(preview=True)["Solid Color"]
+    for color_name in PatternGenerator.PREVIEW_SOLID_COLORS:
+        assert color_name in preview
+        assert color_name not in generator.pattern_names()
+        assert generator.get_spec(color_name).method == "generate_solid_color"
+    assert generator.pattern_categories()["Solid Color"] == preview[:-len(PatternGenerator.PREVIEW_SOLID_COLORS)]
+
+
+def test_suite_replaces_preview_colors():
+    suite = parse_suite({"patterns": [{"name": "red_box", "layers": [{"fill": "red"}]}]})
+    generator = PatternGenerator(32, 18, suite=suite)
+    assert generator.pattern_categories(preview=True) == generator.pattern_categories()
+
+
+def _suite(*patterns, colors=None):
+    data = {"patterns": list(patterns)}
+    if colors is not None:
+        data["colors"] = colors
+    return data
+
+
+@pytest.mark.parametrize("layer", [
+    {"ramp": "horizontal", "levels": "16"},
+    {"ramp": "horizontal", "levels": 2.5},
+    {"ramp": "horizontal", "levels": True},
+    {"ramp": "horizontal", "levels": 1},
+    {"ramp": "vertical", "reversed": "yes"},
+    {"ramp": "diagonal"},
+])
+def test_bad_ramp_is_rejected_naming_the_pattern(layer):
+    with pytest.raises(ValueError, match="gray_ramp"):
+        parse_suite(_suite({"name": "gray_ramp", "layers": [layer]}))
+
+
+def test_good_ramp_is_accepted():
+    suite = parse_suite(_suite({"name": "gray_ramp", "layers": [
+        {"ramp": "vertical", "levels": 16, "reversed": True}]}))
+    assert [spec.name for spec in suite.specs] == ["gray_ramp"]
+
+
+@pytest.mark.parametrize("colors", [[[255, 128, 0]], "orange"])
+def test_colors_must_be_a_mapping(colors):
+    with pytest.raises(ValueError, match="colors must be a mapping"):
+        parse_suite(_suite({"name": "box", "layers": [{"fill": "red"}]}, colors=colors))
+
+
+def test_duplicate_filenames_are_rejected():
+    with pytest.raises(ValueError, match="second.*first"):
+        parse_suite(_suite({"name": "first", "filename": "box", "layers": [{"fill": "red"}]},
+                           {"name": "second", "filename": "box", "layers": [{"fill": "blue"}]}))
+    with pytest.raises(ValueError, match="second.*first"):
+        parse_suite(_suite({"name": "first", "layers": [{"fill": "red"}]},
+                           {"name": "second", "filename": "first", "layers": [{"fill": "blue"}]}))